@@ -7,8 +7,11 @@ from fastapi import APIRouter, Depends, Form, HTTPException
 
 from app import scheduler
 from app.config import POLL_INTERVAL_MINUTES
-from app.db import repos
+from app.db import repos, search_index, vector_index
+from app.db.database import pool_stats
 from app.discovery import run_discovery
+from app.llm import cache as llm_cache
+from app.llm import provider
 from app.security import require_auth
 from app.youtube import fetcher, gate
 
@@ -90,8 +93,9 @@ def cancel_queued(video_id: str):
 
 @router.post("/poll")
 async def poll():
-    """Trigger discovery immediately (v1-compatible). Fetches still spread out."""
-    stats = await asyncio.to_thread(run_discovery)
+    """Trigger discovery immediately (v1-compatible), checking every channel
+    whether or not it's due. Fetches still spread out."""
+    stats = await asyncio.to_thread(run_discovery, True)
     return {"status": "discovery_complete", **stats}
 
 
@@ -121,4 +125,10 @@ def status():
         "next_poll_at": next_poll,
         "next_poll_in_seconds": (next_poll - now) if next_poll is not None else None,
         "upcoming": upcoming,
+        "db_pool": pool_stats(),
+        "llm_cache": llm_cache.stats(),
+        "transcript_normalization": repos.transcript_reduction(),
+        "search_index": search_index.last_maintenance(),
+        "semantic_index": vector_index.status(),
+        "llm": provider.status(),
     }
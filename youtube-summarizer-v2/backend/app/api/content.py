@@ -1,8 +1,15 @@
 """Browsing + search + quizzes over stored summaries/transcripts (item 2)."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import base64
+import json
+from typing import AsyncIterator, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.db import repos
 from app.llm.quiz import generate_quiz
+from app.search import SemanticSearchOff, search as search_videos
 from app.security import require_auth
 
 router = APIRouter(tags=["content"], dependencies=[Depends(require_auth)])
@@ -15,18 +22,80 @@ def list_videos(status: str | None = None, channel_id: str | None = None,
 
 
 @router.get("/videos/{video_id}")
-def get_video(video_id: str):
+def get_video(video_id: str, lite: bool = False):
+    """Everything about a video. `lite` leaves out the transcript's text (its
+    metadata and length stay) — fetch that from /transcripts/{id} when shown."""
     video = repos.get_video(video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     return {
         "video": video,
         "summary": repos.get_latest_summary(video_id),
-        "transcript": repos.get_transcript(video_id),
+        "transcript": repos.get_transcript_info(video_id) if lite else repos.get_transcript(video_id),
         "quiz": repos.get_latest_quiz(video_id),
     }
 
 
+# Statuses in which a (new) summary may still appear for a video.
+_PENDING_STATUSES = ("queued", "fetching", "summarizing")
+_STREAM_POLL_SECONDS = 0.5
+_STREAM_KEEPALIVE_SECONDS = 15
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _summary_events(video_id: str) -> AsyncIterator[str]:
+    """Relay a summary as it's generated: `status` when the video's status
+    changes, `delta` with each new piece of the streamed draft (`reset` first if
+    generation restarted), then `done` with the saved summary (null if none) once
+    the video leaves the pending statuses."""
+    status = None
+    draft_id = None
+    sent = 0
+    idle = 0.0
+    while True:
+        video = await asyncio.to_thread(repos.get_video, video_id)
+        if not video:
+            return
+        draft = await asyncio.to_thread(repos.get_summary_draft, video_id)
+        if video["status"] != status:
+            status = video["status"]
+            yield _sse("status", {"status": status, "reason": video.get("skip_reason")})
+        if draft:
+            if draft["started_at"] != draft_id or len(draft["text"]) < sent:
+                if draft_id is not None:
+                    yield _sse("reset", {})
+                draft_id, sent = draft["started_at"], 0
+            if len(draft["text"]) > sent:
+                yield _sse("delta", {"text": draft["text"][sent:]})
+                sent = len(draft["text"])
+                idle = 0.0
+        # Checked whether or not a draft is left: one orphaned by a job that died
+        # mid-summary must not keep the stream open.
+        if status not in _PENDING_STATUSES:
+            summary = await asyncio.to_thread(repos.get_latest_summary, video_id)
+            yield _sse("done", {"status": status, "summary": summary})
+            return
+        if idle >= _STREAM_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            idle = 0.0
+        await asyncio.sleep(_STREAM_POLL_SECONDS)
+        idle += _STREAM_POLL_SECONDS
+
+
+@router.get("/videos/{video_id}/summary/stream")
+async def stream_summary(video_id: str):
+    """Server-sent events for a summary in progress (see _summary_events). The
+    summarize stage persists its partial output every ~0.5s, so the first words
+    show up as soon as the model starts producing them."""
+    if not await asyncio.to_thread(repos.get_video, video_id):
+        raise HTTPException(status_code=404, detail="Video not found")
+    return StreamingResponse(_summary_events(video_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @router.get("/summaries")
 def list_summaries(limit: int = Query(50, le=200), offset: int = 0):
     return {"summaries": repos.list_summaries(limit=limit, offset=offset)}
@@ -40,17 +109,114 @@ def get_summary(summary_id: int):
     return summary
 
 
+# Characters per piece of a streamed transcript.
+_TRANSCRIPT_STREAM_CHARS = 64 * 1024
+
+
+def _transcript_or_404(video_id: str) -> dict:
+    info = repos.get_transcript_info(video_id)
+    if not info:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    return info
+
+
+def _transcript_etag(info: dict) -> str:
+    """Changes whenever the transcript is re-fetched (fetched_at), so clients
+    can revalidate instead of downloading it again."""
+    return f'W/"{info["video_id"]}-{info["fetched_at"]}-{info["length"]}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    tags = request.headers.get("if-none-match")
+    return bool(tags) and (tags.strip() == "*" or etag in (t.strip() for t in tags.split(",")))
+
+
+def _cache_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
 @router.get("/transcripts/{video_id}")
-def get_transcript(video_id: str):
-    transcript = repos.get_transcript(video_id)
+def get_transcript(video_id: str, request: Request, response: Response,
+                   offset: int = Query(0, ge=0), length: int | None = Query(None, ge=1)):
+    """The transcript, or with offset/length just that character range of its
+    text; `length` is the whole text's and `next_offset` is where the next range
+    starts (null at the end). Honors If-None-Match."""
+    transcript = repos.get_transcript_range(video_id, offset, length)
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
-    return transcript
+    etag = _transcript_etag(transcript)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    text = transcript["text"] or ""
+    end = offset + len(text)
+    response.headers.update(_cache_headers(etag))
+    return {**transcript, "text": text, "offset": offset,
+            "next_offset": end if end < transcript["length"] else None}
+
+
+@router.get("/transcripts/{video_id}/text")
+def stream_transcript_text(video_id: str, request: Request):
+    """The full text as a plain-text stream. Read from the database once — one
+    version of it, matching the ETag — and sent a piece at a time, so the
+    response is never encoded (or buffered) whole."""
+    transcript = repos.get_transcript_range(video_id)
+    if not transcript:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    etag = _transcript_etag(transcript)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    text = transcript["text"] or ""
+
+    def pieces():
+        for start in range(0, len(text), _TRANSCRIPT_STREAM_CHARS):
+            yield text[start:start + _TRANSCRIPT_STREAM_CHARS].encode("utf-8")
+
+    return StreamingResponse(pieces(), media_type="text/plain; charset=utf-8", headers=_cache_headers(etag))
+
+
+@router.get("/transcripts/{video_id}/segments")
+def get_transcript_segments(video_id: str, request: Request, response: Response,
+                            start_ms: int | None = Query(None, ge=0), end_ms: int | None = Query(None, ge=0),
+                            limit: int = Query(500, ge=1, le=2000), offset: int = Query(0, ge=0)):
+    """A page of the transcript's timed segments, optionally only those
+    overlapping [start_ms, end_ms). Honors If-None-Match."""
+    etag = _transcript_etag(_transcript_or_404(video_id))
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
+    return {
+        "video_id": video_id,
+        "total_segments": repos.count_transcript_segments(video_id),
+        "segments": repos.get_transcript_segments(video_id, start_ms=start_ms, end_ms=end_ms,
+                                                  offset=offset, limit=limit),
+    }
+
+
+def _encode_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([row["rank"], row["video_id"]]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        rank, video_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), str(video_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.get("/search")
-def search(q: str = Query(..., min_length=2), limit: int = Query(30, le=100)):
-    return {"query": q, "results": repos.search(q, limit=limit)}
+def search(q: str = Query(..., min_length=2), limit: int = Query(30, ge=1, le=100), cursor: str | None = None,
+           mode: Literal["lexical", "semantic", "hybrid"] = "lexical"):
+    """One page of results; pass `next_cursor` back as `cursor` for the next
+    (null when there are no more). `mode` as in app.search."""
+    try:
+        rows = search_videos(q, mode, limit=limit + 1, after=_decode_cursor(cursor) if cursor else None)
+    except SemanticSearchOff as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {"query": q, "mode": mode, "results": rows,
+            "next_cursor": _encode_cursor(rows[-1]) if more else None}
 
 
 @router.get("/videos/{video_id}/quiz")
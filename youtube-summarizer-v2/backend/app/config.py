@@ -3,6 +3,7 @@
 Everything reads settings from here so there's one place to see what's
 configurable and what the defaults are.
 """
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -30,10 +31,59 @@ def _minutes_list(name: str, default: str) -> list[int]:
     return out or [5, 15, 45, 120, 360, 720]
 
 
+def _egress_lanes() -> list[dict]:
+    """Worker lanes, one per egress identity. YTDLP_LANES is a JSON list of
+    {"name", "proxy", "cookies", "impersonate"} objects; unset/invalid => a
+    single "default" lane built from the YTDLP_* vars below. Names key each
+    lane's backoff state, so a repeated name is suffixed (-2, -3, …) with a
+    warning rather than two lanes sharing one backoff."""
+    lanes: list[dict] = []
+    try:
+        parsed = json.loads(os.getenv("YTDLP_LANES", "") or "[]")
+    except ValueError:
+        parsed = []
+    names: set[str] = set()
+    for i, item in enumerate(parsed if isinstance(parsed, list) else []):
+        if not isinstance(item, dict):
+            continue
+        name = base = str(item.get("name") or f"lane{i + 1}")
+        n = 1
+        while name in names:
+            n += 1
+            name = f"{base}-{n}"
+        if name != base:
+            print(f"[config] YTDLP_LANES: duplicate lane name {base!r}; using {name!r}")
+        names.add(name)
+        lanes.append({
+            "name": name,
+            "proxy": item.get("proxy") or "",
+            "cookies": item.get("cookies") or "",
+            "impersonate": item.get("impersonate") or "",
+        })
+    return lanes or [{
+        "name": "default",
+        "proxy": YTDLP_PROXY,
+        "cookies": YTDLP_COOKIES_FILE,
+        "impersonate": YTDLP_IMPERSONATE,
+    }]
+
+
+def _model_limits() -> dict[str, dict]:
+    """LLM_MODEL_LIMITS: JSON object of model -> {"rpm", "tpm"}; invalid => {}."""
+    try:
+        parsed = json.loads(os.getenv("LLM_MODEL_LIMITS", "") or "{}")
+    except ValueError:
+        return {}
+    return {str(k): v for k, v in parsed.items() if isinstance(v, dict)} if isinstance(parsed, dict) else {}
+
+
 # ── Paths ─────────────────────────────────────────────────────
 # Mounted as a Docker volume so the DB + cookies survive restarts.
 DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
 DB_PATH = DATA_DIR / "data.db"
+# Max pooled SQLite connections. Each thread that touches the DB (event loop,
+# to_thread workers, FastAPI's sync-endpoint threads) holds one while in use.
+DB_POOL_SIZE = _int("DB_POOL_SIZE", 8)
 
 # ── Web auth ──────────────────────────────────────────────────
 APP_PASSWORD_SHA256 = os.getenv("APP_PASSWORD_SHA256", "")
@@ -44,6 +94,42 @@ SESSION_MAX_AGE_SECONDS = 60 * 60 * 24 * 30  # 30 days
 
 # ── Gemini ────────────────────────────────────────────────────
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+# Finished summaries are memoized by their prompt inputs; least-recently-used
+# entries beyond this many are evicted. 0 disables the cache.
+LLM_CACHE_MAX_ENTRIES = _int("LLM_CACHE_MAX_ENTRIES", 2000)
+# Long transcripts are summarized chunk-by-chunk: at most this many chunk calls in
+# flight (shared by all jobs), and partial summaries merged LLM_REDUCE_FANIN at a time.
+LLM_CHUNK_CONCURRENCY = _int("LLM_CHUNK_CONCURRENCY", 4)
+LLM_REDUCE_FANIN = _int("LLM_REDUCE_FANIN", 8)
+# Consecutive chunks share this many (estimated) tokens of transcript.
+LLM_CHUNK_OVERLAP_TOKENS = _int("LLM_CHUNK_OVERLAP_TOKENS", 400)
+# Each model attempt is abandoned after this long. With LLM_HEDGE=1 the next model
+# in the chain is also started once the current one runs past its p95 latency.
+LLM_MODEL_TIMEOUT_SECONDS = _int("LLM_MODEL_TIMEOUT_SECONDS", 180)
+LLM_HEDGE = bool(_int("LLM_HEDGE", 0))
+# A model failing this many times in a row is skipped for the cool-down (doubling
+# on each re-trip), then tried again with a single probe call.
+LLM_BREAKER_FAILURES = _int("LLM_BREAKER_FAILURES", 3)
+LLM_BREAKER_COOLDOWN_SECONDS = _int("LLM_BREAKER_COOLDOWN_SECONDS", 60)
+# Client-side quota per model (0 = unlimited): requests and estimated input tokens
+# per minute. LLM_MODEL_LIMITS overrides them per model, as JSON:
+#   {"gemini-2.5-flash": {"rpm": 10, "tpm": 250000}}
+LLM_MODEL_RPM = _int("LLM_MODEL_RPM", 60)
+LLM_MODEL_TPM = _int("LLM_MODEL_TPM", 1_000_000)
+LLM_MODEL_LIMITS = _model_limits()
+# Batch summarization of background (auto-discovered) videos: "gemini" submits
+# them through Gemini's batch API (cheaper, slower), "local" runs the same batch
+# as concurrent ordinary calls (no batch API needed — also the test stand-in),
+# "off" summarizes every video with its own call. A batch goes out once
+# LLM_BATCH_MIN_SIZE are waiting or the oldest has waited LLM_BATCH_MAX_WAIT_SECONDS.
+LLM_BATCH_BACKEND = os.getenv("LLM_BATCH_BACKEND", "off").strip().lower()
+LLM_BATCH_SIZE = _int("LLM_BATCH_SIZE", 50)
+LLM_BATCH_MIN_SIZE = _int("LLM_BATCH_MIN_SIZE", 5)
+LLM_BATCH_MAX_WAIT_SECONDS = _int("LLM_BATCH_MAX_WAIT_SECONDS", 300)
+LLM_BATCH_POLL_SECONDS = _int("LLM_BATCH_POLL_SECONDS", 30)
+# A submitted batch not finished by then is cancelled and its videos summarized
+# one call each instead.
+LLM_BATCH_TIMEOUT_SECONDS = _int("LLM_BATCH_TIMEOUT_SECONDS", 6 * 3600)
 
 # ── Email ─────────────────────────────────────────────────────
 EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
@@ -62,11 +148,54 @@ YTDLP_COOKIES_FILE = os.getenv("YTDLP_COOKIES_FILE", "data/cookies.txt")
 # curl_cffi package). Empty = disabled.
 YTDLP_PROXY = os.getenv("YTDLP_PROXY", "")
 YTDLP_IMPERSONATE = os.getenv("YTDLP_IMPERSONATE", "")
+# Parallel worker lanes, each bound to its own egress (proxy/cookies/impersonate)
+# with its own backoff state. Defaults to one lane from the three vars above.
+YTDLP_LANES = _egress_lanes()
+# Recycle policy for the pooled yt-dlp session per egress (also recycled when
+# the cookie file changes on disk, or after any error).
+YTDLP_SESSION_MAX_REQUESTS = _int("YTDLP_SESSION_MAX_REQUESTS", 50)
+YTDLP_SESSION_MAX_AGE_SECONDS = _int("YTDLP_SESSION_MAX_AGE_SECONDS", 3600)
+# How long a fetched info dict + caption payload is reused by retries and
+# re-summaries instead of going back to YouTube.
+FETCH_CACHE_TTL_HOURS = _int("FETCH_CACHE_TTL_HOURS", 168)
 POLL_INTERVAL_MINUTES = _int("POLL_INTERVAL_MINUTES", 30)
+# RSS discovery fetches feeds in parallel over one keep-alive session.
+FEED_FETCH_CONCURRENCY = _int("FEED_FETCH_CONCURRENCY", 8)
+FEED_FETCH_TIMEOUT_SECONDS = _int("FEED_FETCH_TIMEOUT_SECONDS", 20)
+# Adaptive per-channel polling: each channel is re-checked at a fraction of its
+# observed gap between uploads, clamped to this range. The discovery job still
+# ticks every POLL_INTERVAL_MINUTES but only fetches channels that are due.
+FEED_POLL_MIN_MINUTES = _int("FEED_POLL_MIN_MINUTES", 30)
+FEED_POLL_MAX_MINUTES = _int("FEED_POLL_MAX_MINUTES", 1440)
 FETCH_SPREAD_MINUTES = _int("FETCH_SPREAD_MINUTES", 28)
 FETCH_JITTER_MIN_SECONDS = _int("FETCH_JITTER_MIN_SECONDS", 20)
 FETCH_JITTER_MAX_SECONDS = _int("FETCH_JITTER_MAX_SECONDS", 90)
 
+# Search index upkeep: every this many minutes, if no job is running, spend up to
+# SEARCH_OPTIMIZE_BUDGET_SECONDS merging FTS index segments (app.db.search_index).
+SEARCH_OPTIMIZE_INTERVAL_MINUTES = _int("SEARCH_OPTIMIZE_INTERVAL_MINUTES", 60)
+SEARCH_OPTIMIZE_BUDGET_SECONDS = _int("SEARCH_OPTIMIZE_BUDGET_SECONDS", 10)
+# Semantic search (app.search): once summarized, a video's summary and its
+# transcript passages are embedded. EMBED_BACKEND picks the embedder: "local" (a
+# deterministic hashing embedder — offline, no API calls), "gemini" (EMBED_MODEL
+# through the Gemini API) or "off". Vectors of EMBED_DIM float32 each.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "local").strip().lower()
+EMBED_MODEL = os.getenv("EMBED_MODEL", "gemini-embedding-001")
+EMBED_DIM = _int("EMBED_DIM", 256)
+# Hybrid search re-ranks this many of the best lexical (BM25) matches by a blend
+# of their BM25 and vector scores; the vector score's share, in percent.
+SEARCH_HYBRID_CANDIDATES = _int("SEARCH_HYBRID_CANDIDATES", 200)
+SEARCH_HYBRID_VECTOR_WEIGHT = _int("SEARCH_HYBRID_VECTOR_WEIGHT", 50)
+
+# How long a claimed job stays leased to its worker; renewed while it runs. A
+# job whose worker died is re-claimed once its lease lapses.
+JOB_LEASE_SECONDS = _int("JOB_LEASE_SECONDS", 600)
+
+# Worker pools for the YouTube-free pipeline stages (LLM summary, email, embeddings).
+SUMMARIZE_CONCURRENCY = _int("SUMMARIZE_CONCURRENCY", 3)
+NOTIFY_CONCURRENCY = _int("NOTIFY_CONCURRENCY", 1)
+EMBED_CONCURRENCY = _int("EMBED_CONCURRENCY", 1)
+
 # ── Backoff (item 6) ──────────────────────────────────────────
 BACKOFF_SCHEDULE_MINUTES = _minutes_list("BACKOFF_SCHEDULE_MINUTES", "5,15,45,120,360,720")
 
@@ -3,17 +3,28 @@
 One writer (the worker) and the API both touch this DB, so we enable WAL mode
 for better read/write concurrency and set a busy_timeout so brief lock contention
 retries instead of erroring. FTS5 virtual tables mirror transcripts + summaries
-to power /search.
+to power /search (see app.db.search_index).
+
+Connections come from a small pool rather than being opened per call: every
+repos function goes through `db()`, so connect + PRAGMAs on each one added up
+(e.g. /api/status, the worker's loop). Pooled connections are configured once.
+A thread gets back the connection it used last when it's idle, so the event
+loop and each `asyncio.to_thread` worker effectively keep one connection apiece.
 """
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Iterator, Optional
 
-from app.config import DATA_DIR, DB_PATH
+from app.config import DATA_DIR, DB_PATH, DB_POOL_SIZE
 
 
 def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, timeout=30)
+    # check_same_thread=False: a pooled connection may be handed to another
+    # thread once its previous owner has checked it back in. Only one thread
+    # ever holds it at a time.
+    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA busy_timeout=30000")
@@ -21,14 +32,116 @@ def get_connection() -> sqlite3.Connection:
     return conn
 
 
+class ConnectionPool:
+    """Bounded pool of pre-configured connections with per-thread affinity.
+
+    - A thread's nested `db()` blocks reuse the connection it already holds, so
+      only the outermost block commits (inner calls join its transaction).
+    - On checkout a thread prefers its own last connection if idle, then any
+      idle one, then opens a new one while under `size`; otherwise it waits.
+    - Checkout waits are counted so /api/status can show pool pressure.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, size)
+        self._idle: list[sqlite3.Connection] = []
+        self._all: list[sqlite3.Connection] = []
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _checkout(self) -> sqlite3.Connection:
+        affine: Optional[sqlite3.Connection] = getattr(self._local, "last", None)
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if affine is not None and affine in self._idle:
+                    self._idle.remove(affine)
+                    conn = affine
+                    break
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if len(self._all) < self.size:
+                    conn = get_connection()
+                    self._all.append(conn)
+                    break
+                waited = True
+                self._cond.wait()
+            self._checkouts += 1
+            if waited:
+                elapsed = time.monotonic() - started
+                self._waits += 1
+                self._wait_total += elapsed
+                self._wait_max = max(self._wait_max, elapsed)
+        self._local.last = conn
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        with self._cond:
+            if conn in self._all:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held: Optional[sqlite3.Connection] = getattr(self._local, "held", None)
+        if held is not None:
+            # Nested on this thread: join the outer block's transaction.
+            yield held
+            return
+        conn = self._checkout()
+        self._local.held = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.held = None
+            self._checkin(conn)
+
+    def close_all(self) -> None:
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._all = [c for c in self._all if c not in self._idle]
+            self._idle.clear()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": len(self._all),
+                "idle": len(self._idle),
+                "in_use": len(self._all) - len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_total_ms": round(self._wait_total * 1000, 1),
+                "wait_max_ms": round(self._wait_max * 1000, 1),
+            }
+
+
+_pool = ConnectionPool(DB_POOL_SIZE)
+
+
 @contextmanager
 def db() -> Iterator[sqlite3.Connection]:
-    conn = get_connection()
-    try:
+    with _pool.connection() as conn:
         yield conn
-        conn.commit()
-    finally:
-        conn.close()
+
+
+def pool_stats() -> dict:
+    return _pool.stats()
+
+
+def close_pool() -> None:
+    _pool.close_all()
 
 
 def init_db() -> None:
@@ -66,7 +179,7 @@ def init_db() -> None:
         c.execute("CREATE INDEX IF NOT EXISTS idx_filters_channel ON channel_filters(channel_id)")
 
         # Replaces v1's processed_videos: now a full record per video.
-        # status: discovered | queued | fetching | summarized | skipped | failed
+        # status: discovered | queued | fetching | summarizing | summarized | skipped | failed
         c.execute("""
             CREATE TABLE IF NOT EXISTS videos (
                 video_id      TEXT PRIMARY KEY,
@@ -93,9 +206,33 @@ def init_db() -> None:
                 source     TEXT,
                 text       TEXT NOT NULL,
                 fetched_at INTEGER DEFAULT (strftime('%s','now')),
+                raw_tokens INTEGER,
+                tokens     INTEGER,
                 FOREIGN KEY(video_id) REFERENCES videos(video_id) ON DELETE CASCADE
             )
         """)
+        # raw_tokens / tokens: estimated size of the captions before and after
+        # normalization (app.youtube.normalize), to see what it saves per video.
+        transcript_cols = {r["name"] for r in c.execute("PRAGMA table_info(transcripts)").fetchall()}
+        for col in ("raw_tokens", "tokens"):
+            if col not in transcript_cols:
+                c.execute(f"ALTER TABLE transcripts ADD COLUMN {col} INTEGER")
+
+        # The transcript as timed segments (one per normalized caption line; their
+        # texts joined by spaces are transcripts.text), so a stretch of the video
+        # can be read — or a search hit located — without loading the whole text.
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS transcript_segments (
+                video_id    TEXT NOT NULL,
+                seq         INTEGER NOT NULL,
+                start_ms    INTEGER NOT NULL,
+                duration_ms INTEGER NOT NULL,
+                text        TEXT NOT NULL,
+                PRIMARY KEY (video_id, seq),
+                FOREIGN KEY(video_id) REFERENCES videos(video_id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_segments_time ON transcript_segments(video_id, start_ms)")
 
         c.execute("""
             CREATE TABLE IF NOT EXISTS summaries (
@@ -122,9 +259,11 @@ def init_db() -> None:
         """)
         c.execute("CREATE INDEX IF NOT EXISTS idx_quizzes_video ON quizzes(video_id)")
 
-        # The work queue. The worker picks rows where status='pending' and
-        # scheduled_at <= now, ordered by priority desc then scheduled_at.
-        # job_type: transcript (fetch+summarize+email)
+        # The work queue. Workers claim rows where scheduled_at <= now and status
+        # is 'pending' (or 'running' with an expired lease), ordered by priority
+        # desc then scheduled_at.
+        # job_type: transcript (YouTube fetch) -> summarize -> notify (email)
+        # and embed; each stage enqueues the next (see app.jobs).
         c.execute("""
             CREATE TABLE IF NOT EXISTS fetch_jobs (
                 id           INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -137,12 +276,121 @@ def init_db() -> None:
                 last_error   TEXT,
                 detail_level INTEGER NOT NULL DEFAULT 2,
                 send_email   INTEGER NOT NULL DEFAULT 1,
-                created_at   INTEGER DEFAULT (strftime('%s','now'))
+                created_at   INTEGER DEFAULT (strftime('%s','now')),
+                locked_until INTEGER
             )
         """)
+        # locked_until: lease expiry of a 'running' job. A worker that crashes
+        # mid-job stops renewing it, and the job becomes claimable again.
+        job_cols = {r["name"] for r in c.execute("PRAGMA table_info(fetch_jobs)").fetchall()}
+        if "locked_until" not in job_cols:
+            c.execute("ALTER TABLE fetch_jobs ADD COLUMN locked_until INTEGER")
+        # batch_name / batch_index: the Gemini batch job (and position in it) a
+        # summarize_batch job's prompt went out in, so after a restart it's
+        # polled again instead of submitted (and paid for) twice.
+        for col, decl in (("batch_name", "TEXT"), ("batch_index", "INTEGER")):
+            if col not in job_cols:
+                c.execute(f"ALTER TABLE fetch_jobs ADD COLUMN {col} {decl}")
         c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_pickup ON fetch_jobs(status, scheduled_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_type_pickup ON fetch_jobs(job_type, status, scheduled_at)")
+
+        # Per-channel RSS polling state: validators (so unchanged feeds come back
+        # as 304s) plus the upload-rate estimate that sets when it's next due.
+        # upload_rate is uploads/day; last_new_upload is the newest publish epoch.
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS feed_state (
+                channel_id      TEXT PRIMARY KEY,
+                etag            TEXT,
+                last_modified   TEXT,
+                last_checked    INTEGER,
+                last_new_upload INTEGER,
+                upload_rate     REAL,
+                next_check_at   INTEGER,
+                FOREIGN KEY(channel_id) REFERENCES channels(channel_id) ON DELETE CASCADE
+            )
+        """)
+        feed_cols = {r["name"] for r in c.execute("PRAGMA table_info(feed_state)").fetchall()}
+        for col, decl in (("last_new_upload", "INTEGER"), ("upload_rate", "REAL"),
+                          ("next_check_at", "INTEGER")):
+            if col not in feed_cols:
+                c.execute(f"ALTER TABLE feed_state ADD COLUMN {col} {decl}")
+
+        # Fetch cache: what the fetch stage pulled from YouTube — the info-dict
+        # subset it needs and the raw caption payload per track — so retries and
+        # re-summaries within FETCH_CACHE_TTL_HOURS never hit YouTube again.
+        # Caption payloads carry their sha256 (content address).
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS fetch_cache (
+                video_id   TEXT PRIMARY KEY,
+                info_json  TEXT NOT NULL,
+                fetched_at INTEGER NOT NULL
+            )
+        """)
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS caption_cache (
+                video_id   TEXT NOT NULL,
+                lang       TEXT NOT NULL,
+                source     TEXT NOT NULL,
+                fmt        TEXT NOT NULL,
+                sha256     TEXT NOT NULL,
+                raw        BLOB NOT NULL,
+                fetched_at INTEGER NOT NULL,
+                PRIMARY KEY (video_id, lang, source)
+            )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_fetch_cache_age ON fetch_cache(fetched_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_caption_cache_age ON caption_cache(fetched_at)")
 
-        # Single-row global backoff state (item 6).
+        # Partial output of a summary still being generated (streamed), so the UI
+        # can show it as it grows. Dropped once the summary is saved or fails;
+        # started_at tells a watcher that generation restarted.
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS summary_drafts (
+                video_id     TEXT PRIMARY KEY,
+                detail_level INTEGER,
+                text         TEXT NOT NULL,
+                started_at   INTEGER NOT NULL,
+                updated_at   INTEGER NOT NULL
+            )
+        """)
+
+        # Vectors for semantic search (app.search): a video's latest summary
+        # (kind 'summary') and its transcript in passages (kind 'transcript',
+        # with where in the video each one is), embedded by `model` — the
+        # embedder's name; vectors of different embedders never mix. vector is
+        # float32 (native byte order), L2-normalized. Re-embedding a video
+        # replaces its rows, so ids only grow: the in-memory index
+        # (app.db.vector_index) loads what's new by id.
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                id        INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id  TEXT NOT NULL,
+                model     TEXT NOT NULL,
+                kind      TEXT NOT NULL,
+                start_ms  INTEGER,
+                end_ms    INTEGER,
+                vector    BLOB NOT NULL,
+                FOREIGN KEY(video_id) REFERENCES videos(video_id) ON DELETE CASCADE
+            )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_video ON embeddings(video_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_model ON embeddings(model, id)")
+
+        # LLM result cache: finished summaries keyed by a hash of everything that
+        # went into the prompt. Bounded by LLM_CACHE_MAX_ENTRIES, evicted LRU.
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key    TEXT PRIMARY KEY,
+                output       TEXT NOT NULL,
+                model        TEXT,
+                created_at   INTEGER NOT NULL,
+                last_used_at INTEGER NOT NULL,
+                hits         INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_lru ON llm_cache(last_used_at)")
+
+        # Single-row global backoff state (item 6). Legacy — see egress_state.
         c.execute("""
             CREATE TABLE IF NOT EXISTS rate_limit_state (
                 id              INTEGER PRIMARY KEY CHECK (id = 1),
@@ -154,37 +402,30 @@ def init_db() -> None:
         """)
         c.execute("INSERT OR IGNORE INTO rate_limit_state (id, blocked_until, backoff_level) VALUES (1, 0, 0)")
 
-        # ── FTS5 search indexes ───────────────────────────────
+        # Backoff state per egress identity (one row per worker lane). Supersedes
+        # the single rate_limit_state row, whose contents seed the 'default' lane
+        # once on existing installs.
         c.execute("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts
-            USING fts5(video_id UNINDEXED, text, content='transcripts', content_rowid='rowid')
+            CREATE TABLE IF NOT EXISTS egress_state (
+                lane            TEXT PRIMARY KEY,
+                blocked_until   INTEGER NOT NULL DEFAULT 0,
+                backoff_level   INTEGER NOT NULL DEFAULT 0,
+                last_block_at   INTEGER,
+                last_success_at INTEGER,
+                version         INTEGER NOT NULL DEFAULT 0
+            )
         """)
+        # version: bumped on every write, so a process's in-memory copy (see
+        # app.youtube.gate) can tell cheaply when another process changed it.
+        egress_cols = {r["name"] for r in c.execute("PRAGMA table_info(egress_state)").fetchall()}
+        if "version" not in egress_cols:
+            c.execute("ALTER TABLE egress_state ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
         c.execute("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS summaries_fts
-            USING fts5(video_id UNINDEXED, summary_md, content='summaries', content_rowid='id')
+            INSERT OR IGNORE INTO egress_state (lane, blocked_until, backoff_level, last_block_at, last_success_at)
+            SELECT 'default', blocked_until, backoff_level, last_block_at, last_success_at
+            FROM rate_limit_state WHERE id = 1
         """)
 
-        # Keep FTS in sync via triggers.
-        c.executescript("""
-            CREATE TRIGGER IF NOT EXISTS transcripts_ai AFTER INSERT ON transcripts BEGIN
-                INSERT INTO transcripts_fts(rowid, video_id, text) VALUES (new.rowid, new.video_id, new.text);
-            END;
-            CREATE TRIGGER IF NOT EXISTS transcripts_ad AFTER DELETE ON transcripts BEGIN
-                INSERT INTO transcripts_fts(transcripts_fts, rowid, video_id, text) VALUES ('delete', old.rowid, old.video_id, old.text);
-            END;
-            CREATE TRIGGER IF NOT EXISTS transcripts_au AFTER UPDATE ON transcripts BEGIN
-                INSERT INTO transcripts_fts(transcripts_fts, rowid, video_id, text) VALUES ('delete', old.rowid, old.video_id, old.text);
-                INSERT INTO transcripts_fts(rowid, video_id, text) VALUES (new.rowid, new.video_id, new.text);
-            END;
-
-            CREATE TRIGGER IF NOT EXISTS summaries_ai AFTER INSERT ON summaries BEGIN
-                INSERT INTO summaries_fts(rowid, video_id, summary_md) VALUES (new.id, new.video_id, new.summary_md);
-            END;
-            CREATE TRIGGER IF NOT EXISTS summaries_ad AFTER DELETE ON summaries BEGIN
-                INSERT INTO summaries_fts(summaries_fts, rowid, video_id, summary_md) VALUES ('delete', old.id, old.video_id, old.summary_md);
-            END;
-            CREATE TRIGGER IF NOT EXISTS summaries_au AFTER UPDATE ON summaries BEGIN
-                INSERT INTO summaries_fts(summaries_fts, rowid, video_id, summary_md) VALUES ('delete', old.id, old.video_id, old.summary_md);
-                INSERT INTO summaries_fts(rowid, video_id, summary_md) VALUES (new.id, new.video_id, new.summary_md);
-            END;
-        """)
+        # ── FTS5 search indexes (schema + upkeep: app.db.search_index) ──
+        from app.db import search_index  # it imports db() from here
+        search_index.ensure(conn)
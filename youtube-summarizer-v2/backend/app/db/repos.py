@@ -1,10 +1,14 @@
 """Data-access functions. Thin wrappers around SQL so the rest of the app never
 writes raw queries. Grouped by entity.
 """
+import hashlib
 import json
+import re
 import time
 from typing import Any, Optional
 
+from app import wakeup
+from app.config import JOB_LEASE_SECONDS
 from app.db.database import db
 
 
@@ -51,6 +55,34 @@ def get_channel_ids(active_only: bool = True) -> list[str]:
     return [c["channel_id"] for c in get_channels(active_only)]
 
 
+# ── Feed state (RSS conditional GET) ──────────────────────────
+def get_feed_states() -> dict[str, dict]:
+    with db() as conn:
+        rows = conn.execute("SELECT * FROM feed_state").fetchall()
+        return {r["channel_id"]: dict(r) for r in rows}
+
+
+def save_feed_state(channel_id: str, *, etag: Optional[str], last_modified: Optional[str],
+                    next_check_at: int, upload_rate: Optional[float] = None,
+                    last_new_upload: Optional[int] = None) -> None:
+    """Record a feed check. A None validator/rate/upload time keeps the stored
+    value (a 304 may omit validators and tells us nothing new about uploads)."""
+    with db() as conn:
+        conn.execute(
+            "INSERT INTO feed_state (channel_id, etag, last_modified, last_checked, "
+            "last_new_upload, upload_rate, next_check_at) "
+            "VALUES (?, ?, ?, strftime('%s','now'), ?, ?, ?) "
+            "ON CONFLICT(channel_id) DO UPDATE SET "
+            "etag=COALESCE(excluded.etag, feed_state.etag), "
+            "last_modified=COALESCE(excluded.last_modified, feed_state.last_modified), "
+            "last_checked=excluded.last_checked, "
+            "last_new_upload=COALESCE(excluded.last_new_upload, feed_state.last_new_upload), "
+            "upload_rate=COALESCE(excluded.upload_rate, feed_state.upload_rate), "
+            "next_check_at=excluded.next_check_at",
+            (channel_id, etag, last_modified, last_new_upload, upload_rate, next_check_at),
+        )
+
+
 # ── Channel filters (v1 semantics) ────────────────────────────
 def add_channel_filter(channel_id: str, value: str, field: str = "title",
                        match_type: str = "contains", action: str = "include") -> int:
@@ -103,6 +135,45 @@ def upsert_video(*, video_id: str, channel_id: Optional[str] = None, title: Opti
         )
 
 
+def save_discovered_videos(videos: list[dict]) -> list[dict]:
+    """Record one channel scan's worth of feed entries in a single transaction.
+
+    Each dict carries the video columns (video_id, channel_id, title,
+    channel_name, url, published_at, status, skip_reason); queued ones also
+    carry the job fields (scheduled_at, priority, detail_level, send_email).
+    Entries whose video_id is already known are dropped with one IN (...)
+    lookup; the rest are inserted with executemany. Returns the new entries."""
+    unique: dict[str, dict] = {}
+    for v in videos:
+        unique.setdefault(v["video_id"], v)
+    if not unique:
+        return []
+    with db() as conn:
+        ids = list(unique)
+        placeholders = ",".join("?" * len(ids))
+        existing = {r["video_id"] for r in conn.execute(
+            f"SELECT video_id FROM videos WHERE video_id IN ({placeholders})", ids
+        ).fetchall()}
+        new = [v for vid, v in unique.items() if vid not in existing]
+        conn.executemany(
+            """INSERT OR IGNORE INTO videos
+                   (video_id, channel_id, title, channel_name, url, published_at, status, skip_reason)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            [(v["video_id"], v.get("channel_id"), v.get("title"), v.get("channel_name"), v.get("url"),
+              v.get("published_at"), v["status"], v.get("skip_reason")) for v in new],
+        )
+        conn.executemany(
+            """INSERT INTO fetch_jobs (video_id, job_type, priority, scheduled_at, detail_level, send_email)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [(v["video_id"], v.get("job_type", "transcript"), v.get("priority", 0), v["scheduled_at"],
+              v.get("detail_level", 2), 1 if v.get("send_email", True) else 0)
+             for v in new if v["status"] == "queued"],
+        )
+    if any(v["status"] == "queued" for v in new):
+        wakeup.notify()
+    return new
+
+
 def set_video_status(video_id: str, status: str, skip_reason: Optional[str] = None) -> None:
     with db() as conn:
         conn.execute(
@@ -153,6 +224,17 @@ def get_video(video_id: str) -> Optional[dict]:
         return dict(row) if row else None
 
 
+def get_videos(video_ids: list[str]) -> dict[str, dict]:
+    """video_id -> row, for those of `video_ids` that exist."""
+    if not video_ids:
+        return {}
+    with db() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM videos WHERE video_id IN ({','.join('?' * len(video_ids))})", video_ids
+        ).fetchall()
+        return {r["video_id"]: dict(r) for r in rows}
+
+
 def list_videos(*, status: Optional[str] = None, channel_id: Optional[str] = None,
                 limit: int = 50, offset: int = 0) -> list[dict]:
     clauses, params = [], []
@@ -172,14 +254,26 @@ def list_videos(*, status: Optional[str] = None, channel_id: Optional[str] = Non
 
 
 # ── Transcripts ───────────────────────────────────────────────
-def save_transcript(video_id: str, text: str, lang: Optional[str] = None, source: Optional[str] = None) -> None:
+def save_transcript(video_id: str, text: str, lang: Optional[str] = None, source: Optional[str] = None,
+                    *, raw_tokens: Optional[int] = None, tokens: Optional[int] = None,
+                    segments: Optional[list[tuple[int, int, str]]] = None) -> None:
+    """Store a transcript and (replacing any old ones) its timed
+    (start_ms, duration_ms, text) segments, in one transaction."""
     with db() as conn:
         conn.execute(
-            "INSERT INTO transcripts (video_id, lang, source, text) VALUES (?, ?, ?, ?) "
+            "INSERT INTO transcripts (video_id, lang, source, text, raw_tokens, tokens) VALUES (?, ?, ?, ?, ?, ?) "
             "ON CONFLICT(video_id) DO UPDATE SET text=excluded.text, lang=excluded.lang, "
-            "source=excluded.source, fetched_at=strftime('%s','now')",
-            (video_id, lang, source, text),
+            "source=excluded.source, raw_tokens=excluded.raw_tokens, tokens=excluded.tokens, "
+            "fetched_at=strftime('%s','now')",
+            (video_id, lang, source, text, raw_tokens, tokens),
         )
+        conn.execute("DELETE FROM transcript_segments WHERE video_id = ?", (video_id,))
+        if segments:
+            conn.executemany(
+                "INSERT INTO transcript_segments (video_id, seq, start_ms, duration_ms, text) VALUES (?, ?, ?, ?, ?)",
+                [(video_id, seq, start_ms, duration_ms, seg_text)
+                 for seq, (start_ms, duration_ms, seg_text) in enumerate(segments)],
+            )
 
 
 def get_transcript(video_id: str) -> Optional[dict]:
@@ -188,6 +282,125 @@ def get_transcript(video_id: str) -> Optional[dict]:
         return dict(row) if row else None
 
 
+def get_transcript_info(video_id: str) -> Optional[dict]:
+    """A transcript's row without its text, plus the text's length in characters."""
+    with db() as conn:
+        row = conn.execute(
+            "SELECT video_id, lang, source, fetched_at, raw_tokens, tokens, length(text) AS length "
+            "FROM transcripts WHERE video_id = ?",
+            (video_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+
+def get_transcript_range(video_id: str, offset: int = 0, length: Optional[int] = None) -> Optional[dict]:
+    """get_transcript_info() plus characters [offset, offset + length) of the
+    text (to the end if length is None) as "text" — from one row read, so the
+    range always belongs to the version described. Sliced in SQLite, so the rest
+    of the text never leaves the database."""
+    with db() as conn:
+        row = conn.execute(
+            "SELECT video_id, lang, source, fetched_at, raw_tokens, tokens, length(text) AS length, "
+            "substr(text, ?, coalesce(?, length(text))) AS text FROM transcripts WHERE video_id = ?",
+            (offset + 1, length, video_id),
+        ).fetchone()
+        return dict(row) if row else None
+
+
+def get_transcript_segments(video_id: str, *, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                            offset: int = 0, limit: int = 500) -> list[dict]:
+    """A page of a transcript's segments in order. With start_ms / end_ms, only
+    segments overlapping that stretch of the video [start_ms, end_ms)."""
+    where, params = ["video_id = ?"], [video_id]
+    if end_ms is not None:
+        where.append("start_ms < ?")
+        params.append(end_ms)
+    if start_ms is not None:
+        where.append("start_ms + duration_ms > ?")
+        params.append(start_ms)
+    with db() as conn:
+        rows = conn.execute(
+            f"SELECT seq, start_ms, duration_ms, text FROM transcript_segments WHERE {' AND '.join(where)} "
+            "ORDER BY seq LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def count_transcript_segments(video_id: str) -> int:
+    with db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM transcript_segments WHERE video_id = ?",
+                            (video_id,)).fetchone()[0]
+
+
+def find_transcript_moment(video_id: str, phrase: str) -> Optional[int]:
+    """start_ms of the first segment containing `phrase` (case-insensitive for
+    ASCII), or None."""
+    pattern = "%" + phrase.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    with db() as conn:
+        row = conn.execute(
+            "SELECT start_ms FROM transcript_segments WHERE video_id = ? AND text LIKE ? ESCAPE '\\' "
+            "ORDER BY seq LIMIT 1",
+            (video_id, pattern),
+        ).fetchone()
+        return row["start_ms"] if row else None
+
+
+def transcript_reduction() -> dict:
+    """Totals of what transcript normalization removed, over the transcripts
+    that recorded their sizes."""
+    with db() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) AS n, COALESCE(SUM(raw_tokens), 0) AS raw, COALESCE(SUM(tokens), 0) AS kept "
+            "FROM transcripts WHERE raw_tokens IS NOT NULL AND tokens IS NOT NULL"
+        ).fetchone()
+    raw, kept = row["raw"], row["kept"]
+    return {"transcripts": row["n"], "raw_tokens": raw, "tokens": kept,
+            "reduction": round(1 - kept / raw, 4) if raw else None}
+
+
+# ── Fetch cache (skip YouTube on retries) ─────────────────────
+def save_fetch_cache(video_id: str, info: dict, *, lang: str, source: str, fmt: str, raw: bytes,
+                     max_age_seconds: int) -> None:
+    """Store a successful fetch (info subset + raw caption track), dropping any
+    entries older than max_age_seconds while we're at it."""
+    now = _now()
+    with db() as conn:
+        conn.execute(
+            "INSERT INTO fetch_cache (video_id, info_json, fetched_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(video_id) DO UPDATE SET info_json=excluded.info_json, fetched_at=excluded.fetched_at",
+            (video_id, json.dumps(info), now),
+        )
+        conn.execute(
+            "INSERT INTO caption_cache (video_id, lang, source, fmt, sha256, raw, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(video_id, lang, source) DO UPDATE SET fmt=excluded.fmt, sha256=excluded.sha256, "
+            "raw=excluded.raw, fetched_at=excluded.fetched_at",
+            (video_id, lang, source, fmt, hashlib.sha256(raw).hexdigest(), raw, now),
+        )
+        cutoff = now - max_age_seconds
+        conn.execute("DELETE FROM fetch_cache WHERE fetched_at < ?", (cutoff,))
+        conn.execute("DELETE FROM caption_cache WHERE fetched_at < ?", (cutoff,))
+
+
+def get_fetch_cache(video_id: str, max_age_seconds: int) -> Optional[dict]:
+    """The cached fetch for a video if both its info and a caption track are
+    younger than max_age_seconds: {info, lang, source, fmt, raw}. Else None."""
+    cutoff = _now() - max_age_seconds
+    with db() as conn:
+        row = conn.execute(
+            """SELECT f.info_json, c.lang, c.source, c.fmt, c.raw
+               FROM fetch_cache f JOIN caption_cache c ON c.video_id = f.video_id
+               WHERE f.video_id = ? AND f.fetched_at >= ? AND c.fetched_at >= ?
+               ORDER BY c.fetched_at DESC LIMIT 1""",
+            (video_id, cutoff, cutoff),
+        ).fetchone()
+        if not row:
+            return None
+        return {"info": json.loads(row["info_json"]), "lang": row["lang"], "source": row["source"],
+                "fmt": row["fmt"], "raw": bytes(row["raw"])}
+
+
 # ── Summaries ─────────────────────────────────────────────────
 def save_summary(video_id: str, summary_md: str, detail_level: int = 2, model: Optional[str] = None) -> int:
     with db() as conn:
@@ -195,6 +408,8 @@ def save_summary(video_id: str, summary_md: str, detail_level: int = 2, model: O
             "INSERT INTO summaries (video_id, detail_level, model, summary_md) VALUES (?, ?, ?, ?)",
             (video_id, detail_level, model, summary_md),
         )
+        # The streamed draft (if any) is superseded in the same transaction.
+        conn.execute("DELETE FROM summary_drafts WHERE video_id = ?", (video_id,))
         return cur.lastrowid
 
 
@@ -231,6 +446,67 @@ def list_summaries(*, limit: int = 50, offset: int = 0) -> list[dict]:
         return [dict(r) for r in rows]
 
 
+def save_summary_draft(video_id: str, text: str, *, detail_level: int, started_at: int) -> None:
+    with db() as conn:
+        conn.execute(
+            "INSERT INTO summary_drafts (video_id, detail_level, text, started_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(video_id) DO UPDATE SET detail_level=excluded.detail_level, text=excluded.text, "
+            "started_at=excluded.started_at, updated_at=excluded.updated_at",
+            (video_id, detail_level, text, started_at, _now()),
+        )
+
+
+def get_summary_draft(video_id: str) -> Optional[dict]:
+    with db() as conn:
+        row = conn.execute("SELECT * FROM summary_drafts WHERE video_id = ?", (video_id,)).fetchone()
+        return dict(row) if row else None
+
+
+def delete_summary_draft(video_id: str) -> None:
+    with db() as conn:
+        conn.execute("DELETE FROM summary_drafts WHERE video_id = ?", (video_id,))
+
+
+# ── LLM result cache (LRU) ────────────────────────────────────
+def get_llm_cache(cache_key: str) -> Optional[dict]:
+    """The cached {output, model} for this key, marking it most recently used."""
+    with db() as conn:
+        row = conn.execute(
+            "UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ? "
+            "RETURNING output, model",
+            (_now(), cache_key),
+        ).fetchone()
+        return dict(row) if row else None
+
+
+def put_llm_cache(cache_key: str, output: str, *, model: Optional[str], max_entries: int) -> None:
+    """Store a result, then evict least-recently-used entries beyond max_entries."""
+    now = _now()
+    with db() as conn:
+        conn.execute(
+            "INSERT INTO llm_cache (cache_key, output, model, created_at, last_used_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(cache_key) DO UPDATE SET output=excluded.output, model=excluded.model, "
+            "last_used_at=excluded.last_used_at",
+            (cache_key, output, model, now, now),
+        )
+        conn.execute(
+            "DELETE FROM llm_cache WHERE cache_key IN ("
+            "  SELECT cache_key FROM llm_cache ORDER BY last_used_at DESC, created_at DESC"
+            "  LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+
+
+def llm_cache_size() -> dict:
+    with db() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(LENGTH(output)), 0) AS bytes FROM llm_cache"
+        ).fetchone()
+        return dict(row)
+
+
 # ── Quizzes ───────────────────────────────────────────────────
 def save_quiz(video_id: str, questions: list[dict], model: Optional[str] = None) -> int:
     with db() as conn:
@@ -254,37 +530,170 @@ def get_latest_quiz(video_id: str) -> Optional[dict]:
 
 
 # ── Search (FTS5) ─────────────────────────────────────────────
-def search(query: str, limit: int = 30) -> list[dict]:
-    """Full-text search over summaries and transcripts. Returns one row per video
-    with a snippet and which source(s) matched."""
+# snippet() marks each matched term with control characters that never occur in
+# caption text (transcripts keep literal "[mm:ss]" markers), so matches can be
+# told apart from them. Returned snippets keep them; the client renders them.
+_HIT_OPEN, _HIT_CLOSE = "\x02", "\x03"
+_SNIPPET_HIT_RE = re.compile(f"{_HIT_OPEN}([^{_HIT_OPEN}{_HIT_CLOSE}]+){_HIT_CLOSE}")
+
+
+def _transcript_hit_ms(video_id: str, snippet: str) -> Optional[int]:
+    """Where in the video a transcript snippet's first locatable match is: the
+    start of the first segment holding a highlighted phrase (or, for a phrase
+    that spans segments, its first word)."""
+    for phrase in _SNIPPET_HIT_RE.findall(snippet):
+        for candidate in dict.fromkeys((phrase, phrase.split()[0] if phrase.split() else "")):
+            if candidate:
+                ms = find_transcript_moment(video_id, candidate)
+                if ms is not None:
+                    return ms
+    return None
+
+
+def _snippets(conn, fts: str, query: str, rowids: list[int]) -> dict[int, str]:
+    """snippet() for just these rows of an FTS index (rowid-constrained MATCH)."""
+    if not rowids:
+        return {}
+    rows = conn.execute(
+        f"SELECT rowid, snippet({fts}, -1, ?, ?, ' … ', 12) AS snippet FROM {fts} "
+        f"WHERE {fts} MATCH ? AND rowid IN ({','.join('?' * len(rowids))})",
+        (_HIT_OPEN, _HIT_CLOSE, query, *rowids),
+    ).fetchall()
+    return {r["rowid"]: r["snippet"] for r in rows}
+
+
+def search_hits(query: str, limit: int = 30, *, after: Optional[tuple[float, str]] = None) -> list[dict]:
+    """The ranking half of search(): one row per matching video, best first
+    (bm25 rank, then video_id), with its best hit and which source(s) matched —
+    no snippets. `after` is the (rank, video_id) of the last row of the previous
+    page: results continue from there (keyset pagination)."""
+    where, params = "", []
+    if after is not None:
+        where = "WHERE b.rank > ? OR (b.rank = ? AND b.video_id > ?)"
+        params = [after[0], after[0], after[1]]
     with db() as conn:
         rows = conn.execute(
-            """
+            f"""
             WITH hits AS (
-                SELECT video_id, 'summary' AS source,
-                       snippet(summaries_fts, 1, '[', ']', ' … ', 12) AS snippet,
+                SELECT s.video_id, 'summary' AS source, summaries_fts.rowid AS hit,
                        bm25(summaries_fts) AS rank
-                FROM summaries_fts WHERE summaries_fts MATCH ?
+                FROM summaries_fts JOIN summaries s ON s.id = summaries_fts.rowid
+                WHERE summaries_fts MATCH ?
                 UNION ALL
-                SELECT video_id, 'transcript' AS source,
-                       snippet(transcripts_fts, 1, '[', ']', ' … ', 12) AS snippet,
+                SELECT t.video_id, 'transcript' AS source, transcripts_fts.rowid AS hit,
                        bm25(transcripts_fts) AS rank
-                FROM transcripts_fts WHERE transcripts_fts MATCH ?
+                FROM transcripts_fts JOIN transcripts t ON t.rowid = transcripts_fts.rowid
+                WHERE transcripts_fts MATCH ?
+            ),
+            best AS (
+                -- With a single MIN(), SQLite takes the bare columns (source,
+                -- hit) from the row holding the minimum: each video's best hit.
+                SELECT video_id, MIN(rank) AS rank, source, hit,
+                       GROUP_CONCAT(DISTINCT source) AS sources
+                FROM hits GROUP BY video_id
             )
-            SELECT h.video_id, MIN(h.rank) AS rank,
-                   GROUP_CONCAT(DISTINCT h.source) AS sources,
-                   (SELECT snippet FROM hits h2 WHERE h2.video_id = h.video_id ORDER BY rank LIMIT 1) AS snippet,
-                   v.title, v.channel_name, v.url
-            FROM hits h JOIN videos v ON v.video_id = h.video_id
-            GROUP BY h.video_id
-            ORDER BY rank ASC
+            SELECT b.video_id, b.rank, b.source, b.hit, b.sources, v.title, v.channel_name, v.url
+            FROM best b JOIN videos v ON v.video_id = b.video_id
+            {where}
+            ORDER BY b.rank ASC, b.video_id ASC
             LIMIT ?
             """,
-            (query, query, limit),
+            (query, query, *params, limit),
         ).fetchall()
         return [dict(r) for r in rows]
 
 
+def search_snippets(query: str, hits: list[dict]) -> list[dict]:
+    """The snippet half of search(): search_hits() rows made into results, with
+    the best hit's snippet and — for a transcript match — the moment in the
+    video (timestamp_ms) it was found at."""
+    with db() as conn:
+        # A transcript snippet for every video the transcript matched (for its
+        # timestamp), and the best hit's snippet as the one shown.
+        transcript_rowids: dict[str, int] = {h["video_id"]: h["hit"] for h in hits if h["source"] == "transcript"}
+        others = [h["video_id"] for h in hits if h["source"] != "transcript" and "transcript" in h["sources"]]
+        if others:
+            transcript_rowids.update(
+                (r["video_id"], r["rowid"]) for r in conn.execute(
+                    f"SELECT rowid, video_id FROM transcripts WHERE video_id IN ({','.join('?' * len(others))})",
+                    others,
+                ).fetchall()
+            )
+        transcript_snippets = _snippets(conn, "transcripts_fts", query, list(transcript_rowids.values()))
+        summary_snippets = _snippets(conn, "summaries_fts", query,
+                                     [h["hit"] for h in hits if h["source"] == "summary"])
+
+    results = []
+    for h in hits:
+        source, hit = h.pop("source"), h.pop("hit")
+        transcript_snippet = transcript_snippets.get(transcript_rowids.get(h["video_id"], -1))
+        h["snippet"] = (transcript_snippet if source == "transcript" else summary_snippets.get(hit)) or ""
+        h["timestamp_ms"] = _transcript_hit_ms(h["video_id"], transcript_snippet) if transcript_snippet else None
+        results.append(h)
+    return results
+
+
+def search(query: str, limit: int = 30, *, after: Optional[tuple[float, str]] = None) -> list[dict]:
+    """Full-text search over summaries and transcripts: one row per video, best
+    first, with a snippet, which source(s) matched and, for a transcript match,
+    timestamp_ms. `after` continues from a previous page (see search_hits()).
+
+    Ranking reads only the index; snippets — the expensive part, a pass over the
+    document text — are built afterwards, for just the rows being returned."""
+    return search_snippets(query, search_hits(query, limit, after=after))
+
+
+# ── Embeddings (semantic search) ──────────────────────────────
+def save_embeddings(video_id: str, model: str, rows: list[tuple[str, Optional[int], Optional[int], bytes]]) -> None:
+    """Replace a video's vectors (of any model) with `rows`: (kind, start_ms,
+    end_ms, float32 vector bytes)."""
+    with db() as conn:
+        conn.execute("DELETE FROM embeddings WHERE video_id = ?", (video_id,))
+        conn.executemany(
+            "INSERT INTO embeddings (video_id, model, kind, start_ms, end_ms, vector) VALUES (?, ?, ?, ?, ?, ?)",
+            [(video_id, model, kind, start_ms, end_ms, vector) for kind, start_ms, end_ms, vector in rows],
+        )
+
+
+def embedding_extent(model: str) -> tuple[int, int]:
+    """(row count, highest id) of a model's vectors."""
+    with db() as conn:
+        row = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM embeddings WHERE model = ?",
+                           (model,)).fetchone()
+        return row[0], row[1]
+
+
+def embeddings_after(model: str, after_id: int) -> list[dict]:
+    """A model's vectors with id > after_id, in id order."""
+    with db() as conn:
+        rows = conn.execute(
+            "SELECT id, video_id, kind, start_ms, end_ms, vector FROM embeddings "
+            "WHERE model = ? AND id > ? ORDER BY id",
+            (model, after_id),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def embedding_ids(model: str) -> list[int]:
+    with db() as conn:
+        return [r[0] for r in conn.execute("SELECT id FROM embeddings WHERE model = ?", (model,)).fetchall()]
+
+
+def videos_missing_embeddings(model: str) -> list[str]:
+    """Summarized videos with no vectors from `model` and no embed job queued."""
+    with db() as conn:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT s.video_id FROM summaries s
+            WHERE NOT EXISTS (SELECT 1 FROM embeddings e WHERE e.video_id = s.video_id AND e.model = ?)
+              AND NOT EXISTS (SELECT 1 FROM fetch_jobs j WHERE j.video_id = s.video_id
+                              AND j.job_type = 'embed' AND j.status IN ('pending', 'running'))
+            """,
+            (model,),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+
 # ── Fetch jobs (the work queue) ───────────────────────────────
 def enqueue_job(*, video_id: str, scheduled_at: int, job_type: str = "transcript",
                 priority: int = 0, detail_level: int = 2, send_email: bool = True) -> int:
@@ -294,45 +703,114 @@ def enqueue_job(*, video_id: str, scheduled_at: int, job_type: str = "transcript
                VALUES (?, ?, ?, ?, ?, ?)""",
             (video_id, job_type, priority, scheduled_at, detail_level, 1 if send_email else 0),
         )
-        return cur.lastrowid
+    wakeup.notify()
+    return cur.lastrowid
+
+
+def claim_due_jobs(limit: int = 1, *, job_types: tuple[str, ...] = ("transcript",),
+                   lease_seconds: int = JOB_LEASE_SECONDS, now: Optional[int] = None) -> list[dict]:
+    """Atomically claim up to `limit` due jobs of `job_types`: mark them 'running',
+    charge an attempt, and lease them until now + lease_seconds. One
+    UPDATE ... RETURNING statement, so concurrent consumers (lanes, stage pools,
+    other processes) can never claim the same job. A 'running' job whose lease
+    has lapsed — its worker crashed — is claimable again. Returns rows with the
+    updated values, highest priority then earliest scheduled first."""
+    now = now or _now()
+    types = ",".join("?" * len(job_types))
+    with db() as conn:
+        rows = conn.execute(
+            f"""UPDATE fetch_jobs
+                SET status = 'running', attempts = attempts + 1, locked_until = ?
+                WHERE id IN (
+                    SELECT id FROM fetch_jobs
+                    WHERE job_type IN ({types}) AND scheduled_at <= ?
+                      AND (status = 'pending'
+                           OR (status = 'running' AND COALESCE(locked_until, 0) < ?))
+                    ORDER BY priority DESC, scheduled_at ASC
+                    LIMIT ?
+                )
+                RETURNING *""",
+            (now + lease_seconds, *job_types, now, now, max(1, limit)),
+        ).fetchall()
+    jobs = [dict(r) for r in rows]
+    jobs.sort(key=lambda j: (-j["priority"], j["scheduled_at"]))
+    return jobs
+
+
+def claim_due_job(now: Optional[int] = None, job_types: tuple[str, ...] = ("transcript",)) -> Optional[dict]:
+    """Claim the single next due job (see claim_due_jobs), or None."""
+    jobs = claim_due_jobs(1, job_types=job_types, now=now)
+    return jobs[0] if jobs else None
+
+
+def next_due_at(job_types: tuple[str, ...]) -> Optional[int]:
+    """Epoch when the earliest job of `job_types` becomes claimable — a pending
+    job's scheduled_at or a running job's lease expiry — or None if there is none.
+    Lets idle workers sleep exactly until there's work instead of polling."""
+    types = ",".join("?" * len(job_types))
+    with db() as conn:
+        row = conn.execute(
+            f"""SELECT MIN(CASE WHEN status = 'pending' THEN scheduled_at
+                                ELSE MAX(scheduled_at, COALESCE(locked_until, 0)) END) AS due
+                FROM fetch_jobs
+                WHERE job_type IN ({types}) AND status IN ('pending', 'running')""",
+            job_types,
+        ).fetchone()
+        return row["due"]
 
 
-def claim_due_job(now: Optional[int] = None) -> Optional[dict]:
-    """Atomically grab the next due pending job and mark it 'running'.
-    Returns None if nothing is due. Highest priority, then earliest scheduled."""
+def due_job_backlog(job_types: tuple[str, ...], now: Optional[int] = None) -> tuple[int, Optional[int]]:
+    """(number of jobs of `job_types` claimable right now, earliest scheduled_at
+    among them) — lets a batching worker decide whether to wait for more."""
     now = now or _now()
+    types = ",".join("?" * len(job_types))
     with db() as conn:
         row = conn.execute(
-            """SELECT * FROM fetch_jobs
-               WHERE status = 'pending' AND scheduled_at <= ?
-               ORDER BY priority DESC, scheduled_at ASC LIMIT 1""",
-            (now,),
+            f"""SELECT COUNT(*) AS n, MIN(scheduled_at) AS oldest FROM fetch_jobs
+                WHERE job_type IN ({types}) AND scheduled_at <= ?
+                  AND (status = 'pending' OR (status = 'running' AND COALESCE(locked_until, 0) < ?))""",
+            (*job_types, now, now),
         ).fetchone()
-        if not row:
-            return None
+        return row["n"], row["oldest"]
+
+
+def renew_job_lease(job_id: int, lease_seconds: int = JOB_LEASE_SECONDS) -> None:
+    """Heartbeat for a long-running job so its lease doesn't lapse mid-work."""
+    with db() as conn:
         conn.execute(
-            "UPDATE fetch_jobs SET status='running', attempts=attempts+1 WHERE id=?", (row["id"],)
+            "UPDATE fetch_jobs SET locked_until = ? WHERE id = ? AND status = 'running'",
+            (_now() + lease_seconds, job_id),
         )
-        return dict(row)
+
+
+def set_jobs_batch(batch_name: str, job_ids: list[int]) -> None:
+    """Record that these jobs' prompts went out in Gemini batch job `batch_name`,
+    in this order (batch_index = position)."""
+    with db() as conn:
+        conn.executemany("UPDATE fetch_jobs SET batch_name = ?, batch_index = ? WHERE id = ?",
+                         [(batch_name, i, job_id) for i, job_id in enumerate(job_ids)])
 
 
 def complete_job(job_id: int) -> None:
     with db() as conn:
-        conn.execute("UPDATE fetch_jobs SET status='done', last_error=NULL WHERE id=?", (job_id,))
+        conn.execute("UPDATE fetch_jobs SET status='done', last_error=NULL, locked_until=NULL WHERE id=?",
+                     (job_id,))
 
 
 def fail_job(job_id: int, error: str) -> None:
     with db() as conn:
-        conn.execute("UPDATE fetch_jobs SET status='failed', last_error=? WHERE id=?", (error, job_id))
+        conn.execute("UPDATE fetch_jobs SET status='failed', last_error=?, locked_until=NULL WHERE id=?",
+                     (error, job_id))
 
 
 def reschedule_job(job_id: int, scheduled_at: int, error: Optional[str] = None) -> None:
     """Put a job back to pending for a later time (used on transient errors / retry-later)."""
     with db() as conn:
         conn.execute(
-            "UPDATE fetch_jobs SET status='pending', scheduled_at=?, last_error=? WHERE id=?",
+            "UPDATE fetch_jobs SET status='pending', scheduled_at=?, last_error=?, locked_until=NULL WHERE id=?",
             (scheduled_at, error, job_id),
         )
+    wakeup.notify()
 
 
 def reschedule_after_block(job_id: int, scheduled_at: int) -> None:
@@ -340,10 +818,11 @@ def reschedule_after_block(job_id: int, scheduled_at: int) -> None:
     fault, so refund the attempt that claim_due_job charged for it."""
     with db() as conn:
         conn.execute(
-            "UPDATE fetch_jobs SET status='pending', scheduled_at=?, "
+            "UPDATE fetch_jobs SET status='pending', scheduled_at=?, locked_until=NULL, "
             "attempts=MAX(0, attempts-1), last_error='blocked: backing off' WHERE id=?",
             (scheduled_at, job_id),
         )
+    wakeup.notify()
 
 
 def prune_jobs(keep_done_after: int) -> int:
@@ -356,10 +835,18 @@ def prune_jobs(keep_done_after: int) -> int:
         return cur.rowcount
 
 
+# Stages queued once the video is done (its email, its embedding): they don't
+# keep the video "in the pipeline", and removing it from the queue leaves them be.
+_POST_VIDEO_JOB_TYPES = "('notify', 'embed')"
+
+
 def has_pending_job(video_id: str) -> bool:
+    """Whether the video is still going through the pipeline (post-video stages
+    don't count, see _POST_VIDEO_JOB_TYPES)."""
     with db() as conn:
         return conn.execute(
-            "SELECT 1 FROM fetch_jobs WHERE video_id=? AND status IN ('pending','running')",
+            "SELECT 1 FROM fetch_jobs WHERE video_id=? AND status IN ('pending','running') "
+            f"AND job_type NOT IN {_POST_VIDEO_JOB_TYPES}",
             (video_id,),
         ).fetchone() is not None
 
@@ -367,14 +854,15 @@ def has_pending_job(video_id: str) -> bool:
 def upcoming_jobs(limit: int = 100) -> list[dict]:
     """Pending jobs joined with their video info, in the order the worker will
     claim them (highest priority first, then earliest scheduled). Used to show
-    when each video is expected to be processed."""
+    when each video is expected to be processed, so post-video stages (an email
+    or embedding of a video that's done) are left out."""
     with db() as conn:
         rows = conn.execute(
-            """SELECT j.id, j.video_id, j.scheduled_at, j.priority, j.attempts,
+            f"""SELECT j.id, j.video_id, j.job_type, j.scheduled_at, j.priority, j.attempts,
                       v.title, v.channel_name, v.url
                FROM fetch_jobs j
                LEFT JOIN videos v ON v.video_id = j.video_id
-               WHERE j.status = 'pending'
+               WHERE j.status = 'pending' AND j.job_type NOT IN {_POST_VIDEO_JOB_TYPES}
                ORDER BY j.priority DESC, j.scheduled_at ASC
                LIMIT ?""",
             (limit,),
@@ -390,7 +878,8 @@ def cancel_pending_job(video_id: str) -> bool:
     scan — use 'Summarize now' to re-queue it intentionally."""
     with db() as conn:
         cur = conn.execute(
-            "DELETE FROM fetch_jobs WHERE video_id = ? AND status = 'pending'",
+            "DELETE FROM fetch_jobs WHERE video_id = ? AND status = 'pending' "
+            f"AND job_type NOT IN {_POST_VIDEO_JOB_TYPES}",
             (video_id,),
         )
         if cur.rowcount == 0:
@@ -409,24 +898,56 @@ def job_queue_stats() -> dict[str, int]:
         return {r["status"]: r["n"] for r in rows}
 
 
-# ── Rate limit / backoff state (item 6) ───────────────────────
-def get_rate_limit_state() -> dict:
+# ── Rate limit / backoff state (item 6), per egress lane ──────
+def _empty_rate_limit_state(lane: str) -> dict:
+    return {"lane": lane, "blocked_until": 0, "backoff_level": 0,
+            "last_block_at": None, "last_success_at": None, "version": 0}
+
+
+def get_rate_limit_state(lane: str = "default") -> dict:
     with db() as conn:
-        row = conn.execute("SELECT * FROM rate_limit_state WHERE id = 1").fetchone()
-        return dict(row)
+        row = conn.execute("SELECT * FROM egress_state WHERE lane = ?", (lane,)).fetchone()
+        return dict(row) if row else _empty_rate_limit_state(lane)
 
 
-def set_rate_limit_state(*, blocked_until: int, backoff_level: int, last_block_at: Optional[int] = None) -> None:
+def get_rate_limit_states() -> dict[str, dict]:
+    """Every lane's backoff row, keyed by lane."""
     with db() as conn:
-        conn.execute(
-            "UPDATE rate_limit_state SET blocked_until=?, backoff_level=?, last_block_at=COALESCE(?, last_block_at) WHERE id=1",
-            (blocked_until, backoff_level, last_block_at),
-        )
+        return {r["lane"]: dict(r) for r in conn.execute("SELECT * FROM egress_state").fetchall()}
 
 
-def mark_success() -> None:
-    """Clear backoff after a clean YouTube call."""
+def rate_limit_version() -> int:
+    """Sum of all lanes' write counters — changes whenever any lane's state does."""
     with db() as conn:
-        conn.execute(
-            "UPDATE rate_limit_state SET backoff_level=0, blocked_until=0, last_success_at=strftime('%s','now') WHERE id=1"
-        )
+        return int(conn.execute("SELECT COALESCE(SUM(version), 0) FROM egress_state").fetchone()[0])
+
+
+def set_rate_limit_state(*, blocked_until: int, backoff_level: int, last_block_at: Optional[int] = None,
+                         lane: str = "default") -> dict:
+    """Write a lane's backoff. Returns the stored row."""
+    with db() as conn:
+        row = conn.execute(
+            "INSERT INTO egress_state (lane, blocked_until, backoff_level, last_block_at, version) "
+            "VALUES (?, ?, ?, ?, 1) "
+            "ON CONFLICT(lane) DO UPDATE SET blocked_until=excluded.blocked_until, "
+            "backoff_level=excluded.backoff_level, "
+            "last_block_at=COALESCE(excluded.last_block_at, egress_state.last_block_at), "
+            "version=egress_state.version + 1 "
+            "RETURNING *",
+            (lane, blocked_until, backoff_level, last_block_at),
+        ).fetchone()
+        return dict(row)
+
+
+def mark_success(lane: str = "default") -> dict:
+    """Clear a lane's backoff after a clean YouTube call. Returns the stored row."""
+    with db() as conn:
+        row = conn.execute(
+            "INSERT INTO egress_state (lane, blocked_until, backoff_level, last_success_at, version) "
+            "VALUES (?, 0, 0, strftime('%s','now'), 1) "
+            "ON CONFLICT(lane) DO UPDATE SET backoff_level=0, blocked_until=0, "
+            "last_success_at=excluded.last_success_at, version=egress_state.version + 1 "
+            "RETURNING *",
+            (lane,),
+        ).fetchone()
+        return dict(row)
@@ -0,0 +1,198 @@
+"""The FTS5 search indexes over transcripts and summaries, and their upkeep.
+
+Both are external-content tables: they index one column (transcripts.text,
+summaries.summary_md) and read everything else from the content table by rowid,
+so nothing is stored twice. Triggers keep them in sync; an update only reindexes
+when the indexed text actually changed (a re-fetch that produced the same
+transcript costs nothing).
+
+FTS5 appends every change as a new index segment and merges them as it goes.
+Writes here are large documents arriving one at a time, so:
+  • automerge is raised (_AUTOMERGE) — writers merge less often and in bigger steps;
+  • crisismerge is raised (_CRISISMERGE) — a writer is only stalled by a forced
+    full merge when segments have really piled up;
+  • the scheduler calls `optimize()` every SEARCH_OPTIMIZE_INTERVAL_MINUTES while
+    no job is running: incremental merges, a few pages at a time and within
+    SEARCH_OPTIMIZE_BUDGET_SECONDS, that work the index down to one segment.
+
+Installs created before this layout indexed a redundant video_id column. They
+keep working (queries only ever join on rowid) until converted with
+
+    python -m app.db.search_index rebuild
+
+which recreates both indexes from their content tables. `stats` and
+`optimize` are available the same way.
+"""
+import argparse
+import json
+import sqlite3
+import time
+from typing import Optional
+
+from app.db.database import db
+
+# name -> (content table, its rowid column, the indexed column)
+INDEXES = {
+    "transcripts_fts": ("transcripts", "rowid", "text"),
+    "summaries_fts": ("summaries", "id", "summary_md"),
+}
+
+_AUTOMERGE = 8      # FTS5 default 4
+_CRISISMERGE = 32   # FTS5 default 16
+# Pages of merge work per step of optimize(); each step is its own transaction,
+# so writers are never held up for long.
+_MERGE_PAGES_PER_STEP = 500
+
+_last_maintenance: Optional[dict] = None
+
+
+def _columns(conn: sqlite3.Connection, name: str) -> list[str]:
+    return [r["name"] for r in conn.execute(f"PRAGMA table_info({name})").fetchall()]
+
+
+def _is_legacy(conn: sqlite3.Connection, name: str) -> bool:
+    return "video_id" in _columns(conn, name)
+
+
+def _create(conn: sqlite3.Connection, name: str) -> None:
+    content, rowid, col = INDEXES[name]
+    conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} "
+                 f"USING fts5({col}, content='{content}', content_rowid='{rowid}')")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {content}_ai AFTER INSERT ON {content} BEGIN
+            INSERT INTO {name}(rowid, {col}) VALUES (new.{rowid}, new.{col});
+        END""")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {content}_ad AFTER DELETE ON {content} BEGIN
+            INSERT INTO {name}({name}, rowid, {col}) VALUES ('delete', old.{rowid}, old.{col});
+        END""")
+    # Only when the indexed text itself changed.
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {content}_au AFTER UPDATE OF {col} ON {content}
+        WHEN old.{col} IS NOT new.{col} BEGIN
+            INSERT INTO {name}({name}, rowid, {col}) VALUES ('delete', old.{rowid}, old.{col});
+            INSERT INTO {name}(rowid, {col}) VALUES (new.{rowid}, new.{col});
+        END""")
+
+
+def _tune(conn: sqlite3.Connection, name: str) -> None:
+    # Stored in the index's own config table, so this only needs doing once —
+    # but it's cheap, and re-applying picks up changed values.
+    conn.execute(f"INSERT INTO {name}({name}, rank) VALUES ('automerge', ?)", (_AUTOMERGE,))
+    conn.execute(f"INSERT INTO {name}({name}, rank) VALUES ('crisismerge', ?)", (_CRISISMERGE,))
+
+
+def ensure(conn: sqlite3.Connection) -> None:
+    """Create (or tune) both indexes and their triggers; part of init_db."""
+    for name in INDEXES:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+        if exists and _is_legacy(conn, name):
+            print(f"[search] {name} uses the old layout (duplicated video_id); "
+                  f"run `python -m app.db.search_index rebuild` to convert it")
+        else:
+            _create(conn, name)
+        _tune(conn, name)
+
+
+def rebuild() -> dict:
+    """Drop and recreate both indexes (and their triggers) in the current
+    layout, reindex everything from the content tables, then optimize."""
+    started = time.monotonic()
+    with db() as conn:
+        conn.execute("BEGIN")  # DDL doesn't open a transaction on its own; make it all-or-nothing
+        for name, (content, _, _) in INDEXES.items():
+            for suffix in ("ai", "ad", "au"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {content}_{suffix}")
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+            _create(conn, name)
+            _tune(conn, name)
+            conn.execute(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+        for name in INDEXES:
+            conn.execute(f"INSERT INTO {name}({name}) VALUES ('optimize')")
+    print(f"[search] rebuilt {', '.join(INDEXES)} in {time.monotonic() - started:.1f}s")
+    return stats()
+
+
+def optimize(budget_seconds: float) -> dict:
+    """Merge index segments, one small transaction at a time, until each index
+    is down to a single segment or the time budget runs out. Returns per index
+    the merge steps taken and whether it finished."""
+    deadline = time.monotonic() + max(0.0, budget_seconds)
+    out = {}
+    for name in INDEXES:
+        steps, done = 0, False
+        while time.monotonic() < deadline:
+            with db() as conn:
+                before = conn.total_changes
+                # A negative page count merges segments across all levels — an
+                # incremental 'optimize'.
+                conn.execute(f"INSERT INTO {name}({name}, rank) VALUES ('merge', ?)", (-_MERGE_PAGES_PER_STEP,))
+                # Per the FTS5 docs: fewer than 2 changes means nothing was left to merge.
+                done = conn.total_changes - before < 2
+            steps += 1
+            if done:
+                break
+        out[name] = {"merge_steps": steps, "done": done}
+    return out
+
+
+def _index_bytes(conn: sqlite3.Connection, name: str) -> int:
+    shadows = [f"{name}_{s}" for s in ("data", "idx", "docsize", "config")]
+    try:
+        row = conn.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name IN ({','.join('?' * len(shadows))})",
+                           shadows).fetchone()
+    except sqlite3.OperationalError:  # SQLite built without dbstat
+        row = conn.execute(f"SELECT SUM(length(block)) FROM {name}_data").fetchone()
+    return row[0] or 0
+
+
+def stats() -> dict:
+    """Per index: layout, documents indexed, segments and size on disk."""
+    with db() as conn:
+        return {
+            name: {
+                "layout": "legacy" if _is_legacy(conn, name) else "current",
+                "documents": conn.execute(f"SELECT COUNT(*) FROM {name}_docsize").fetchone()[0],
+                "segments": conn.execute(f"SELECT COUNT(DISTINCT segid) FROM {name}_idx").fetchone()[0],
+                "bytes": _index_bytes(conn, name),
+            }
+            for name in INDEXES
+        }
+
+
+def run_maintenance(budget_seconds: float) -> dict:
+    """The scheduled pass: optimize within the budget, then record the result
+    (with fresh stats) for /api/status."""
+    global _last_maintenance
+    merged = optimize(budget_seconds)
+    _last_maintenance = {"at": int(time.time()), "merged": merged, "indexes": stats()}
+    return _last_maintenance
+
+
+def last_maintenance() -> Optional[dict]:
+    return _last_maintenance
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.db.search_index",
+                                     description="Inspect and maintain the FTS5 search indexes.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="documents, segments and size per index")
+    opt = sub.add_parser("optimize", help="merge index segments (incrementally)")
+    opt.add_argument("--budget", type=float, default=300.0, help="seconds to spend at most")
+    sub.add_parser("rebuild", help="recreate both indexes in the current layout and reindex")
+    args = parser.parse_args()
+
+    from app.db.database import init_db
+    init_db()
+    if args.command == "stats":
+        result = stats()
+    elif args.command == "optimize":
+        result = {"merged": optimize(args.budget), "indexes": stats()}
+    else:
+        result = rebuild()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
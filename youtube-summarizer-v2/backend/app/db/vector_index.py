@@ -0,0 +1,186 @@
+"""The vector index behind semantic search: every stored embedding of the current
+embedder, in memory as one float32 matrix, searched by brute force.
+
+Vectors live in the `embeddings` table (one BLOB per summary / transcript
+passage, see database.init_db). The index mirrors it incrementally: before each
+search it checks the table's (count, max id) for its embedder — one indexed
+query — and loads only rows newer than the last it has. Re-embedding a video
+replaces its rows, which shows up as a count mismatch; then the surviving ids are
+re-read and the deleted rows dropped. So new summaries are searchable as soon as
+their embed job finishes, in this process or any other.
+
+Brute force (one matrix-vector product per query) is exact and, for a personal
+library — tens of thousands of vectors — takes milliseconds; an approximate
+index would only pay off orders of magnitude beyond that.
+
+Videos summarized before semantic search existed, or embedded by a different
+embedder than the configured one, are queued for embedding at startup
+(`backfill()`); by hand:
+
+    python -m app.db.vector_index stats|backfill
+"""
+import argparse
+import heapq
+import json
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.db import repos
+
+_KINDS = ("summary", "transcript")
+
+
+class VectorIndex:
+    """An in-memory copy of one embedder's vectors (see the module docstring).
+    Thread-safe: refreshes swap in new arrays under a lock, searches work on
+    whatever arrays were current when they started."""
+
+    def __init__(self, model: str, dim: int) -> None:
+        self.model = model
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._video = np.zeros(0, dtype=np.int32)   # row -> index into _video_ids
+        self._kind = np.zeros(0, dtype=np.int8)     # row -> index into _KINDS
+        self._start_ms = np.zeros(0, dtype=np.int64)  # -1 = unknown
+        self._end_ms = np.zeros(0, dtype=np.int64)
+        self._video_ids: list[str] = []
+        self._video_index: dict[str, int] = {}
+
+    def _append(self, rows: list[dict]) -> None:
+        for r in rows:
+            if r["video_id"] not in self._video_index:
+                self._video_index[r["video_id"]] = len(self._video_ids)
+                self._video_ids.append(r["video_id"])
+        vectors = np.frombuffer(b"".join(r["vector"] for r in rows), dtype=np.float32).reshape(len(rows), self.dim)
+        self._ids = np.concatenate([self._ids, [r["id"] for r in rows]])
+        self._vectors = np.concatenate([self._vectors, vectors])
+        self._video = np.concatenate([self._video, [self._video_index[r["video_id"]] for r in rows]]).astype(np.int32)
+        self._kind = np.concatenate([self._kind, [_KINDS.index(r["kind"]) for r in rows]]).astype(np.int8)
+        self._start_ms = np.concatenate([self._start_ms, [-1 if r["start_ms"] is None else r["start_ms"]
+                                                          for r in rows]]).astype(np.int64)
+        self._end_ms = np.concatenate([self._end_ms, [-1 if r["end_ms"] is None else r["end_ms"]
+                                                      for r in rows]]).astype(np.int64)
+        self._last_id = rows[-1]["id"]
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self._ids, self._vectors, self._video = self._ids[mask], self._vectors[mask], self._video[mask]
+        self._kind, self._start_ms, self._end_ms = self._kind[mask], self._start_ms[mask], self._end_ms[mask]
+
+    def refresh(self) -> None:
+        """Catch up with the embeddings table: load new rows, drop deleted ones."""
+        with self._lock:
+            count, max_id = repos.embedding_extent(self.model)
+            if max_id > self._last_id:
+                rows = [r for r in repos.embeddings_after(self.model, self._last_id)
+                        if len(r["vector"]) == 4 * self.dim]
+                if rows:
+                    self._append(rows)
+            if len(self._ids) != count:
+                self._keep(np.isin(self._ids, np.asarray(repos.embedding_ids(self.model), dtype=np.int64)))
+
+    def search(self, query: np.ndarray, limit: int, *, after: Optional[tuple[float, str]] = None,
+               video_ids: Optional[list[str]] = None) -> list[dict]:
+        """Videos by their best-matching vector (cosine similarity), best first
+        (score desc, then video_id): video_id, score, kind, start_ms, end_ms of
+        that vector. `after` = (score, video_id) of the previous page's last row;
+        `video_ids` restricts the search to those videos."""
+        self.refresh()
+        with self._lock:
+            vectors, video, kind = self._vectors, self._video, self._kind
+            start_ms, end_ms, names, index = self._start_ms, self._end_ms, self._video_ids, self._video_index
+        rows = np.arange(len(video))
+        if video_ids is not None:
+            rows = rows[np.isin(video, [index[v] for v in video_ids if v in index])]
+        if not len(rows):
+            return []
+        scores = vectors[rows] @ query.astype(np.float32)
+        # Sort by video, then score descending: each video's first row is its best.
+        order = np.lexsort((-scores, video[rows]))
+        grouped = video[rows][order]
+        firsts = order[np.concatenate([[True], grouped[1:] != grouped[:-1]])]
+
+        candidates = ((-float(scores[i]), names[video[rows[i]]], rows[i]) for i in firsts)
+        if after is not None:
+            score, last_video = after
+            candidates = (c for c in candidates if c[0] > -score or (c[0] == -score and c[1] > last_video))
+        return [
+            {"video_id": video_id, "score": -neg_score, "kind": _KINDS[kind[row]],
+             "start_ms": int(start_ms[row]) if start_ms[row] >= 0 else None,
+             "end_ms": int(end_ms[row]) if end_ms[row] >= 0 else None}
+            for neg_score, video_id, row in heapq.nsmallest(limit, candidates)
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"model": self.model, "dim": self.dim, "vectors": len(self._ids),
+                    "videos": len(np.unique(self._video)), "bytes": int(self._vectors.nbytes)}
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[VectorIndex]:
+    """The index for the configured embedder (None if embeddings are off)."""
+    global _index
+    from app.llm.embeddings import get_embedder
+    embedder = get_embedder()
+    if embedder is None:
+        return None
+    with _index_lock:
+        if _index is None or _index.model != embedder.name:
+            _index = VectorIndex(embedder.name, embedder.dim)
+        return _index
+
+
+def backfill() -> int:
+    """Queue an embed job for every summarized video the current embedder hasn't
+    embedded yet. Returns how many were queued."""
+    from app.jobs import JobType
+    from app.llm.embeddings import get_embedder
+    embedder = get_embedder()
+    if embedder is None:
+        return 0
+    video_ids = repos.videos_missing_embeddings(embedder.name)
+    now = int(time.time())
+    for video_id in video_ids:
+        repos.enqueue_job(video_id=video_id, scheduled_at=now, job_type=JobType.EMBED, send_email=False)
+    if video_ids:
+        print(f"[semantic] queued {len(video_ids)} videos for embedding by {embedder.name}")
+    return len(video_ids)
+
+
+def status() -> Optional[dict]:
+    """For /api/status: the in-memory index (as of its last search)."""
+    return _index.stats() if _index is not None else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.db.vector_index",
+                                     description="Inspect and fill the semantic search index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="vectors and videos indexed by the current embedder")
+    sub.add_parser("backfill", help="queue embed jobs for videos the current embedder hasn't embedded")
+    args = parser.parse_args()
+
+    from app.db.database import init_db
+    init_db()
+    index = get_index()
+    if index is None:
+        raise SystemExit("EMBED_BACKEND is off")
+    if args.command == "stats":
+        index.refresh()
+        result = index.stats()
+    else:
+        result = {"queued": backfill()}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,20 @@ each channel's title filters, records new videos, and enqueues a transcript job
 with a RANDOM scheduled time spread across the window. The expensive yt-dlp work
 happens later, in the worker, sprinkled over the next ~30 minutes — never in a
 burst right after discovery.
+
+Channels aren't all polled every tick: each has a `next_check_at` derived from
+its observed upload rate, so a daily uploader is checked every couple of hours
+and a dormant one about once a day, while busy channels stay near the minimum.
 """
 import random
 import time
 from calendar import timegm
 from typing import Any, Optional
 
-import feedparser
-
-from app.config import FETCH_SPREAD_MINUTES
+from app.config import FEED_POLL_MAX_MINUTES, FEED_POLL_MIN_MINUTES, FETCH_SPREAD_MINUTES
 from app.db import repos
 from app.filters import passes_filters
+from app.youtube import feeds
 
 
 def _video_id_from_entry(entry: Any) -> Optional[str]:
@@ -32,13 +35,45 @@ def _published_epoch(entry: Any) -> Optional[int]:
     return timegm(pp) if pp else None
 
 
+# Re-check a channel after this fraction of its expected gap between uploads.
+_GAP_FRACTION = 0.1
+# Weight of the newest sample in the upload-rate moving average.
+_RATE_SMOOTHING = 0.5
+
+
+def _rate_sample(entries: list, now: int) -> Optional[float]:
+    """Uploads/day implied by a feed's entries: how many there are over the span
+    from the oldest one to now (so a long silence pulls the rate down)."""
+    published = [p for p in (_published_epoch(e) for e in entries) if p]
+    if not published:
+        return None
+    span = max(now - min(published), 3600)
+    return len(published) * 86400 / span
+
+
+def _next_check_at(state: dict, now: int) -> int:
+    """When this channel is next due, from its upload rate and last upload."""
+    lo, hi = max(1, FEED_POLL_MIN_MINUTES) * 60, max(FEED_POLL_MIN_MINUTES, FEED_POLL_MAX_MINUTES) * 60
+    rate = state.get("upload_rate")
+    if not rate:
+        return now + hi
+    last = state.get("last_new_upload")
+    if last and now > last:
+        # Silence since the last upload caps the estimate, so a channel that
+        # went quiet drifts toward the daily check even between 200s.
+        rate = min(rate, 86400 / (now - last))
+    interval = _GAP_FRACTION * 86400 / rate
+    # A little jitter keeps channels from re-synchronizing into one burst.
+    interval *= random.uniform(0.9, 1.1)
+    return now + int(min(hi, max(lo, interval)))
+
+
 def fetch_channel_name(channel_id: str) -> Optional[str]:
     """Resolve a channel's display name from its RSS feed — plain HTTP, not
     bot-flagged (same endpoint discovery uses). Lets a freshly added channel
     show its name immediately, before any uploads have been discovered."""
-    try:
-        feed = feedparser.parse(f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}")
-    except Exception:  # noqa: BLE001 - network/parse hiccup shouldn't block adding
+    feed = feeds.fetch_feed(channel_id)["feed"]
+    if feed is None:  # network/parse hiccup shouldn't block adding
         return None
     name = getattr(getattr(feed, "feed", None), "title", None)
     if not name and feed.entries:
@@ -46,64 +81,96 @@ def fetch_channel_name(channel_id: str) -> Optional[str]:
     return name or None
 
 
-def run_discovery() -> dict:
-    """Scan all active channels once. Returns a small stats dict for logging/UI."""
-    now = int(time.time())
-    spread = max(1, FETCH_SPREAD_MINUTES) * 60
-    stats = {"channels": 0, "new": 0, "filtered": 0, "pre_existing": 0}
+def _record_entries(channel_id: str, added_at: int, entries: list, *, now: int, spread: int,
+                    stats: dict) -> None:
+    """Classify one channel's feed entries and record them in one transaction."""
+    rules = repos.get_channel_filters(channel_id)
 
-    for channel in repos.get_channels(active_only=True):
-        channel_id = channel["channel_id"]
-        # Only uploads published AFTER the channel was added are processed, so
-        # adding a channel doesn't backfill its entire recent history.
-        added_at = channel["added_at"] or 0
-        stats["channels"] += 1
-        feed = feedparser.parse(f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}")
-        if not feed.entries:
+    # Classify every entry first; already-known videos are dropped by the repo in
+    # one query. Feed is newest-first; walk oldest-first so a burst of uploads is
+    # queued in chronological order.
+    batch: list[dict] = []
+    for entry in reversed(entries):
+        video_id = _video_id_from_entry(entry)
+        if not video_id:
             continue
 
-        rules = repos.get_channel_filters(channel_id)
-
-        # Feed is newest-first; walk oldest-first so a burst of uploads is queued
-        # in chronological order.
-        for entry in reversed(feed.entries):
-            video_id = _video_id_from_entry(entry)
-            if not video_id or repos.video_exists(video_id):
-                continue
-
-            title = getattr(entry, "title", "Unknown Title")
-            channel_name = getattr(entry, "author", None)
-            url = f"https://www.youtube.com/watch?v={video_id}"
-            published = _published_epoch(entry)
-
-            # Skip anything uploaded at/before the channel was added (or with no
-            # publish date we can trust). Record it as seen so the next scan
-            # doesn't re-evaluate it.
-            if published is None or published <= added_at:
-                repos.upsert_video(video_id=video_id, channel_id=channel_id, title=title,
-                                   channel_name=channel_name, url=url,
-                                   published_at=published, status="skipped")
-                repos.set_video_status(video_id, "skipped", "uploaded before channel was added")
-                stats["pre_existing"] += 1
-                continue
-
-            # Cheap title filter on the RSS data before any yt-dlp work.
-            if not passes_filters(rules, {"title": title}):
-                repos.upsert_video(video_id=video_id, channel_id=channel_id, title=title,
-                                   channel_name=channel_name, url=url,
-                                   published_at=published, status="skipped")
-                repos.set_video_status(video_id, "skipped", "did not pass channel filters")
-                stats["filtered"] += 1
-                continue
-
-            repos.upsert_video(video_id=video_id, channel_id=channel_id, title=title,
-                               channel_name=channel_name, url=url,
-                               published_at=published, status="queued")
-
+        title = getattr(entry, "title", "Unknown Title")
+        published = _published_epoch(entry)
+        row = {
+            "video_id": video_id, "channel_id": channel_id, "title": title,
+            "channel_name": getattr(entry, "author", None),
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+            "published_at": published,
+        }
+
+        # Skip anything uploaded at/before the channel was added (or with no
+        # publish date we can trust). Record it as seen so the next scan
+        # doesn't re-evaluate it.
+        if published is None or published <= added_at:
+            row.update(status="skipped", skip_reason="uploaded before channel was added",
+                       stat="pre_existing")
+        # Cheap title filter on the RSS data before any yt-dlp work.
+        elif not passes_filters(rules, {"title": title}):
+            row.update(status="skipped", skip_reason="did not pass channel filters",
+                       stat="filtered")
+        else:
             # Random offset within the window => human-like, spread-out fetches.
-            scheduled_at = now + random.randint(0, spread)
-            repos.enqueue_job(video_id=video_id, scheduled_at=scheduled_at,
-                              priority=0, detail_level=2, send_email=True)
-            stats["new"] += 1
+            row.update(status="queued", scheduled_at=now + random.randint(0, spread),
+                       priority=0, detail_level=2, send_email=True, stat="new")
+        batch.append(row)
+
+    for row in repos.save_discovered_videos(batch):
+        stats[row["stat"]] += 1
+
+
+def run_discovery(force: bool = False) -> dict:
+    """Scan active channels that are due (all of them if `force`). Returns a
+    small stats dict for logging/UI."""
+    now = int(time.time())
+    spread = max(1, FETCH_SPREAD_MINUTES) * 60
+    stats = {"channels": 0, "new": 0, "filtered": 0, "pre_existing": 0, "unchanged": 0,
+             "not_due": 0}
+
+    channels = {c["channel_id"]: c for c in repos.get_channels(active_only=True)}
+    states = repos.get_feed_states()
+    due = [cid for cid in channels
+           if force or (states.get(cid) or {}).get("next_check_at") is None
+           or states[cid]["next_check_at"] <= now]
+    stats["not_due"] = len(channels) - len(due)
+
+    # Feeds download concurrently; each result is recorded here, on this thread,
+    # as it arrives so DB writes stay serialized.
+    for result in feeds.fetch_feeds(states, due):
+        channel_id = result["channel_id"]
+        state = dict(states.get(channel_id) or {})
+        stats["channels"] += 1
+        if result["error"]:
+            print(f"[discovery] feed for {channel_id} failed: {result['error']}")
+            repos.save_feed_state(channel_id, etag=None, last_modified=None,
+                                  next_check_at=now + max(1, FEED_POLL_MIN_MINUTES) * 60)
+            continue
+        if result["not_modified"]:
+            stats["unchanged"] += 1
+        elif result["feed"].entries:
+            entries = result["feed"].entries
+            # Only uploads published AFTER the channel was added are processed, so
+            # adding a channel doesn't backfill its entire recent history.
+            added_at = channels[channel_id]["added_at"] or 0
+            _record_entries(channel_id, added_at, entries, now=now, spread=spread, stats=stats)
+            sample = _rate_sample(entries, now)
+            if sample is not None:
+                prev = state.get("upload_rate")
+                state["upload_rate"] = (sample if prev is None
+                                        else _RATE_SMOOTHING * sample + (1 - _RATE_SMOOTHING) * prev)
+            newest = max((p for p in (_published_epoch(e) for e in entries) if p), default=None)
+            if newest:
+                state["last_new_upload"] = newest
+        # Validators are stored only after the entries are recorded, so a crash
+        # mid-scan can't leave a 304 hiding uploads we never saw.
+        repos.save_feed_state(channel_id, etag=result["etag"], last_modified=result["last_modified"],
+                              next_check_at=_next_check_at(state, now),
+                              upload_rate=state.get("upload_rate"),
+                              last_new_upload=state.get("last_new_upload"))
 
     return stats
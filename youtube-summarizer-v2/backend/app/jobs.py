@@ -1,30 +1,50 @@
-"""Processing a single fetch job — the full pipeline for one video.
+"""Processing queued jobs — the pipeline for one video, split into stages.
 
-Pulls metadata + transcript via yt-dlp (one extract_info call + one subtitle
-download), applies the same skip rules as v1, summarizes, persists everything, and
-emails. This function is BLOCKING (yt-dlp / requests / SMTP) and is run in a
-thread by the worker loop.
+Each stage is its own job type in `fetch_jobs`, drained by its own worker pool,
+and enqueues the next stage when it finishes:
+  • fetch (JobType.FETCH): metadata + transcript via yt-dlp (one extract_info
+    call + one subtitle download) and the v1 skip rules. The only stage that
+    touches YouTube, so the YouTube lanes never wait on Gemini or SMTP.
+  • summarize: LLM summary of the stored transcript. Background (priority 0)
+    videos go to summarize_batch instead when LLM_BATCH_BACKEND is on, and are
+    summarized many per model request.
+  • notify: the summary email.
+  • embed: vectors of the new summary and the transcript's passages, for
+    semantic search (app.llm.embeddings, app.db.vector_index). Queued alongside
+    notify; it doesn't change the video's status.
+Every stage function is BLOCKING (yt-dlp / LLM / SMTP) and is run in a thread.
 
 Block detection lives here only to the extent of raising BlockedError; the WORKER
 owns the backoff policy (so all job types share one place that escalates).
 """
-from typing import Optional
+import time
+from typing import Callable, Optional
 
 import yt_dlp
 
 from app import config
 from app.db import repos
 from app.email.emailer import send_summary_email, send_error_email
-from app.llm.summarizer import safe_summarize
+from app.llm import embeddings
+from app.llm.summarizer import safe_summarize, summarize_batch
 from app.youtube import fetcher, gate
 
 
+class JobType:
+    FETCH = "transcript"   # historical name; rows enqueued before the split use it
+    SUMMARIZE = "summarize"
+    SUMMARIZE_BATCH = "summarize_batch"  # background videos, summarized in batches
+    NOTIFY = "notify"
+    EMBED = "embed"
+
+
 class JobResult:
     DONE = "done"
     SKIPPED = "skipped"          # terminal skip (live / short / too long)
     RETRY_LATER = "retry_later"  # not ready yet (upcoming premiere) — worker re-queues
     NO_TRANSCRIPT = "no_transcript"
     FAILED = "failed"
+    CACHED = "cached"            # done from the fetch cache — YouTube wasn't touched
 
 
 def _app_url(video_id: str) -> Optional[str]:
@@ -50,19 +70,28 @@ def send_failure_email(*, subject: str, error_message: str, stage: str, video_id
     )
 
 
-def process_job(job: dict) -> str:
-    """Run one job. Returns a JobResult. Raises gate.BlockedError if YouTube blocks
-    us (the worker turns that into global backoff + reschedule)."""
+def process_job(job: dict, egress: Optional[dict] = None) -> str:
+    """Run the fetch stage of one job through the given egress (a worker lane's
+    proxy/cookies/impersonate; default settings if None). Returns a JobResult. Raises
+    gate.BlockedError if YouTube blocks us (the worker turns that into backoff
+    for that lane + reschedule)."""
+    lane = egress["name"] if egress else gate.DEFAULT_LANE
     video_id = job["video_id"]
-    detail_level = job.get("detail_level", 2)
-    send_email = bool(job.get("send_email", 1))
     allow_long = job.get("priority", 0) > 0  # manual requests may exceed the length cap
 
     repos.set_video_status(video_id, "fetching")
 
+    # A retry / re-summary within FETCH_CACHE_TTL_HOURS reuses what the last
+    # successful fetch pulled down, and never touches YouTube.
+    cached = repos.get_fetch_cache(video_id, config.FETCH_CACHE_TTL_HOURS * 3600)
+    if cached:
+        result = _process_cached(job, cached, allow_long)
+        if result:
+            return result
+
     # ── 1. Metadata + caption availability (single extract_info call) ──
     try:
-        info = fetcher.extract_info(video_id)
+        info = fetcher.extract_info(video_id, egress)
     except yt_dlp.utils.DownloadError as e:
         if gate.is_block_error(e):
             raise gate.BlockedError(str(e))
@@ -74,30 +103,14 @@ def process_job(job: dict) -> str:
         return JobResult.FAILED
 
     meta = fetcher.metadata_from_info(info)
-    repos.update_video_metadata(video_id, title=meta["title"], channel_name=meta["channel"],
-                                duration=meta["duration"])
-
-    # ── 2. Skip rules (same thresholds as v1) ──
-    live = meta["live_status"]
-    if live == "is_upcoming":
-        # Don't mark terminal — the worker re-queues this job for later, once it airs.
-        repos.set_video_status(video_id, "queued", "upcoming premiere")
-        return JobResult.RETRY_LATER
-    if live == "is_live":
-        repos.set_video_status(video_id, "skipped", "currently live")
-        return JobResult.SKIPPED
-    duration = meta["duration"] or 0
-    if 0 < duration < config.MIN_DURATION_SECONDS:
-        repos.set_video_status(video_id, "skipped", f"short ({duration}s)")
-        return JobResult.SKIPPED
-    if duration > config.MAX_DURATION_SECONDS and not allow_long:
-        repos.set_video_status(video_id, "skipped", f"too long ({duration}s)")
-        return JobResult.SKIPPED
+    skipped = _apply_metadata(video_id, meta, allow_long)
+    if skipped:
+        return skipped
 
     # ── 3. Transcript ──
     transcript_error: Optional[str] = None
     try:
-        transcript = fetcher.fetch_transcript_from_info(info)
+        transcript = fetcher.fetch_transcript_from_info(info, egress)
     except gate.BlockedError:
         # A 429 on the subtitle download — let the worker back off + requeue.
         raise
@@ -127,7 +140,7 @@ def process_job(job: dict) -> str:
         # Rate-limit root-cause detection: an IP flag commonly *looks* like a
         # missing transcript. If we're blocked / were recently blocked, say so —
         # the "[rate-limited]" marker is what the UI keys off to flag it.
-        rl_note = gate.rate_limit_note()
+        rl_note = gate.rate_limit_note(lane)
         if rl_note:
             reason = f"[rate-limited] {reason} — {rl_note}"
         subject = ("Rate-Limited (No Transcript): " if rl_note else "Missing Transcript: ") + meta["title"]
@@ -136,30 +149,208 @@ def process_job(job: dict) -> str:
                            stage="transcript", video_id=video_id, job=job, meta=meta)
         return JobResult.NO_TRANSCRIPT
 
+    if transcript.get("raw"):
+        repos.save_fetch_cache(video_id, fetcher.cacheable_info(info), lang=transcript.get("lang") or "",
+                               source=transcript.get("source") or "", fmt=transcript["fmt"],
+                               raw=transcript["raw"], max_age_seconds=config.FETCH_CACHE_TTL_HOURS * 3600)
+    _hand_off(job, transcript)
+    return JobResult.DONE
+
+
+def _apply_metadata(video_id: str, meta: dict, allow_long: bool) -> Optional[str]:
+    """Record the video's metadata and apply the skip rules (same thresholds as
+    v1). Returns the JobResult to stop with, or None to carry on."""
+    repos.update_video_metadata(video_id, title=meta["title"], channel_name=meta["channel"],
+                                duration=meta["duration"])
+
+    live = meta["live_status"]
+    if live == "is_upcoming":
+        # Don't mark terminal — the worker re-queues this job for later, once it airs.
+        repos.set_video_status(video_id, "queued", "upcoming premiere")
+        return JobResult.RETRY_LATER
+    if live == "is_live":
+        repos.set_video_status(video_id, "skipped", "currently live")
+        return JobResult.SKIPPED
+    duration = meta["duration"] or 0
+    if 0 < duration < config.MIN_DURATION_SECONDS:
+        repos.set_video_status(video_id, "skipped", f"short ({duration}s)")
+        return JobResult.SKIPPED
+    if duration > config.MAX_DURATION_SECONDS and not allow_long:
+        repos.set_video_status(video_id, "skipped", f"too long ({duration}s)")
+        return JobResult.SKIPPED
+    return None
+
+
+def _hand_off(job: dict, transcript: dict) -> None:
+    """Save the transcript and queue the summarize stage (off the YouTube lane)."""
+    video_id = job["video_id"]
+    raw_tokens, tokens = transcript.get("raw_tokens"), transcript.get("tokens")
     repos.save_transcript(video_id, transcript["text"], lang=transcript.get("lang"),
-                          source=transcript.get("source"))
+                          source=transcript.get("source"), raw_tokens=raw_tokens, tokens=tokens,
+                          segments=transcript.get("segments"))
+    if raw_tokens:
+        print(f"[transcript] {video_id}: ~{raw_tokens} -> ~{tokens} tokens after normalization "
+              f"(-{1 - tokens / raw_tokens:.0%})")
+    repos.set_video_status(video_id, "summarizing")
+    # Nobody is waiting on a background video, so it can wait for a batch.
+    batch = config.LLM_BATCH_BACKEND != "off" and job.get("priority", 0) <= 0
+    _enqueue_next(job, JobType.SUMMARIZE_BATCH if batch else JobType.SUMMARIZE)
 
-    # ── 4. Summarize ──
-    result, summarize_error = safe_summarize(transcript["text"], detail=detail_level,
-                                             channel_name=meta["channel"], video_title=meta["title"])
+
+def _process_cached(job: dict, cached: dict, allow_long: bool) -> Optional[str]:
+    """The fetch stage replayed from the fetch cache: same skip rules, same
+    hand-off, no YouTube requests. Returns None if the cached payload is unusable
+    (the caller then fetches fresh)."""
+    video_id = job["video_id"]
+    transcript = fetcher.transcript_from_payload(cached["raw"], cached["fmt"],
+                                                 lang=cached["lang"] or None, source=cached["source"] or None)
+    if not transcript:
+        print(f"[fetch-cache] unusable cached captions for {video_id}; refetching")
+        return None
+    skipped = _apply_metadata(video_id, fetcher.metadata_from_info(cached["info"]), allow_long)
+    if skipped:
+        return skipped
+    print(f"[fetch-cache] {video_id}: reused cached captions ({cached['lang']}, {cached['source']})")
+    _hand_off(job, transcript)
+    return JobResult.CACHED
+
+
+def _enqueue_next(job: dict, job_type: str) -> None:
+    """Queue the next pipeline stage for this video, due immediately and carrying
+    over the job's priority and options."""
+    repos.enqueue_job(video_id=job["video_id"], scheduled_at=int(time.time()), job_type=job_type,
+                      priority=job.get("priority", 0), detail_level=job.get("detail_level", 2),
+                      send_email=bool(job.get("send_email", 1)))
+
+
+# How often a streaming summary's partial text is written for watchers
+# (GET /api/videos/{id}/summary/stream).
+_DRAFT_SAVE_SECONDS = 0.5
+
+
+def _draft_saver(video_id: str, detail_level: int) -> Callable[[str], None]:
+    """An on_partial callback that persists the growing summary, throttled."""
+    started_at = int(time.time())
+    last_saved = 0.0
+
+    def save(text: str) -> None:
+        nonlocal last_saved
+        now = time.monotonic()
+        if now - last_saved >= _DRAFT_SAVE_SECONDS:
+            last_saved = now
+            repos.save_summary_draft(video_id, text, detail_level=detail_level, started_at=started_at)
+
+    return save
+
+
+def _no_transcript(video_id: str) -> str:
+    repos.set_video_status(video_id, "failed", "summarization failed — no stored transcript")
+    return JobResult.FAILED
+
+
+def _finish_summary(job: dict, video: dict, result: Optional[tuple[str, str]],
+                    summarize_error: Optional[str]) -> str:
+    """Store a summarize stage's outcome: save the summary and queue the email
+    (if wanted), or fail the video with a diagnostic email."""
+    video_id = job["video_id"]
     if not result:
         reason = f"summarization failed — {summarize_error or 'unknown error'}"
+        repos.delete_summary_draft(video_id)
         repos.set_video_status(video_id, "failed", reason)
-        send_failure_email(subject=f"Summarization Failed: {meta['title']}", error_message=reason,
-                            stage="summarization (LLM)", video_id=video_id, job=job, meta=meta)
+        send_failure_email(subject=f"Summarization Failed: {video.get('title') or video_id}",
+                           error_message=reason, stage="summarization (LLM)",
+                           video_id=video_id, job=job)
         return JobResult.FAILED
 
     summary_md, model = result
-    repos.save_summary(video_id, summary_md, detail_level=detail_level, model=model)
+    repos.save_summary(video_id, summary_md, detail_level=job.get("detail_level", 2), model=model)
     repos.set_video_status(video_id, "summarized")
 
-    # ── 5. Email (core feature retained) ──
-    if send_email:
-        video = repos.get_video(video_id) or {}
-        send_summary_email(
-            video_title=meta["title"], channel_name=meta["channel"], summary=summary_md,
-            youtube_url=video.get("url") or f"https://www.youtube.com/watch?v={video_id}",
-            app_url=_app_url(video_id),
-        )
+    if job.get("send_email", 1):
+        _enqueue_next(job, JobType.NOTIFY)
+    if config.EMBED_BACKEND != "off":
+        _enqueue_next(job, JobType.EMBED)
+    return JobResult.DONE
+
+
+def process_summarize_job(job: dict) -> str:
+    """Summarize a video's stored transcript, then queue the email (if wanted)."""
+    video_id = job["video_id"]
+    detail_level = job.get("detail_level", 2)
+    transcript = repos.get_transcript(video_id)
+    video = repos.get_video(video_id) or {}
+    if not transcript or not transcript.get("text"):
+        return _no_transcript(video_id)
+
+    result, summarize_error = safe_summarize(transcript["text"], detail=detail_level,
+                                             channel_name=video.get("channel_name"),
+                                             video_title=video.get("title"),
+                                             on_partial=_draft_saver(video_id, detail_level),
+                                             priority=job.get("priority", 0))
+    return _finish_summary(job, video, result, summarize_error)
+
+
+def process_summarize_batch(jobs: list[dict]) -> list[str]:
+    """process_summarize_job() for many jobs at once: their summaries are made
+    by one summarizer.summarize_batch() call. Returns JobResults in job order."""
+    results: dict[int, str] = {}
+    ready: list[tuple[dict, dict, dict]] = []  # (job, video, transcript)
+    for job in jobs:
+        transcript = repos.get_transcript(job["video_id"])
+        if not transcript or not transcript.get("text"):
+            results[job["id"]] = _no_transcript(job["video_id"])
+        else:
+            ready.append((job, repos.get_video(job["video_id"]) or {}, transcript))
+
+    outcomes = summarize_batch(
+        [{"transcript": t["text"], "detail": job.get("detail_level", 2),
+          "channel_name": video.get("channel_name"), "video_title": video.get("title"),
+          "batch": (job["batch_name"], job["batch_index"]) if job.get("batch_name") else None}
+         for job, video, t in ready],
+        priority=max((job.get("priority", 0) for job, _, _ in ready), default=0),
+        # Persisted as soon as each batch job exists: a restart resumes polling it.
+        on_submit=lambda name, indices: repos.set_jobs_batch(name, [ready[i][0]["id"] for i in indices]),
+    )
+    for (job, video, _), (result, summarize_error) in zip(ready, outcomes):
+        results[job["id"]] = _finish_summary(job, video, result, summarize_error)
+    return [results[job["id"]] for job in jobs]
+
 
+def process_notify_job(job: dict) -> str:
+    """Email the video's latest summary (core feature retained)."""
+    video_id = job["video_id"]
+    summary = repos.get_latest_summary(video_id)
+    if not summary:
+        return JobResult.FAILED
+    video = repos.get_video(video_id) or {}
+    send_summary_email(
+        video_title=video.get("title") or "Unknown Title",
+        channel_name=video.get("channel_name") or "Unknown Channel",
+        summary=summary["summary_md"],
+        youtube_url=video.get("url") or f"https://www.youtube.com/watch?v={video_id}",
+        app_url=_app_url(video_id),
+    )
+    return JobResult.DONE
+
+
+def process_embed_job(job: dict) -> str:
+    """Embed the video's latest summary and its transcript passages, replacing
+    any vectors it had."""
+    embedder = embeddings.get_embedder()
+    if embedder is None:
+        return JobResult.SKIPPED
+    video_id = job["video_id"]
+    summary = repos.get_latest_summary(video_id)
+    transcript = repos.get_transcript(video_id)
+    segments = repos.get_transcript_segments(video_id, limit=-1)
+    docs = embeddings.documents(title=(repos.get_video(video_id) or {}).get("title"),
+                                summary_md=summary["summary_md"] if summary else None,
+                                segments=segments, transcript_text=transcript["text"] if transcript else None)
+    if not docs:
+        return JobResult.SKIPPED
+    vectors = embedder.embed([text for _, _, _, text in docs])
+    repos.save_embeddings(video_id, embedder.name, [
+        (kind, start_ms, end_ms, vector.tobytes())
+        for (kind, start_ms, end_ms, _), vector in zip(docs, vectors)
+    ])
     return JobResult.DONE
@@ -0,0 +1,64 @@
+"""Persistent memoization of LLM results.
+
+Duplicate manual requests, retries after an email failure and requeues of failed
+videos all ask for a summary we already produced. Results are stored in SQLite
+under a hash of every prompt input (transcript, detail level, context, prompt
+template version, model chain), so any change to those is a miss rather than a
+stale hit. The table is an LRU bounded by LLM_CACHE_MAX_ENTRIES.
+
+Hit/miss counters are per process (they reset on restart) and surface on
+/api/status next to the table's size.
+"""
+import hashlib
+import threading
+from typing import Optional
+
+from app.config import LLM_CACHE_MAX_ENTRIES
+from app.db import repos
+
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def make_key(kind: str, *parts: object) -> str:
+    """A stable key for one call: `kind` namespaces the caller, `parts` are every
+    input that shapes the output (each hashed, so field boundaries can't blur)."""
+    h = hashlib.sha256(kind.encode())
+    for part in parts:
+        h.update(b"\x00" + hashlib.sha256(str(part).encode()).digest())
+    return f"{kind}:{h.hexdigest()}"
+
+
+def get(key: str) -> Optional[tuple[str, str]]:
+    """(output, model) if cached, else None. Counts the hit or miss."""
+    global _hits, _misses
+    if LLM_CACHE_MAX_ENTRIES <= 0:
+        return None
+    row = repos.get_llm_cache(key)
+    with _lock:
+        if row:
+            _hits += 1
+        else:
+            _misses += 1
+    return (row["output"], row["model"]) if row else None
+
+
+def put(key: str, output: str, model: str) -> None:
+    if LLM_CACHE_MAX_ENTRIES <= 0:
+        return
+    repos.put_llm_cache(key, output, model=model, max_entries=LLM_CACHE_MAX_ENTRIES)
+
+
+def stats() -> dict:
+    with _lock:
+        hits, misses = _hits, _misses
+    lookups = hits + misses
+    return {
+        "enabled": LLM_CACHE_MAX_ENTRIES > 0,
+        "max_entries": LLM_CACHE_MAX_ENTRIES,
+        **repos.llm_cache_size(),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 3) if lookups else None,
+    }
@@ -0,0 +1,75 @@
+"""Split long transcripts into model-sized chunks.
+
+Chunks end on a natural boundary — a sentence end, a line break, or a timestamp
+marker like "[12:34]" — never mid-sentence, and are sized by an estimated token
+count rather than characters. Each chunk after the first repeats the tail of the
+previous one (the overlap), so a point made across a boundary is seen whole.
+
+Auto-captions often have no punctuation at all; any boundary-free run longer than
+_MAX_UNIT_CHARS is broken at word gaps instead, so one giant "sentence" can't
+defeat the size limit.
+
+Token counts come from a local approximation of a BPE/SentencePiece tokenizer:
+every punctuation mark is a token, and words cost one token per (up to) four
+characters. It tracks Gemini's count for English speech to within ~10-15% and
+needs no model files or network — see bench_chunking.py for speed.
+"""
+import re
+
+# Sentence end (+ trailing space), a line break, or just before "[mm:ss]" / "[h:mm:ss]".
+_BOUNDARY_RE = re.compile(r"(?<=[.!?…])\s+|\s*\n\s*|\s+(?=\[\d{1,2}:\d{2}(?::\d{2})?\])")
+_MAX_UNIT_CHARS = 2000
+_PIECE_RE = re.compile(r"\S.{0,%d}(?=\s|$)|\S+" % (_MAX_UNIT_CHARS // 2), re.DOTALL)
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count of `text` (see module docstring)."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def _units(text: str) -> list[str]:
+    """The text cut at every natural boundary; over-long runs cut at word gaps."""
+    out: list[str] = []
+    for unit in _BOUNDARY_RE.split(text):
+        if not unit:
+            continue
+        if len(unit) <= _MAX_UNIT_CHARS:
+            out.append(unit)
+        else:
+            out.extend(_PIECE_RE.findall(unit))
+    return out
+
+
+def chunk_text(text: str, *, max_tokens: int, overlap_tokens: int = 0) -> list[str]:
+    """Split `text` into chunks of at most ~max_tokens estimated tokens, each
+    starting with up to overlap_tokens of the previous chunk's tail. Text that
+    already fits comes back as a single chunk. A single unit bigger than
+    max_tokens (only possible for absurdly small limits) becomes its own chunk."""
+    text = text.strip()
+    if not text:
+        return []
+    # Keep most of every chunk new material.
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+
+    units = _units(text)
+    costs = [estimate_tokens(u) for u in units]
+    chunks: list[str] = []
+    start = 0  # first unit of the current chunk (overlap included)
+    fresh = 0  # first unit not already in an earlier chunk
+    total = 0
+    i = 0
+    while i < len(units):
+        # A chunk always takes at least one fresh unit, so chunking always advances.
+        if i > fresh and total + costs[i] > max_tokens:
+            chunks.append(" ".join(units[start:i]))
+            fresh = start = i
+            total = 0
+            while start > 0 and total + costs[start - 1] <= overlap_tokens:
+                start -= 1
+                total += costs[start]
+            continue
+        total += costs[i]
+        i += 1
+    chunks.append(" ".join(units[start:]))
+    return chunks
@@ -0,0 +1,162 @@
+"""Embedders for semantic search: text -> unit-length float32 vectors.
+
+Pluggable: EMBED_BACKEND names one of EMBEDDERS.
+  • "local" — feature hashing of words and word pairs into EMBED_DIM buckets.
+    Deterministic and offline (no model, no API calls): it finds passages that
+    share vocabulary regardless of word order or exact phrasing, which is a good
+    part of what "about the same thing" means in transcripts.
+  • "gemini" — EMBED_MODEL through the Gemini API (app.llm.provider): real
+    semantic similarity, at an API call per 100 texts.
+Each embedder has a `name` stored with every vector it made, so switching
+embedders (or dimensions) never compares vectors from two of them; videos are
+re-embedded in the background instead (app.db.vector_index).
+
+Also here: how a video is cut into the texts that get embedded (`documents()`).
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from app.config import EMBED_BACKEND, EMBED_DIM, EMBED_MODEL
+from app.llm import provider
+
+# Transcript passages are about this many words (~1.5 minutes of speech): long
+# enough to be about something, short enough to point at a moment.
+PASSAGE_WORDS = 200
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset("""
+    a about above after again all also am an and any are as at be because been before being
+    but by can could did do does doing down during each few for from further get got had has
+    have having he her here hers him his how i if in into is it its itself just know like me
+    more most my no nor not now of off on once only or other our out over own really right
+    same she should so some such than that the their them then there these they this those
+    through to too under until up us very was we well were what when where which while who
+    whom why will with would yeah you your
+""".split())
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+class Embedder:
+    """Turns texts into an (n, dim) float32 array of L2-normalized rows."""
+
+    name: str
+    dim: int
+
+    def embed(self, texts: list[str], *, query: bool = False) -> np.ndarray:
+        """`query` marks a search query (vs. a document), for embedders that
+        embed the two differently."""
+        raise NotImplementedError
+
+
+class LocalEmbedder(Embedder):
+    """Signed feature hashing of words (stopwords dropped) and adjacent word
+    pairs, weighted 1 + log(count)."""
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self.name = f"local-hash-{dim}"
+
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def _bucket(feature: str, dim: int) -> tuple[int, float]:
+        # blake2b, not hash(): vectors must come out the same in every process.
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+        return h % dim, (1.0 if h >> 63 else -1.0)
+
+    def _vector(self, text: str) -> np.ndarray:
+        words = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+        features = Counter(words)
+        features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in features.items():
+            i, sign = self._bucket(feature, self.dim)
+            vector[i] += sign * (1.0 + math.log(count))
+        return vector
+
+    def embed(self, texts: list[str], *, query: bool = False) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize(np.stack([self._vector(t) for t in texts]))
+
+
+class GeminiEmbedder(Embedder):
+    def __init__(self, model: str, dim: int) -> None:
+        self.model = model
+        self.dim = dim
+        self.name = f"{model}-{dim}"
+
+    def embed(self, texts: list[str], *, query: bool = False) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        # A query is a search someone is waiting on; documents are background work.
+        values = provider.embed(texts, model=self.model, dimensions=self.dim,
+                                task_type="RETRIEVAL_QUERY" if query else "RETRIEVAL_DOCUMENT",
+                                priority=provider.PRIORITY_INTERACTIVE if query else provider.PRIORITY_BACKGROUND)
+        # Below the model's full size the vectors aren't unit length; make them so.
+        return _normalize(np.asarray(values, dtype=np.float32))
+
+
+EMBEDDERS = {
+    "local": lambda: LocalEmbedder(EMBED_DIM),
+    "gemini": lambda: GeminiEmbedder(EMBED_MODEL, EMBED_DIM),
+}
+
+_embedder: Optional[Embedder] = None
+
+
+def get_embedder() -> Optional[Embedder]:
+    """The configured embedder, or None with EMBED_BACKEND=off."""
+    global _embedder
+    if _embedder is None and EMBED_BACKEND != "off":
+        if EMBED_BACKEND not in EMBEDDERS:
+            raise RuntimeError(f"unknown EMBED_BACKEND {EMBED_BACKEND!r} (one of: off, {', '.join(EMBEDDERS)})")
+        _embedder = EMBEDDERS[EMBED_BACKEND]()
+    return _embedder
+
+
+def passages(segments: list[dict]) -> list[tuple[int, int, str]]:
+    """Consecutive transcript segments joined into passages of ~PASSAGE_WORDS
+    words: (start_ms, end_ms, text)."""
+    out: list[tuple[int, int, str]] = []
+    texts: list[str] = []
+    words = 0
+    start_ms = end_ms = 0
+    for seg in segments:
+        if not texts:
+            start_ms = seg["start_ms"]
+        texts.append(seg["text"])
+        words += len(seg["text"].split())
+        end_ms = seg["start_ms"] + seg["duration_ms"]
+        if words >= PASSAGE_WORDS:
+            out.append((start_ms, end_ms, " ".join(texts)))
+            texts, words = [], 0
+    if texts:
+        out.append((start_ms, end_ms, " ".join(texts)))
+    return out
+
+
+def documents(*, title: Optional[str], summary_md: Optional[str], segments: list[dict],
+              transcript_text: Optional[str] = None) -> list[tuple[str, Optional[int], Optional[int], str]]:
+    """What gets embedded for one video: (kind, start_ms, end_ms, text) for its
+    summary (with the title) and each transcript passage. Transcripts stored
+    before timed segments existed are cut by words alone (no times)."""
+    docs: list[tuple[str, Optional[int], Optional[int], str]] = []
+    if summary_md:
+        docs.append(("summary", None, None, f"{title}\n\n{summary_md}" if title else summary_md))
+    if segments:
+        docs.extend(("transcript", start_ms, end_ms, text) for start_ms, end_ms, text in passages(segments))
+    elif transcript_text:
+        words = transcript_text.split()
+        docs.extend(("transcript", None, None, " ".join(words[i:i + PASSAGE_WORDS]))
+                    for i in range(0, len(words), PASSAGE_WORDS))
+    return docs
@@ -0,0 +1,175 @@
+"""Per-model circuit breakers and health scores for the LLM fallback chain.
+
+Without this, a model that's down makes every call wait for it to fail before the
+next one is tried. Each model now has a breaker:
+
+  closed     normal; LLM_BREAKER_FAILURES consecutive failures open it.
+  open       skipped for a cool-down (LLM_BREAKER_COOLDOWN_SECONDS, doubling on
+             each re-trip up to 16×).
+  half_open  cool-down over: exactly one probe call is let through. Success
+             closes the breaker; failure re-opens it.
+
+Each model also keeps a health score: an exponentially weighted success rate
+(whose failures fade with time) discounted by its weighted latency. `chain()`
+puts a half-open model (due its probe) first; after that, models above
+_HEALTHY_SCORE keep their configured order and the unhealthy ones follow, best
+score first.
+
+State is per process and starts closed on restart.
+"""
+import threading
+import time
+from typing import Optional
+
+from app.config import LLM_BREAKER_COOLDOWN_SECONDS, LLM_BREAKER_FAILURES
+
+_EWMA_ALPHA = 0.2
+# Weighted latency at which the score is halved.
+_LATENCY_HALF_SCORE_SECONDS = 60.0
+# Models scoring at least this keep their configured order; the rest go after
+# them, best first. (Two straight failures leave a model at 0.64; a mean latency
+# of a minute alone halves it.)
+_HEALTHY_SCORE = 0.5
+# A demoted model gets little traffic to redeem itself with, so the failure part
+# of its score fades by half over this long without new outcomes.
+_SCORE_RECOVERY_HALF_LIFE_SECONDS = 300.0
+_MAX_COOLDOWN_FACTOR = 16
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# A half-open model goes first so its single probe actually gets sent (a call
+# that finds the probe already out just skips it).
+_STATE_RANK = {HALF_OPEN: 0, CLOSED: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """One model's breaker + health. Not thread-safe on its own — guarded by _lock."""
+
+    def __init__(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+        self.success_ewma = 1.0
+        self.latency_ewma: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_outcome_at = 0.0
+
+    def _refresh(self, now: float) -> None:
+        if self.state == OPEN and now >= self.opened_until:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+
+    def score(self, now: float) -> float:
+        fade = 0.5 ** ((now - self.last_outcome_at) / _SCORE_RECOVERY_HALF_LIFE_SECONDS)
+        success = 1.0 - (1.0 - self.success_ewma) * fade
+        latency = self.latency_ewma or 0.0
+        return success / (1.0 + latency / _LATENCY_HALF_SCORE_SECONDS)
+
+    def _open(self, now: float) -> None:
+        self.trips += 1
+        factor = min(2 ** (self.trips - 1), _MAX_COOLDOWN_FACTOR)
+        self.state = OPEN
+        self.opened_until = now + LLM_BREAKER_COOLDOWN_SECONDS * factor
+        self.probe_in_flight = False
+
+    def on_success(self, seconds: float, now: float) -> None:
+        self.last_outcome_at = now
+        self.success_ewma += _EWMA_ALPHA * (1.0 - self.success_ewma)
+        self.latency_ewma = seconds if self.latency_ewma is None else (
+            self.latency_ewma + _EWMA_ALPHA * (seconds - self.latency_ewma))
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.state = CLOSED
+        self.probe_in_flight = False
+
+    def on_failure(self, error: str, now: float) -> None:
+        self.last_outcome_at = now
+        self.success_ewma -= _EWMA_ALPHA * self.success_ewma
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN or self.consecutive_failures >= max(1, LLM_BREAKER_FAILURES):
+            self._open(now)
+
+    def snapshot(self, now: float) -> dict:
+        return {
+            "state": self.state,
+            "score": round(self.score(now), 3),
+            "success_rate": round(self.success_ewma, 3),
+            "latency_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": max(0, int(self.opened_until - now)) if self.state == OPEN else 0,
+            "last_error": self.last_error,
+        }
+
+
+_lock = threading.Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def _breaker(model: str) -> CircuitBreaker:
+    b = _breakers.get(model)
+    if b is None:
+        b = _breakers[model] = CircuitBreaker()
+    return b
+
+
+def chain(models: list[str]) -> list[str]:
+    """The models worth trying, best first. Open breakers are left out — unless
+    every breaker is open, in which case the one closest to its retry time is
+    returned (as a probe) rather than failing without trying anything."""
+    now = time.monotonic()
+    with _lock:
+        for m in models:
+            _breaker(m)._refresh(now)
+        usable = [m for m in models if _breakers[m].state != OPEN]
+        if not usable:
+            return [min(models, key=lambda m: _breakers[m].opened_until)] if models else []
+        scores = {m: _breakers[m].score(now) for m in usable}
+        return sorted(usable, key=lambda m: (_STATE_RANK[_breakers[m].state],
+                                             scores[m] < _HEALTHY_SCORE,
+                                             0.0 if scores[m] >= _HEALTHY_SCORE else -scores[m],
+                                             models.index(m)))
+
+
+def acquire(model: str) -> bool:
+    """May a call go to this model now? Claims the single probe of a half-open
+    breaker (release it with record_* or release())."""
+    now = time.monotonic()
+    with _lock:
+        b = _breaker(model)
+        b._refresh(now)
+        if b.state != CLOSED:  # half-open, or open but chain() fell back to it
+            if b.probe_in_flight:
+                return False
+            b.probe_in_flight = True
+        return True
+
+
+def release(model: str) -> None:
+    """Give back a probe whose call ended without an outcome (cancelled)."""
+    with _lock:
+        _breaker(model).probe_in_flight = False
+
+
+def record_success(model: str, seconds: float) -> None:
+    with _lock:
+        _breaker(model).on_success(seconds, time.monotonic())
+
+
+def record_failure(model: str, error: str) -> None:
+    with _lock:
+        b = _breaker(model)
+        was = b.state
+        b.on_failure(error, time.monotonic())
+        if b.state == OPEN and was != OPEN:
+            print(f"[llm] circuit OPEN for {model} ({b.consecutive_failures} failures) — "
+                  f"skipping it for {round(b.opened_until - time.monotonic())}s")
+
+
+def snapshot(models: list[str]) -> dict[str, dict]:
+    now = time.monotonic()
+    with _lock:
+        for m in models:
+            _breaker(m)._refresh(now)
+        return {m: _breakers[m].snapshot(now) for m in models}
@@ -0,0 +1,96 @@
+"""Per-model LLM call metrics: latency histograms and outcome counts.
+
+Every model call the provider makes is recorded here. The latency quantiles feed
+the hedged-request deadline, and the whole thing is reported on /api/status.
+Counts are per process and reset on restart.
+"""
+import threading
+from typing import Optional
+
+# Histogram bucket upper bounds, seconds; one extra overflow bucket past the last.
+BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram of one model's successful calls, plus
+    failure/timeout counts. Not thread-safe on its own — guarded by _lock."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.failures = 0
+        self.timeouts = 0
+
+    def observe(self, seconds: float) -> None:
+        i = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+        self.counts[i] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile (the max seen for
+        the overflow bucket); None with no samples."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(BUCKETS[i], self.max_seconds) if i < len(BUCKETS) else self.max_seconds
+        return self.max_seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.count,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "mean_seconds": round(self.total_seconds / self.count, 3) if self.count else None,
+            "p50_seconds": _round(self.quantile(0.5)),
+            "p95_seconds": _round(self.quantile(0.95)),
+            "max_seconds": round(self.max_seconds, 3) if self.count else None,
+            "buckets": {f"le_{b}": n for b, n in zip(BUCKETS, self.counts)} | {"overflow": self.counts[-1]},
+        }
+
+
+def _round(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds, 3) if seconds is not None else None
+
+
+_lock = threading.Lock()
+_models: dict[str, LatencyHistogram] = {}
+
+
+def _hist(model: str) -> LatencyHistogram:
+    h = _models.get(model)
+    if h is None:
+        h = _models[model] = LatencyHistogram()
+    return h
+
+
+def record_success(model: str, seconds: float) -> None:
+    with _lock:
+        _hist(model).observe(seconds)
+
+
+def record_failure(model: str, *, timeout: bool = False) -> None:
+    with _lock:
+        h = _hist(model)
+        h.failures += 1
+        if timeout:
+            h.timeouts += 1
+
+
+def quantile(model: str, q: float) -> tuple[Optional[float], int]:
+    """(q-th latency quantile or None, number of samples) for one model."""
+    with _lock:
+        h = _hist(model)
+        return h.quantile(q), h.count
+
+
+def snapshot() -> dict[str, dict]:
+    with _lock:
+        return {model: h.snapshot() for model, h in _models.items()}
@@ -3,10 +3,45 @@
 v2 uses Gemini, but every call site goes through `generate()` here so items 3/4
 (agentic deep-dives) can add Claude or a router later without touching the
 summarizer or quiz code. Keep this surface small and provider-neutral.
+
+Calls run on the genai async client, on one event loop the provider owns (a
+daemon thread), so a single client and its connection pool serve everyone: the
+blocking `generate()` used by worker threads and the awaitable `agenerate()` for
+async code both hand their request to that loop. Each model attempt has its own
+timeout (LLM_MODEL_TIMEOUT_SECONDS), waits its turn under the model's client-side
+quota first (app.llm.ratelimit), and its latency is recorded (app.llm.metrics).
+The chain is walked in health order, skipping models whose circuit breaker is
+open (app.llm.health).
+
+Hedged mode (LLM_HEDGE, or hedge=True per call): instead of waiting out a slow
+model before falling back, the next model in the chain is started alongside it
+once the first has run past its observed p95 latency. The first answer wins and
+the others are cancelled.
+
+Batch mode (`generate_batch()`, LLM_BATCH_BACKEND): many independent prompts at
+once, for background work nobody is waiting on. "gemini" submits them as Gemini
+batch jobs — as few as the inline request size limit allows — and polls them.
+Callers can record each job's name as it's created (`on_submit`) and pass it
+back after a restart (`submitted`), so a batch is polled again, not paid twice.
+Anything else runs them as concurrent ordinary calls on the provider loop, which
+also serves as the stand-in in tests.
+
+Embeddings (`embed()`, for app.llm.embeddings) go to the embedding model alone
+— no fallback chain — but otherwise like any model attempt: on the loop, under
+its own breaker, rate-limit bucket (its quota is separate from the chat models')
+and timeout.
 """
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, Iterator, Optional, TypeVar, Union
+
 from google import genai
 
-from app.config import GEMINI_API_KEY
+from app.config import (GEMINI_API_KEY, LLM_BATCH_BACKEND, LLM_BATCH_POLL_SECONDS,
+                        LLM_BATCH_TIMEOUT_SECONDS, LLM_HEDGE, LLM_MODEL_TIMEOUT_SECONDS)
+from app.llm import health, metrics, ratelimit
+from app.llm.chunking import estimate_tokens
 
 # Fallback chain — first model that succeeds wins (mirrors v1).
 MODELS = [
@@ -15,7 +50,24 @@ MODELS = [
     "gemini-2.5-flash",
 ]
 
+# Until a model has this many successful calls, hedge after a fixed delay
+# instead of its (not yet meaningful) p95.
+_HEDGE_MIN_SAMPLES = 20
+_HEDGE_DEFAULT_SECONDS = 30.0
+
+T = TypeVar("T")
+
 _client: genai.Client | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+# Priorities for the rate limiter's queue (app.llm.ratelimit): someone is waiting
+# on an interactive call; background work (auto-discovered videos) can queue.
+PRIORITY_BACKGROUND = 0
+PRIORITY_INTERACTIVE = 10
+
+# How long to hold a model's queue after Gemini reports it over quota.
+_QUOTA_PAUSE_SECONDS = 60.0
 
 
 def _get_client() -> genai.Client:
@@ -27,16 +79,448 @@ def _get_client() -> genai.Client:
     return _client
 
 
-def generate(prompt: str) -> tuple[str, str]:
-    """Return (text, model_used). Raises if all models fail."""
-    client = _get_client()
-    for model_name in MODELS:
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+class CircuitOpenError(RuntimeError):
+    """The model's breaker is open (or its half-open probe is already out)."""
+
+
+def _record_success(model_name: str, seconds: float) -> None:
+    metrics.record_success(model_name, seconds)
+    health.record_success(model_name, seconds)
+
+
+def _is_quota_error(e: BaseException) -> bool:
+    return getattr(e, "code", None) == 429 or "RESOURCE_EXHAUSTED" in str(e)
+
+
+def _record_failure(model_name: str, e: BaseException, *, timeout: bool = False) -> None:
+    metrics.record_failure(model_name, timeout=timeout)
+    if _is_quota_error(e):
+        # Over quota isn't ill health: pause the model's queue instead.
+        print(f"[llm] {model_name} over quota; holding its queue for {_QUOTA_PAUSE_SECONDS:.0f}s")
+        _get_loop().call_soon_threadsafe(ratelimit.penalize, model_name, _QUOTA_PAUSE_SECONDS)
+        health.release(model_name)
+        return
+    health.record_failure(model_name, f"{type(e).__name__}: {e}")
+
+
+async def _attempt(model_name: str, tokens: int, priority: int, request: Callable[[], Awaitable[T]]) -> T:
+    """One request to one model: waits for its rate-limit turn, then runs
+    `request()` under its timeout, recording the outcome for the model's breaker
+    and metrics. Cancellation (a lost hedge race) isn't recorded."""
+    if not health.acquire(model_name):
+        raise CircuitOpenError("circuit open")
+    try:
+        await ratelimit.acquire(model_name, tokens, priority)
+        start = time.monotonic()
+        result = await asyncio.wait_for(request(), timeout=LLM_MODEL_TIMEOUT_SECONDS)
+    except asyncio.CancelledError:
+        health.release(model_name)
+        raise
+    except TimeoutError as e:
+        _record_failure(model_name, e, timeout=True)
+        raise RuntimeError(f"timed out after {LLM_MODEL_TIMEOUT_SECONDS}s") from None
+    except Exception as e:
+        _record_failure(model_name, e)
+        raise
+    _record_success(model_name, time.monotonic() - start)
+    return result
+
+
+async def _call(model_name: str, prompt: str, tokens: int, priority: int) -> str:
+    """One attempt on one model. Returns non-empty text or raises."""
+    async def request() -> str:
+        resp = await _get_client().aio.models.generate_content(model=model_name, contents=prompt)
+        text = resp.text.strip() if resp.text else ""
+        if not text:
+            raise RuntimeError("empty response")
+        return text
+
+    return await _attempt(model_name, tokens, priority, request)
+
+
+def _chain() -> list[str]:
+    """health.chain(), with models paused for quota moved to the back: there's no
+    point queueing behind a minute-long pause while another model is free."""
+    return sorted(health.chain(MODELS), key=ratelimit.is_paused)
+
+
+async def _sequential(prompt: str, tokens: int, priority: int) -> tuple[str, str]:
+    for model_name in _chain():
         try:
-            resp = client.models.generate_content(model=model_name, contents=prompt)
-            text = resp.text.strip() if resp.text else ""
-            if text:
-                return text, model_name
+            return await _call(model_name, prompt, tokens, priority), model_name
         except Exception as e:  # noqa: BLE001 - try next model
             print(f"[llm] model {model_name} failed: {e}")
+    raise RuntimeError("All configured LLM models failed to generate content.")
+
+
+def _hedge_delay(model_name: str) -> float:
+    p95, samples = metrics.quantile(model_name, 0.95)
+    return p95 if p95 is not None and samples >= _HEDGE_MIN_SAMPLES else _HEDGE_DEFAULT_SECONDS
+
+
+async def _hedged(prompt: str, tokens: int, priority: int) -> tuple[str, str]:
+    """Race the chain: the next model starts when the newest one fails or runs
+    past its p95. First success wins; the rest are cancelled."""
+    remaining = _chain()
+    running: dict[asyncio.Task, str] = {}
+    launched_at = 0.0
+
+    def launch() -> None:
+        nonlocal launched_at
+        model_name = remaining.pop(0)
+        running[asyncio.create_task(_call(model_name, prompt, tokens, priority))] = model_name
+        launched_at = time.monotonic()
+
+    try:
+        launch()
+        while running:
+            timeout = None
+            if remaining:
+                newest = list(running.values())[-1]
+                timeout = max(0.0, launched_at + _hedge_delay(newest) - time.monotonic())
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                print(f"[llm] {list(running.values())[-1]} slow; hedging with {remaining[0]}")
+                launch()
+                continue
+            for task in done:
+                model_name = running.pop(task)
+                try:
+                    return task.result(), model_name
+                except Exception as e:  # noqa: BLE001 - the others may still answer
+                    print(f"[llm] model {model_name} failed: {e}")
+            if remaining:
+                launch()  # a failure falls through to the next model right away
+        raise RuntimeError("All configured LLM models failed to generate content.")
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def _generate(prompt: str, hedge: Optional[bool], priority: int) -> Coroutine[Any, Any, tuple[str, str]]:
+    _get_client()  # fail fast on a missing API key, not once per model
+    tokens = estimate_tokens(prompt)  # in the caller's thread, not on the loop
+    if LLM_HEDGE if hedge is None else hedge:
+        return _hedged(prompt, tokens, priority)
+    return _sequential(prompt, tokens, priority)
+
+
+async def agenerate(prompt: str, *, hedge: Optional[bool] = None,
+                    priority: int = PRIORITY_BACKGROUND) -> tuple[str, str]:
+    """Return (text, model_used). Raises if all models fail. `hedge` overrides
+    LLM_HEDGE for this call; higher `priority` queues ahead for rate limits."""
+    coro = _generate(prompt, hedge, priority)
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _get_loop()))
+
+
+def generate(prompt: str, *, hedge: Optional[bool] = None,
+             priority: int = PRIORITY_BACKGROUND) -> tuple[str, str]:
+    """Blocking agenerate(), for worker threads (never call it on an event loop)."""
+    return asyncio.run_coroutine_threadsafe(_generate(prompt, hedge, priority), _get_loop()).result()
+
+
+async def _next_chunk(stream: AsyncIterator[Any]) -> Any:
+    """The stream's next chunk (None at its end); TimeoutError if the model goes
+    quiet for LLM_MODEL_TIMEOUT_SECONDS."""
+    return await asyncio.wait_for(anext(stream, None), timeout=LLM_MODEL_TIMEOUT_SECONDS)
+
+
+def generate_stream(prompt: str, *, priority: int = PRIORITY_BACKGROUND) -> Iterator[tuple[str, str]]:
+    """Yield (text_delta, model_used) as the model produces output. Falls back to
+    the next model only while nothing has been yielded; once text has gone out,
+    a failure raises (the caller can't un-show it). Raises if all models fail.
+
+    The stream runs on the provider loop like any other call. The first chunk and
+    every gap between chunks get LLM_MODEL_TIMEOUT_SECONDS, so a stalled stream
+    fails instead of holding the caller's thread. A model's latency is recorded
+    when its stream ends — the whole call, comparable with generate()'s."""
+    _get_client()
+    tokens = estimate_tokens(prompt)
+    loop = _get_loop()
+
+    def run(coro: Coroutine[Any, Any, T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def open_stream(model_name: str) -> AsyncIterator[Any]:
+        return await _get_client().aio.models.generate_content_stream(model=model_name, contents=prompt)
+
+    for model_name in _chain():
+        if not health.acquire(model_name):
+            continue
+        try:
+            run(ratelimit.acquire(model_name, tokens, priority))
+        except BaseException:
+            health.release(model_name)
+            raise
+        start = time.monotonic()
+        started = False
+        stream = None
+        try:
+            stream = run(asyncio.wait_for(open_stream(model_name), timeout=LLM_MODEL_TIMEOUT_SECONDS))
+            while (chunk := run(_next_chunk(stream))) is not None:
+                if chunk.text:
+                    started = True
+                    yield chunk.text, model_name
+            if not started:
+                raise RuntimeError("empty response")
+        except GeneratorExit:
+            health.release(model_name)
+            raise
+        except TimeoutError as e:
+            _record_failure(model_name, e, timeout=True)
+            if started:
+                raise RuntimeError(f"{model_name} stream stalled for {LLM_MODEL_TIMEOUT_SECONDS}s") from None
+            print(f"[llm] model {model_name} failed: timed out after {LLM_MODEL_TIMEOUT_SECONDS}s")
+            continue
+        except Exception as e:  # noqa: BLE001 - try next model if nothing was sent yet
+            _record_failure(model_name, e)
+            if started:
+                raise
+            print(f"[llm] model {model_name} failed: {e}")
             continue
+        finally:
+            if stream is not None and hasattr(stream, "aclose"):
+                try:
+                    run(stream.aclose())
+                except Exception:  # noqa: BLE001 - the connection is dropped either way
+                    pass
+        _record_success(model_name, time.monotonic() - start)
+        return
     raise RuntimeError("All configured LLM models failed to generate content.")
+
+
+# Terminal states of a Gemini batch job.
+_BATCH_SUCCEEDED = "JOB_STATE_SUCCEEDED"
+_BATCH_ENDED = {_BATCH_SUCCEEDED, "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+
+def _batch_state(job) -> str:
+    return str(getattr(job.state, "value", job.state))
+
+
+# Gemini takes at most 20 MB of inlined requests per batch job. Prompts are
+# grouped into jobs under this size (leaving room for the request envelope);
+# a prompt too big to go inline at all is failed here, and its caller falls back
+# to an ordinary call.
+_BATCH_INLINE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def _batch_groups(prompts: list[str]) -> tuple[list[list[int]], list[int]]:
+    """Prompt indices grouped into batch jobs of at most _BATCH_INLINE_MAX_BYTES
+    each (in order), and the indices of prompts too large for any job."""
+    groups: list[list[int]] = []
+    oversized: list[int] = []
+    size = 0
+    for i, prompt in enumerate(prompts):
+        n = len(prompt.encode("utf-8"))
+        if n > _BATCH_INLINE_MAX_BYTES:
+            oversized.append(i)
+            continue
+        if not groups or size + n > _BATCH_INLINE_MAX_BYTES:
+            groups.append([])
+            size = 0
+        groups[-1].append(i)
+        size += n
+    return groups, oversized
+
+
+# A prompt's place in a Gemini batch job: (job name, position among its requests).
+BatchRef = tuple[str, int]
+
+
+def _batch_model(job, default: str) -> str:
+    return (getattr(job, "model", None) or default).removeprefix("models/")
+
+
+def _batch_results(job, positions: list[int], default_model: str) -> list[Union[tuple[str, str], Exception]]:
+    """The results at `positions` of an ended batch job."""
+    if _batch_state(job) != _BATCH_SUCCEEDED:
+        return [RuntimeError(f"batch {job.name} ended {_batch_state(job)}: {job.error}")] * len(positions)
+    model_name = _batch_model(job, default_model)
+    responses = (job.dest.inlined_responses if job.dest else None) or []
+    out: list[Union[tuple[str, str], Exception]] = []
+    for i in positions:
+        r = responses[i] if i < len(responses) else None
+        if r is None:
+            out.append(RuntimeError("missing from batch result"))
+        elif r.error is not None:
+            out.append(RuntimeError(f"batch item failed: {r.error}"))
+        else:
+            text = r.response.text.strip() if r.response and r.response.text else ""
+            out.append((text, model_name) if text else RuntimeError("empty response"))
+    return out
+
+
+def _cancel_batch(client: genai.Client, name: str) -> None:
+    try:
+        client.batches.cancel(name=name)
+    except Exception as e:  # noqa: BLE001 - it's abandoned either way
+        print(f"[llm] batch {name} cancel failed: {e}")
+
+
+def _gemini_batch(prompts: list[str], submitted: Optional[list[Optional[BatchRef]]] = None,
+                  on_submit: Optional[Callable[[str, list[int]], None]] = None,
+                  ) -> list[Union[tuple[str, str], Exception]]:
+    """Gemini batch jobs for all prompts — as few as fit the inline size limit —
+    on the healthiest model, polled until they end. Batch jobs have their own
+    quota, so the rate limiter isn't involved, and their latency says nothing
+    about the model's health. A job that fails fails only its own prompts.
+    Prompts already `submitted` are polled in their job again (resubmitted if it
+    is gone); if creating a job fails, the ones created before it are cancelled."""
+    client = _get_client()
+    model_name = _chain()[0]
+    out: list[Union[tuple[str, str], Exception]] = [RuntimeError("not batched")] * len(prompts)
+    pending: dict[str, tuple[Any, list[tuple[int, int]]]] = {}  # job name -> (job, [(prompt, position)])
+
+    resumed: dict[str, list[tuple[int, int]]] = {}
+    for i, ref in enumerate(submitted or []):
+        if ref:
+            resumed.setdefault(ref[0], []).append((i, ref[1]))
+    for name, items in resumed.items():
+        try:
+            pending[name] = (client.batches.get(name=name), items)
+            print(f"[llm] batch {name}: resuming {len(items)} prompts")
+        except Exception as e:  # noqa: BLE001 - submit them again instead
+            print(f"[llm] batch {name} can't be resumed, resubmitting its prompts: {e}")
+
+    taken = {i for _, items in pending.values() for i, _ in items}
+    fresh = [i for i in range(len(prompts)) if i not in taken]
+    groups, oversized = _batch_groups([prompts[i] for i in fresh])
+    for k in oversized:
+        out[fresh[k]] = RuntimeError(f"prompt over {_BATCH_INLINE_MAX_BYTES} bytes; too large for a batch")
+
+    stamp = int(time.time())
+    created: list[str] = []
+    try:
+        for n, group in enumerate(groups):
+            indices = [fresh[k] for k in group]
+            job = client.batches.create(
+                model=model_name,
+                src=[{"contents": [{"role": "user", "parts": [{"text": prompts[i]}]}]} for i in indices],
+                config={"display_name": f"yts-summaries-{stamp}-{n + 1}"},
+            )
+            created.append(job.name)
+            print(f"[llm] batch {job.name}: {len(indices)} prompts on {model_name}")
+            pending[job.name] = (job, list(zip(indices, range(len(indices)))))
+            if on_submit:
+                on_submit(job.name, indices)
+    except BaseException:
+        for name in created:
+            _cancel_batch(client, name)
+        raise
+
+    deadline = time.monotonic() + LLM_BATCH_TIMEOUT_SECONDS
+    while pending:
+        for name, (job, items) in list(pending.items()):
+            if _batch_state(job) in _BATCH_ENDED:
+                for (i, _), result in zip(items, _batch_results(job, [pos for _, pos in items], model_name)):
+                    out[i] = result
+                del pending[name]
+        if not pending:
+            break
+        if time.monotonic() >= deadline:
+            for name, (_, items) in pending.items():
+                _cancel_batch(client, name)
+                for i, _ in items:
+                    out[i] = RuntimeError(f"batch {name} not done after {LLM_BATCH_TIMEOUT_SECONDS}s")
+            break
+        time.sleep(LLM_BATCH_POLL_SECONDS)
+        pending = {name: (client.batches.get(name=name), items) for name, (_, items) in pending.items()}
+    return out
+
+
+async def _local_batch(prompts: list[str], tokens: list[int],
+                       priority: int) -> list[Union[tuple[str, str], Exception]]:
+    return await asyncio.gather(*(_sequential(p, t, priority) for p, t in zip(prompts, tokens)),
+                                return_exceptions=True)
+
+
+def generate_batch(prompts: list[str], *, priority: int = PRIORITY_BACKGROUND,
+                   backend: Optional[str] = None, submitted: Optional[list[Optional[BatchRef]]] = None,
+                   on_submit: Optional[Callable[[str, list[int]], None]] = None,
+                   ) -> list[Union[tuple[str, str], Exception]]:
+    """Blocking: generate every prompt as one batch (`backend` overrides
+    LLM_BATCH_BACKEND). Returns, in prompt order, (text, model_used) or the
+    exception that item failed with. Raises if the batch can't be submitted.
+
+    Gemini backend only: `on_submit(job_name, prompt_indices)` is called as each
+    batch job is created (indices in the job's order), and `submitted` gives,
+    per prompt, the BatchRef it was submitted as before — or None."""
+    if not prompts:
+        return []
+    if (backend or LLM_BATCH_BACKEND) == "gemini":
+        return _gemini_batch(prompts, submitted, on_submit)
+    _get_client()
+    tokens = [estimate_tokens(p) for p in prompts]
+    return asyncio.run_coroutine_threadsafe(_local_batch(prompts, tokens, priority), _get_loop()).result()
+
+
+# Texts per embedding request.
+_EMBED_BATCH = 100
+
+# Embedding models used so far, for status() (they aren't in MODELS).
+_embed_models: list[str] = []
+
+
+async def _embed(texts: list[str], tokens: list[int], model: str, config: dict,
+                 priority: int) -> list[list[float]]:
+    out: list[list[float]] = []
+    for i in range(0, len(texts), _EMBED_BATCH):
+        async def request(batch=texts[i:i + _EMBED_BATCH]):
+            return await _get_client().aio.models.embed_content(model=model, contents=batch, config=config)
+
+        response = await _attempt(model, sum(tokens[i:i + _EMBED_BATCH]), priority, request)
+        out.extend(e.values for e in response.embeddings or [])
+    return out
+
+
+def embed(texts: list[str], *, model: str, dimensions: int, task_type: str,
+          priority: int = PRIORITY_BACKGROUND) -> list[list[float]]:
+    """Blocking: an embedding vector per text, in order, from a Gemini embedding
+    model. task_type is e.g. RETRIEVAL_DOCUMENT or RETRIEVAL_QUERY. Requests of
+    up to _EMBED_BATCH texts each, under the model's own breaker, rate limit and
+    timeout like any other model call (but with no fallback model)."""
+    _get_client()
+    if model not in _embed_models:
+        _embed_models.append(model)
+    tokens = [estimate_tokens(t) for t in texts]
+    config = {"task_type": task_type, "output_dimensionality": dimensions}
+    out = asyncio.run_coroutine_threadsafe(_embed(texts, tokens, model, config, priority), _get_loop()).result()
+    if len(out) != len(texts):
+        raise RuntimeError(f"{model} returned {len(out)} embeddings for {len(texts)} texts")
+    return out
+
+
+def status() -> dict:
+    """For /api/status: the configured and current (health-ordered) chain,
+    hedging and batch modes, per-model breakers, rate-limit buckets and call metrics."""
+    models = MODELS + _embed_models
+    return {"models": MODELS, "chain": _chain(), "hedge": LLM_HEDGE, "batch_backend": LLM_BATCH_BACKEND,
+            "timeout_seconds": LLM_MODEL_TIMEOUT_SECONDS, "breakers": health.snapshot(models),
+            "rate_limits": ratelimit.snapshot(models), "metrics": metrics.snapshot()}
+
+
+def close() -> None:
+    """Close the async client's connections and stop the provider loop (shutdown)."""
+    global _loop, _client
+    with _loop_lock:
+        loop, _loop = _loop, None
+    client, _client = _client, None
+    if loop is None:
+        return
+    if client is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(client.aio.aclose(), loop).result(timeout=5)
+        except Exception as e:  # noqa: BLE001 - best effort on shutdown
+            print(f"[llm] client close failed: {e}")
+    loop.call_soon_threadsafe(loop.stop)
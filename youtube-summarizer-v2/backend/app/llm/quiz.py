@@ -8,7 +8,7 @@ import json
 import re
 from typing import Optional
 
-from app.llm.provider import generate
+from app.llm.provider import PRIORITY_INTERACTIVE, generate
 
 MAX_CONTENT_CHARS = 120_000
 
@@ -61,7 +61,8 @@ def generate_quiz(*, summary: str, transcript: Optional[str] = None, num_questio
     # Prefer the summary (dense, on-topic); fall back to a transcript slice if no summary.
     content = summary.strip() if summary and summary.strip() else (transcript or "")[:MAX_CONTENT_CHARS]
     content = content[:MAX_CONTENT_CHARS]
-    text, model = generate(_PROMPT.format(n=num_questions, content=content))
+    # Someone is waiting on the quiz: queue it ahead of background summaries.
+    text, model = generate(_PROMPT.format(n=num_questions, content=content), priority=PRIORITY_INTERACTIVE)
     data = _extract_json(text)
     questions = _validate(data.get("questions", []))
     if not questions:
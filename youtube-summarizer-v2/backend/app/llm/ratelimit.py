@@ -0,0 +1,146 @@
+"""Client-side Gemini quota: a requests-per-minute and a tokens-per-minute token
+bucket per model, shared by every caller (summarizer, quiz, streaming).
+
+Instead of sending calls until Gemini answers 429 and then retrying blindly,
+each model call first waits its turn here. Waiters queue by priority, then
+arrival, so a manual request (or a quiz someone is waiting on) goes ahead of
+background summaries without starving them of order among themselves. A big
+request at the head of the queue isn't overtaken by smaller ones behind it.
+
+When Gemini does answer with a quota error anyway (our numbers are estimates and
+other clients may share the key), `penalize()` pauses that model's queue.
+
+Limits come from LLM_MODEL_RPM / LLM_MODEL_TPM, overridable per model with
+LLM_MODEL_LIMITS. Queues and buckets are only changed on the provider's event
+loop (see app.llm.provider), so they need no locks; other threads only read
+them (is_paused, snapshot).
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Optional
+
+from app.config import LLM_MODEL_LIMITS, LLM_MODEL_RPM, LLM_MODEL_TPM
+
+
+class _Bucket:
+    """`capacity` units per minute, refilled continuously; starts full."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, units: float) -> float:
+        return 0.0 if self.level >= units else (units - self.level) / self.rate
+
+
+class ModelLimiter:
+    """One model's RPM + TPM buckets and its priority queue of waiters."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = _Bucket(rpm) if rpm > 0 else None
+        self.tokens = _Bucket(tpm) if tpm > 0 else None
+        self.paused_until = 0.0
+        self._queue: list[tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.waited_seconds = 0.0
+
+    async def acquire(self, tokens: int, priority: int) -> None:
+        if self.tokens is not None:
+            tokens = min(tokens, self.tokens.capacity)  # else it could never fit
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (-priority, next(self._seq), float(tokens), fut))
+        start = time.monotonic()
+        self._pump()
+        try:
+            await fut
+        finally:
+            if fut.cancelled():
+                self._pump()  # it may have been blocking the head of the queue
+        self.waited_seconds += time.monotonic() - start
+
+    def penalize(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        if self.requests is not None:
+            self.requests.level = 0.0
+
+    def _pump(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.refill(now)
+        while self._queue:
+            _, _, tokens, fut = self._queue[0]
+            if fut.done():  # cancelled while waiting
+                heapq.heappop(self._queue)
+                continue
+            wait = max(self.paused_until - now,
+                       self.requests.wait_for(1) if self.requests is not None else 0.0,
+                       self.tokens.wait_for(tokens) if self.tokens is not None else 0.0)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._pump)
+                return
+            heapq.heappop(self._queue)
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                self.tokens.level -= tokens
+            self.granted += 1
+            fut.set_result(None)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "rpm": int(self.requests.capacity) if self.requests else None,
+            "tpm": int(self.tokens.capacity) if self.tokens else None,
+            "requests_available": round(self.requests.level, 1) if self.requests else None,
+            "tokens_available": int(self.tokens.level) if self.tokens else None,
+            "queued": sum(1 for *_, fut in self._queue if not fut.done()),
+            "paused_seconds": max(0, round(self.paused_until - now)),
+            "granted": self.granted,
+            "mean_wait_seconds": round(self.waited_seconds / self.granted, 3) if self.granted else None,
+        }
+
+
+_limiters: dict[str, ModelLimiter] = {}
+
+
+def limiter(model: str) -> ModelLimiter:
+    lim = _limiters.get(model)
+    if lim is None:
+        override = LLM_MODEL_LIMITS.get(model, {})
+        # setdefault: other threads read limiters too (is_paused, snapshot).
+        lim = _limiters.setdefault(model, ModelLimiter(int(override.get("rpm", LLM_MODEL_RPM)),
+                                                       int(override.get("tpm", LLM_MODEL_TPM))))
+    return lim
+
+
+async def acquire(model: str, tokens: int, priority: int = 0) -> None:
+    """Wait (on the provider loop) until `model` has room for one request of
+    ~`tokens` input tokens, behind any higher-priority or earlier waiters."""
+    await limiter(model).acquire(tokens, priority)
+
+
+def penalize(model: str, seconds: float) -> None:
+    """Gemini said we're over quota: hold this model's queue for `seconds`."""
+    limiter(model).penalize(seconds)
+
+
+def is_paused(model: str) -> bool:
+    return limiter(model).paused_until > time.monotonic()
+
+
+def snapshot(models: list[str]) -> dict[str, dict]:
+    return {m: limiter(m).snapshot() for m in models}
@@ -2,16 +2,27 @@
 
 Same detail levels (1=overview, 2=thorough, 3=expert structured) and the same
 chunk-then-consolidate strategy for very long transcripts, but the model call now
-goes through the provider abstraction.
+goes through the provider abstraction, chunks are summarized concurrently, and
+many partial summaries are merged as a tree. Finished summaries are memoized (see
+app.llm.cache), so re-asking for the same one doesn't call the model again.
+`summarize_batch()` does many videos at once through the provider's batch mode.
 """
-import time
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
-from app.llm.provider import generate
+from app.config import LLM_CHUNK_CONCURRENCY, LLM_CHUNK_OVERLAP_TOKENS, LLM_REDUCE_FANIN
+from app.llm import cache
+from app.llm.chunking import chunk_text, estimate_tokens
+from app.llm.provider import MODELS, PRIORITY_BACKGROUND, generate, generate_batch, generate_stream
 
-# ~100k tokens at ~4 chars/token.
-MAX_SINGLE_PASS_CHARS = 400_000
-CHUNK_SIZE_CHARS = 400_000
+# Part of the cache key: bump whenever a prompt below (or how a transcript is
+# split into them) changes, so old cached summaries stop matching.
+PROMPT_VERSION = 3
+
+# Estimated tokens (app.llm.chunking.estimate_tokens).
+MAX_SINGLE_PASS_TOKENS = 100_000
+CHUNK_TOKENS = 100_000
 
 DETAIL_PROMPTS = {
     1: (
@@ -56,45 +67,171 @@ def _context_block(channel_name: Optional[str], video_title: Optional[str]) -> s
 
 
 def _chunks(text: str) -> list[str]:
-    return [text[i:i + CHUNK_SIZE_CHARS] for i in range(0, len(text), CHUNK_SIZE_CHARS)]
+    return chunk_text(text, max_tokens=CHUNK_TOKENS, overlap_tokens=LLM_CHUNK_OVERLAP_TOKENS)
+
+
+def _cache_key(detail: int, context: str, transcript: str) -> str:
+    return cache.make_key("summary", PROMPT_VERSION, ",".join(MODELS), LLM_CHUNK_OVERLAP_TOKENS,
+                          detail, context, transcript)
+
+
+def _fits_single_pass(transcript: str) -> bool:
+    # No text has more tokens than characters, so short ones skip the estimate.
+    return len(transcript) <= MAX_SINGLE_PASS_TOKENS or estimate_tokens(transcript) <= MAX_SINGLE_PASS_TOKENS
 
 
 def summarize(transcript: str, *, detail: int = 2, channel_name: Optional[str] = None,
-              video_title: Optional[str] = None) -> tuple[str, str]:
-    """Return (summary_markdown, model_used). Raises on failure."""
+              video_title: Optional[str] = None,
+              on_partial: Optional[Callable[[str], None]] = None,
+              priority: int = PRIORITY_BACKGROUND) -> tuple[str, str]:
+    """Return (summary_markdown, model_used). Raises on failure. If `on_partial`
+    is given, the final model call is streamed and it's called with the text so
+    far after every delta. `priority` is the model calls' rate-limit priority."""
     context = _context_block(channel_name, video_title)
+    key = _cache_key(detail, context, transcript)
+    cached = cache.get(key)
+    if cached:
+        return cached
+
+    summary, model = _summarize(transcript, detail, context, on_partial, priority)
+    cache.put(key, summary, model)
+    return summary, model
 
-    if len(transcript) <= MAX_SINGLE_PASS_CHARS:
-        return generate(DETAIL_PROMPTS[detail] + context + transcript)
 
-    # Long transcript: summarize each chunk, then consolidate.
+def _summarize(transcript: str, detail: int, context: str,
+               on_partial: Optional[Callable[[str], None]], priority: int) -> tuple[str, str]:
+    if _fits_single_pass(transcript):
+        return _generate_final(DETAIL_PROMPTS[detail] + context + transcript, on_partial, priority)
+
+    # Long transcript: summarize the chunks concurrently (map), then merge the
+    # partials — in groups if there are many (tree reduce) — keeping their order.
     chunk_instructions = (
         "Summarize the following YouTube transcript chunk thoroughly. "
         "Capture every key point, argument, example, and detail — do not skip anything.\n\n"
     )
-    partials: list[str] = []
-    last_model = ""
-    for chunk in _chunks(transcript):
-        text, last_model = generate(chunk_instructions + context + chunk)
-        partials.append(text)
-        time.sleep(1)
+    partials = [text for text, _ in _map_ordered([chunk_instructions + context + chunk
+                                                  for chunk in _chunks(transcript)], priority)]
+
+    merge_instructions = (
+        "You are given consecutive summaries of parts of a YouTube video, in order. Merge them "
+        "into one summary of that stretch of the video, preserving every key point and detail "
+        "and their order.\n\n"
+    )
+    fanin = max(2, LLM_REDUCE_FANIN)
+    while len(partials) > fanin:
+        groups = [partials[i:i + fanin] for i in range(0, len(partials), fanin)]
+        merged = iter(_map_ordered([merge_instructions + context + "\n\n".join(g)
+                                    for g in groups if len(g) > 1], priority))
+        # A lone trailing partial goes up a level as-is.
+        partials = [next(merged)[0] if len(g) > 1 else g[0] for g in groups]
 
     combined = "\n\n".join(partials)
     final_instructions = (
         "You are given summaries of parts of a YouTube video. Combine them into a "
         "single, well-structured summary that preserves all key points and details.\n\n"
     )
-    return generate(final_instructions + context + combined)
+    return _generate_final(final_instructions + context + combined, on_partial, priority)
+
+
+def _generate_final(prompt: str, on_partial: Optional[Callable[[str], None]],
+                    priority: int) -> tuple[str, str]:
+    """The call whose output is the summary: streamed when someone is watching."""
+    if on_partial is None:
+        return generate(prompt, priority=priority)
+    text, model = "", ""
+    for delta, model in generate_stream(prompt, priority=priority):
+        text += delta
+        on_partial(text)
+    return text.strip(), model
+
+
+# Shared by every job so parallel summarize workers can't multiply the number of
+# chunk calls in flight.
+_chunk_slots = threading.BoundedSemaphore(max(1, LLM_CHUNK_CONCURRENCY))
+
+
+def _generate_slotted(prompt: str, priority: int) -> tuple[str, str]:
+    with _chunk_slots:
+        return generate(prompt, priority=priority)
+
+
+def _map_ordered(prompts: list[str], priority: int) -> list[tuple[str, str]]:
+    """generate() over prompts concurrently; results come back in prompt order.
+    The first failure cancels whatever hasn't started and is re-raised."""
+    if len(prompts) == 1:
+        return [_generate_slotted(prompts[0], priority)]
+    pool = ThreadPoolExecutor(max_workers=min(len(prompts), max(1, LLM_CHUNK_CONCURRENCY)),
+                              thread_name_prefix="llm-chunk")
+    try:
+        return list(pool.map(_generate_slotted, prompts, [priority] * len(prompts)))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
 
 def safe_summarize(transcript: str, *, detail: int = 2, channel_name: Optional[str] = None,
-                   video_title: Optional[str] = None) -> tuple[Optional[tuple[str, str]], Optional[str]]:
+                   video_title: Optional[str] = None, on_partial: Optional[Callable[[str], None]] = None,
+                   priority: int = PRIORITY_BACKGROUND,
+                   ) -> tuple[Optional[tuple[str, str]], Optional[str]]:
     """Return ((summary_markdown, model_used), None) on success, or
     (None, error_detail) on failure — the caller records/emails the detail
     instead of the error being lost to a print."""
     try:
-        return summarize(transcript, detail=detail, channel_name=channel_name, video_title=video_title), None
+        return summarize(transcript, detail=detail, channel_name=channel_name, video_title=video_title,
+                         on_partial=on_partial, priority=priority), None
     except Exception as e:  # noqa: BLE001
         detail_msg = f"{type(e).__name__}: {e}"
         print(f"[summarizer] failed: {detail_msg}")
         return None, detail_msg
+
+
+def summarize_batch(items: list[dict], *, priority: int = PRIORITY_BACKGROUND,
+                    on_submit: Optional[Callable[[str, list[int]], None]] = None,
+                    ) -> list[tuple[Optional[tuple[str, str]], Optional[str]]]:
+    """safe_summarize() over many transcripts at once. Each item is a dict with
+    "transcript" and optional "detail", "channel_name", "video_title" and
+    "batch" (the provider.BatchRef it was submitted as by an earlier attempt).
+
+    Cached summaries are served as usual; the single-pass ones left go to the
+    model as one batch (provider.generate_batch; `on_submit` gets each batch
+    job's name with the indices of the items in it, in order). Long
+    transcripts, and any item the batch failed on, are then summarized one by
+    one. Results come back in item order, shaped like safe_summarize()'s."""
+    results: list[Optional[tuple[Optional[tuple[str, str]], Optional[str]]]] = [None] * len(items)
+    batched: list[tuple[int, str, str]] = []  # (item index, cache key, prompt)
+    for i, item in enumerate(items):
+        transcript, detail = item["transcript"], item.get("detail", 2)
+        context = _context_block(item.get("channel_name"), item.get("video_title"))
+        key = _cache_key(detail, context, transcript)
+        cached = cache.get(key)
+        if cached:
+            results[i] = (cached, None)
+        elif _fits_single_pass(transcript):
+            batched.append((i, key, DETAIL_PROMPTS[detail] + context + transcript))
+
+    if batched:
+        try:
+            outputs = generate_batch(
+                [prompt for _, _, prompt in batched], priority=priority,
+                submitted=[items[i].get("batch") for i, _, _ in batched],
+                on_submit=(lambda name, indices: on_submit(name, [batched[k][0] for k in indices]))
+                if on_submit else None,
+            )
+        except Exception as e:  # noqa: BLE001 - every item falls back below
+            print(f"[summarizer] batch of {len(batched)} failed, summarizing one by one: "
+                  f"{type(e).__name__}: {e}")
+            outputs = [e] * len(batched)
+        failed = 0
+        for (i, key, _), out in zip(batched, outputs):
+            if isinstance(out, Exception):
+                failed += 1
+                continue
+            cache.put(key, *out)
+            results[i] = (out, None)
+        print(f"[summarizer] batch of {len(batched)}: {len(batched) - failed} done, {failed} left to retry singly")
+
+    for i, item in enumerate(items):
+        if results[i] is None:
+            results[i] = safe_summarize(item["transcript"], detail=item.get("detail", 2),
+                                        channel_name=item.get("channel_name"),
+                                        video_title=item.get("video_title"), priority=priority)
+    return results
@@ -14,17 +14,23 @@ from fastapi.staticfiles import StaticFiles
 
 from app import config, scheduler
 from app.api import actions, auth, channels, content
-from app.db.database import init_db
+from app.db.database import close_pool, init_db
+from app.llm import provider
+from app.youtube import fetcher, gate
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    gate.load_state()
     scheduler.start()
     try:
         yield
     finally:
         await scheduler.stop()
+        fetcher.close_sessions()
+        provider.close()
+        close_pool()
 
 
 app = FastAPI(title="YouTube Summarizer v2", version="2.0.0", lifespan=lifespan)
@@ -1,23 +1,30 @@
 """Lifecycle: the in-process scheduler + worker that replace v1's external cron.
 
-APScheduler fires discovery every POLL_INTERVAL_MINUTES; the worker coroutine
-drains the resulting jobs over time. This means the app is self-contained — no
+APScheduler fires discovery every POLL_INTERVAL_MINUTES (only channels whose
+adaptive next_check_at has passed are fetched); the worker lanes drain the
+resulting jobs over time, and the stage workers take each video on through
+summarize and notify. This means the app is self-contained — no
 home-server-scheduler needed — though `POST /poll` still triggers discovery on
-demand.
+demand. A second, low-key job keeps the search index compact while the queue is
+idle, and one shortly after startup queues any summarized videos still missing
+from the semantic index.
 """
+import asyncio
 from datetime import datetime, timedelta
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from app.config import POLL_INTERVAL_MINUTES
+from app import wakeup
+from app.config import (EMBED_BACKEND, POLL_INTERVAL_MINUTES, SEARCH_OPTIMIZE_BUDGET_SECONDS,
+                        SEARCH_OPTIMIZE_INTERVAL_MINUTES)
+from app.db import repos, search_index, vector_index
 from app.discovery import run_discovery
-from app.worker import worker
+from app.worker import stage_workers, worker
 
 _scheduler: AsyncIOScheduler | None = None
 
 
 async def _discovery_job() -> None:
-    import asyncio
     try:
         stats = await asyncio.to_thread(run_discovery)
         print(f"[discovery] {stats}")
@@ -25,9 +32,33 @@ async def _discovery_job() -> None:
         print(f"[discovery] error: {e}")
 
 
+async def _search_index_job() -> None:
+    """Merge search index segments — only while nothing is being processed, so
+    it never competes with a job for the database."""
+    if repos.job_queue_stats().get("running"):
+        return
+    try:
+        result = await asyncio.to_thread(search_index.run_maintenance, SEARCH_OPTIMIZE_BUDGET_SECONDS)
+        print(f"[search] maintenance: {result['merged']}")
+    except Exception as e:  # noqa: BLE001
+        print(f"[search] maintenance error: {e}")
+
+
+async def _embedding_backfill_job() -> None:
+    """Queue embeddings for summarized videos the current embedder hasn't seen
+    (first run with semantic search, or after changing the embedder)."""
+    try:
+        await asyncio.to_thread(vector_index.backfill)
+    except Exception as e:  # noqa: BLE001
+        print(f"[semantic] backfill error: {e}")
+
+
 def start() -> None:
     global _scheduler
+    wakeup.bind(asyncio.get_running_loop())
     worker.start()
+    for stage in stage_workers:
+        stage.start()
     _scheduler = AsyncIOScheduler()
     _scheduler.add_job(
         _discovery_job,
@@ -41,6 +72,23 @@ def start() -> None:
         # fires), so we must pass a real datetime here.
         next_run_time=datetime.now() + timedelta(seconds=10),
     )
+    if SEARCH_OPTIMIZE_INTERVAL_MINUTES > 0:
+        _scheduler.add_job(
+            _search_index_job,
+            "interval",
+            minutes=SEARCH_OPTIMIZE_INTERVAL_MINUTES,
+            id="search_index",
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now() + timedelta(minutes=5),
+        )
+    if EMBED_BACKEND != "off":
+        _scheduler.add_job(
+            _embedding_backfill_job,
+            "date",
+            id="embedding_backfill",
+            run_date=datetime.now() + timedelta(seconds=30),
+        )
     _scheduler.start()
     print(f"[scheduler] discovery every {POLL_INTERVAL_MINUTES} min")
 
@@ -49,6 +97,8 @@ async def stop() -> None:
     if _scheduler:
         _scheduler.shutdown(wait=False)
     await worker.stop()
+    for stage in stage_workers:
+        await stage.stop()
 
 
 def next_poll_at() -> int | None:
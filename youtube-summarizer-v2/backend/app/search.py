@@ -0,0 +1,102 @@
+"""The search modes behind /api/search.
+
+  • lexical (default) — FTS5/BM25 over summaries and transcripts (repos.search).
+  • semantic — the videos whose summary or transcript passage vectors are
+    nearest the query's (app.llm.embeddings, app.db.vector_index): finds videos
+    about a subject even when they put it in other words.
+  • hybrid — the SEARCH_HYBRID_CANDIDATES best lexical matches re-ranked by a
+    blend of BM25 and vector similarity (SEARCH_HYBRID_VECTOR_WEIGHT percent;
+    a video not embedded yet has similarity 0).
+
+Every mode returns rows of one shape — video_id, rank (lower is better), sources,
+snippet, title, channel_name, url, timestamp_ms — ordered by (rank, video_id),
+so they all page with the same (rank, video_id) cursor.
+"""
+from typing import Optional
+
+from app.config import SEARCH_HYBRID_CANDIDATES, SEARCH_HYBRID_VECTOR_WEIGHT
+from app.db import repos, vector_index
+from app.llm.embeddings import get_embedder
+
+MODES = ("lexical", "semantic", "hybrid")
+
+# Length of a semantic match's snippet.
+_SNIPPET_WORDS = 40
+
+
+class SemanticSearchOff(RuntimeError):
+    """A semantic or hybrid search with EMBED_BACKEND=off."""
+
+
+def _excerpt(text: str) -> str:
+    words = text.replace("#", " ").replace("*", " ").split()
+    return " ".join(words[:_SNIPPET_WORDS]) + (" …" if len(words) > _SNIPPET_WORDS else "")
+
+
+def _semantic_snippet(match: dict) -> str:
+    """The text of the matched vector: the transcript passage (from its
+    segments), or the summary."""
+    if match["kind"] == "transcript" and match["start_ms"] is not None:
+        segments = repos.get_transcript_segments(match["video_id"], start_ms=match["start_ms"],
+                                                 end_ms=match["end_ms"], limit=-1)
+        if segments:
+            return _excerpt(" ".join(s["text"] for s in segments))
+    summary = repos.get_latest_summary(match["video_id"])
+    return _excerpt(summary["summary_md"]) if summary else ""
+
+
+def _query_vector(query: str):
+    embedder = get_embedder()
+    index = vector_index.get_index()
+    if embedder is None or index is None:
+        raise SemanticSearchOff("semantic search is off (EMBED_BACKEND=off)")
+    return index, embedder.embed([query], query=True)[0]
+
+
+def semantic(query: str, limit: int = 30, *, after: Optional[tuple[float, str]] = None) -> list[dict]:
+    index, vector = _query_vector(query)
+    matches = index.search(vector, limit, after=(-after[0], after[1]) if after else None)
+    videos = repos.get_videos([m["video_id"] for m in matches])
+    results = []
+    for m in matches:
+        video = videos.get(m["video_id"])
+        # Similarity at or below 0: nothing in common. Scores only fall from
+        # here on, so the next page would be empty too.
+        if not video or m["score"] <= 0:
+            continue
+        results.append({
+            "video_id": m["video_id"], "rank": -m["score"], "sources": m["kind"],
+            "snippet": _semantic_snippet(m),
+            "title": video["title"], "channel_name": video["channel_name"], "url": video["url"],
+            "timestamp_ms": m["start_ms"] if m["kind"] == "transcript" else None,
+        })
+    return results
+
+
+def hybrid(query: str, limit: int = 30, *, after: Optional[tuple[float, str]] = None) -> list[dict]:
+    hits = repos.search_hits(query, SEARCH_HYBRID_CANDIDATES)
+    if not hits:
+        return []
+    index, vector = _query_vector(query)
+    similarity = {m["video_id"]: m["score"]
+                  for m in index.search(vector, len(hits), video_ids=[h["video_id"] for h in hits])}
+    weight = min(100, max(0, SEARCH_HYBRID_VECTOR_WEIGHT)) / 100
+    best = min(h["rank"] for h in hits)  # bm25: negative, lower is better
+    for h in hits:
+        lexical = h["rank"] / best if best < 0 else 1.0  # the best match scores 1
+        h["rank"] = -((1 - weight) * lexical + weight * max(0.0, similarity.get(h["video_id"], 0.0)))
+    hits.sort(key=lambda h: (h["rank"], h["video_id"]))
+    if after is not None:
+        hits = [h for h in hits if (h["rank"], h["video_id"]) > after]
+    return repos.search_snippets(query, hits[:limit])
+
+
+def search(query: str, mode: str = "lexical", limit: int = 30, *,
+           after: Optional[tuple[float, str]] = None) -> list[dict]:
+    """One page of results in `mode` (one of MODES); `after` is the (rank,
+    video_id) of the previous page's last row."""
+    if mode == "semantic":
+        return semantic(query, limit, after=after)
+    if mode == "hybrid":
+        return hybrid(query, limit, after=after)
+    return repos.search(query, limit, after=after)
@@ -0,0 +1,43 @@
+"""In-process "the queue changed" signal for the workers.
+
+Instead of polling SQLite every few seconds, idle workers sleep until the earliest
+`scheduled_at` in their queue — or until something enqueues work. Repos calls
+`notify()` whenever it adds or reschedules jobs; it's safe to call from any thread
+(API request threads, `asyncio.to_thread` stage work, discovery).
+
+A waiter takes a `token()` BEFORE checking the queue and then waits on it, so a
+notify that lands between "queue looked empty" and "start waiting" isn't lost.
+"""
+import asyncio
+from typing import Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_event: Optional[asyncio.Event] = None
+
+
+def bind(loop: asyncio.AbstractEventLoop) -> None:
+    """Attach to the event loop the workers run on (called at startup)."""
+    global _loop, _event
+    _loop = loop
+    _event = asyncio.Event()
+
+
+def _fire() -> None:
+    global _event
+    if _event is not None:
+        # Wake everyone holding the current token; later waiters get a fresh one.
+        _event.set()
+        _event = asyncio.Event()
+
+
+def notify() -> None:
+    """Wake all idle workers. No-op until bound (e.g. in standalone scripts)."""
+    loop = _loop
+    if loop is None or loop.is_closed():
+        return
+    loop.call_soon_threadsafe(_fire)
+
+
+def token() -> Optional[asyncio.Event]:
+    """The event the next notify() will set (None if unbound)."""
+    return _event
@@ -1,25 +1,40 @@
-"""The single worker loop — the only thing that drives YouTube fetches.
+"""The worker lanes — the only thing that drives YouTube fetches.
 
-One coroutine pulls due jobs one at a time and runs the (blocking) pipeline in a
-thread. It is the one place that:
-  • honors the global backoff window before every YouTube touch (item 6),
+One coroutine per egress identity (config.YTDLP_LANES; a single "default" lane
+unless configured) pulls due jobs one at a time and runs the (blocking) pipeline
+in a thread through that lane's proxy/cookies/impersonate. Each lane is the one
+place that, for its egress:
+  • honors its backoff window before every YouTube touch (item 6),
   • adds random jitter between requests (item 1),
-  • escalates backoff + reschedules when YouTube blocks us.
+  • escalates backoff + reschedules when YouTube blocks it.
 
-Because it's a single consumer, all YouTube access is naturally serialized.
+Because each lane is a single consumer, YouTube access per egress IP is naturally
+serialized; lanes only share the queue, and claiming from it is atomic.
+
+Lanes only run the fetch stage. The later, YouTube-free stages (summarize,
+notify, embed) are drained by StageWorker pools with their own concurrency
+limits, so a slow LLM call never holds up the next YouTube fetch. Background
+summaries can instead go to the BatchStageWorker, which gathers them into batches.
 """
 import asyncio
 import random
 import time
 import traceback
 
-from app.config import FETCH_JITTER_MIN_SECONDS, FETCH_JITTER_MAX_SECONDS
+from typing import Callable, Optional
+
+from app.config import (EMBED_CONCURRENCY, FETCH_JITTER_MIN_SECONDS, FETCH_JITTER_MAX_SECONDS,
+                        JOB_LEASE_SECONDS, LLM_BATCH_MAX_WAIT_SECONDS, LLM_BATCH_MIN_SIZE, LLM_BATCH_SIZE,
+                        NOTIFY_CONCURRENCY, SUMMARIZE_CONCURRENCY, YTDLP_LANES)
 from app.db import repos
-from app.jobs import JobResult, process_job, send_failure_email
+from app.jobs import (JobResult, JobType, process_embed_job, process_job, process_notify_job,
+                      process_summarize_batch, process_summarize_job, send_failure_email)
+from app import wakeup
 from app.youtube import gate
 
-# How often to wake and look for due work when idle / when backed off.
-_IDLE_POLL_SECONDS = 8
+# Idle workers sleep until the earliest scheduled job or an in-process wakeup
+# (app.wakeup); this cap is only a safety net for jobs enqueued by another process.
+_IDLE_MAX_SLEEP_SECONDS = 300
 _BACKOFF_CHECK_CAP_SECONDS = 60  # don't sleep longer than this in one go while blocked
 
 # A transient (non-block) error is retried a few times before the video is failed,
@@ -29,93 +44,272 @@ _TRANSIENT_RETRY_SECONDS = 300
 _RETRY_LATER_SECONDS = 3600  # upcoming premiere: check back in ~an hour
 
 
+async def _wait(stop: asyncio.Event, seconds: float, wake: Optional[asyncio.Event] = None) -> None:
+    """Sleep up to `seconds`, cut short by shutdown or (if given) a wakeup token."""
+    waiters = [asyncio.ensure_future(stop.wait())]
+    if wake is not None:
+        waiters.append(asyncio.ensure_future(wake.wait()))
+    try:
+        await asyncio.wait(waiters, timeout=max(0.0, seconds), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for w in waiters:
+            w.cancel()
+
+
+def _idle_seconds(job_types: tuple[str, ...]) -> float:
+    """How long an idle worker can sleep: until its earliest future job is due."""
+    next_due = repos.next_due_at(job_types)
+    if next_due is None:
+        return _IDLE_MAX_SLEEP_SECONDS
+    return min(_IDLE_MAX_SLEEP_SECONDS, max(1, next_due - time.time()))
+
+
+async def _run_leased(job: dict, fn: Callable[..., str], *args) -> str:
+    """Run a blocking stage function in a thread, renewing the job's lease while
+    it runs so a slow (but alive) job is never re-claimed by another worker."""
+    return await _run_leasing([job], fn, job, *args)
+
+
+async def _run_leasing(jobs: list[dict], fn: Callable, *args):
+    """Run fn(*args) in a thread, renewing every job's lease while it runs."""
+    task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    interval = max(1, JOB_LEASE_SECONDS // 3)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=interval)
+        if done:
+            return task.result()
+        for job in jobs:
+            repos.renew_job_lease(job["id"])
+
+
+def _retry_or_fail(job: dict, e: Exception, tag: str, waiting_status: str) -> None:
+    """Handle an unexpected error from any stage: reschedule the job, or fail the
+    video (with a diagnostic email) once it has used up its attempts."""
+    video_id = job["video_id"]
+    detail = f"{type(e).__name__}: {e}"
+    attempts = int(job.get("attempts", 0))
+    if attempts >= _MAX_ATTEMPTS:
+        reason = f"failed after {attempts} attempts — {detail}"
+        repos.fail_job(job["id"], reason[:1000])
+        repos.set_video_status(video_id, "failed", reason[:1000])
+        repos.delete_summary_draft(video_id)  # a summary stream ends on 'failed'; nothing to resume
+        send_failure_email(
+            subject=f"Processing Failed: {video_id}",
+            error_message=f"{reason}\n\n{traceback.format_exc()}",
+            stage=f"{tag} (unexpected error)", video_id=video_id, job=job,
+        )
+        print(f"[{tag}] job {job['id']} ({video_id}) failed permanently: {detail}")
+    else:
+        reason = f"transient error (attempt {attempts}/{_MAX_ATTEMPTS}) — {detail}"
+        repos.reschedule_job(job["id"], int(time.time()) + _TRANSIENT_RETRY_SECONDS, reason[:1000])
+        repos.set_video_status(video_id, waiting_status, reason[:500])
+        print(f"[{tag}] job {job['id']} ({video_id}) transient error; will retry: {detail}")
+
+
+def _retry_or_fail_job(job: dict, e: Exception, tag: str) -> None:
+    """_retry_or_fail() for a stage that runs after the video is done (the
+    email, the embedding): only the job is rescheduled or failed, with the error kept as its
+    last_error. The video and its status are left alone."""
+    detail = f"{type(e).__name__}: {e}"
+    attempts = int(job.get("attempts", 0))
+    if attempts >= _MAX_ATTEMPTS:
+        repos.fail_job(job["id"], f"failed after {attempts} attempts — {detail}"[:1000])
+        print(f"[{tag}] job {job['id']} ({job['video_id']}) failed permanently: {detail}")
+    else:
+        reason = f"transient error (attempt {attempts}/{_MAX_ATTEMPTS}) — {detail}"
+        repos.reschedule_job(job["id"], int(time.time()) + _TRANSIENT_RETRY_SECONDS, reason[:1000])
+        print(f"[{tag}] job {job['id']} ({job['video_id']}) transient error; will retry: {detail}")
+
+
 class Worker:
     def __init__(self) -> None:
-        self._task: asyncio.Task | None = None
+        self._tasks: list[asyncio.Task] = []
         self._stop = asyncio.Event()
 
     def start(self) -> None:
-        if self._task is None or self._task.done():
+        if not self._tasks or all(t.done() for t in self._tasks):
             self._stop.clear()
-            self._task = asyncio.create_task(self._run(), name="yt-worker")
+            self._tasks = [
+                asyncio.create_task(self._run(lane), name=f"yt-worker-{lane['name']}")
+                for lane in YTDLP_LANES
+            ]
 
     async def stop(self) -> None:
         self._stop.set()
-        if self._task:
-            try:
-                await asyncio.wait_for(self._task, timeout=10)
-            except asyncio.TimeoutError:
-                self._task.cancel()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=10)
+            for task in pending:
+                task.cancel()
 
-    async def _sleep(self, seconds: float) -> None:
-        """Interruptible sleep so shutdown is prompt."""
-        try:
-            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
-        except asyncio.TimeoutError:
-            pass
+    async def _sleep(self, seconds: float, wake: Optional[asyncio.Event] = None) -> None:
+        """Interruptible sleep so shutdown (and, if given, new work) is prompt."""
+        await _wait(self._stop, seconds, wake)
 
-    async def _run(self) -> None:
-        print("[worker] started")
+    async def _run(self, lane: dict) -> None:
+        name = lane["name"]
+        print(f"[worker:{name}] started")
         while not self._stop.is_set():
-            # Respect the global backoff window before touching YouTube.
-            remaining = gate.seconds_until_unblocked()
+            # Respect this lane's backoff window before touching YouTube.
+            remaining = gate.seconds_until_unblocked(name)
             if remaining > 0:
                 await self._sleep(min(remaining, _BACKOFF_CHECK_CAP_SECONDS))
                 continue
 
-            job = repos.claim_due_job()
+            # Take the wakeup token before looking, so an enqueue in between
+            # still wakes us.
+            token = wakeup.token()
+            job = repos.claim_due_job(job_types=(JobType.FETCH,))
             if not job:
-                await self._sleep(_IDLE_POLL_SECONDS)
+                await self._sleep(_idle_seconds((JobType.FETCH,)), wake=token)
                 continue
 
-            await self._handle(job)
+            result = await self._handle(job, lane)
+            if result == JobResult.CACHED:
+                continue  # served from the fetch cache — no YouTube request to space out
 
-            # Human-like gap before the next YouTube request.
+            # Human-like gap before this lane's next YouTube request.
             jitter = random.uniform(FETCH_JITTER_MIN_SECONDS, FETCH_JITTER_MAX_SECONDS)
             await self._sleep(jitter)
-        print("[worker] stopped")
+        print(f"[worker:{name}] stopped")
 
-    async def _handle(self, job: dict) -> None:
+    async def _handle(self, job: dict, lane: dict) -> Optional[str]:
         video_id = job["video_id"]
+        name = lane["name"]
         try:
-            result = await asyncio.to_thread(process_job, job)
+            result = await _run_leased(job, process_job, lane)
         except gate.BlockedError as e:
-            blocked_until = gate.register_block()
-            # Reschedule just past the backoff window (+ jitter). The block isn't
-            # this job's fault, so reschedule_after_block refunds the attempt.
-            repos.reschedule_after_block(job["id"], blocked_until + random.randint(5, 60))
+            blocked_until = gate.register_block(name)
+            # Reschedule for when the first lane is usable again (+ jitter) — just
+            # past this lane's window if it's the only one. The block isn't this
+            # job's fault, so reschedule_after_block refunds the attempt.
+            repos.reschedule_after_block(job["id"], gate.earliest_unblocked_at() + random.randint(5, 60))
             repos.set_video_status(video_id, "queued", "waiting on backoff")
             wait = max(0, blocked_until - int(time.time()))
-            print(f"[worker] BLOCKED — backing off all requests for ~{wait}s "
-                  f"(level {gate.status()['backoff_level']}); job {job['id']} requeued")
-            return
+            print(f"[worker:{name}] BLOCKED — backing off this lane for ~{wait}s "
+                  f"(level {gate.lane_status(name)['backoff_level']}); job {job['id']} requeued")
+            return None
         except Exception as e:  # noqa: BLE001 - transient/unexpected
-            detail = f"{type(e).__name__}: {e}"
-            attempts = int(job.get("attempts", 0))
-            if attempts >= _MAX_ATTEMPTS:
-                reason = f"failed after {attempts} attempts — {detail}"
-                repos.fail_job(job["id"], reason[:1000])
-                repos.set_video_status(video_id, "failed", reason[:1000])
-                send_failure_email(
-                    subject=f"Processing Failed: {video_id}",
-                    error_message=f"{reason}\n\n{traceback.format_exc()}",
-                    stage="worker (unexpected error)", video_id=video_id, job=job,
-                )
-                print(f"[worker] job {job['id']} ({video_id}) failed permanently: {detail}")
-            else:
-                reason = f"transient error (attempt {attempts}/{_MAX_ATTEMPTS}) — {detail}"
-                repos.reschedule_job(job["id"], int(time.time()) + _TRANSIENT_RETRY_SECONDS, reason[:1000])
-                repos.set_video_status(video_id, "queued", reason[:500])
-                print(f"[worker] job {job['id']} ({video_id}) transient error; will retry: {detail}")
-            return
-
-        # Reached YouTube without a block — clear any standing backoff level.
-        gate.register_success()
+            _retry_or_fail(job, e, f"worker:{name}", "queued")
+            return None
+
+        if result != JobResult.CACHED:
+            # Reached YouTube without a block — clear this lane's backoff level.
+            gate.register_success(name)
         if result == JobResult.RETRY_LATER:
             repos.reschedule_job(job["id"], int(time.time()) + _RETRY_LATER_SECONDS, "retry later (upcoming)")
         else:
             repos.complete_job(job["id"])
-        print(f"[worker] job {job['id']} ({video_id}) -> {result}")
+        print(f"[worker:{name}] job {job['id']} ({video_id}) -> {result}")
+        return result
+
+
+class StageWorker:
+    """A pool of `concurrency` coroutines draining one YouTube-free job type. No
+    gate and no jitter — these stages only talk to the LLM / SMTP."""
+
+    def __init__(self, job_type: str, handler: Callable[[dict], str], concurrency: int,
+                 waiting_status: Optional[str]) -> None:
+        self.job_type = job_type
+        self._handler = handler
+        # Video status while a retry is pending; None for a stage that runs after
+        # the video is done, whose failures never touch the video.
+        self._waiting_status = waiting_status
+        self._concurrency = max(1, concurrency)
+        self._tasks: list[asyncio.Task] = []
+        self._stop = asyncio.Event()
+
+    def start(self) -> None:
+        if not self._tasks or all(t.done() for t in self._tasks):
+            self._stop.clear()
+            self._tasks = [
+                asyncio.create_task(self._run(i), name=f"{self.job_type}-worker-{i}")
+                for i in range(self._concurrency)
+            ]
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=10)
+            for task in pending:
+                task.cancel()
+
+    def _on_error(self, job: dict, e: Exception, tag: str) -> None:
+        if self._waiting_status is None:
+            _retry_or_fail_job(job, e, tag)
+        else:
+            _retry_or_fail(job, e, tag, self._waiting_status)
+
+    async def _sleep(self, seconds: float, wake: Optional[asyncio.Event] = None) -> None:
+        await _wait(self._stop, seconds, wake)
+
+    async def _run(self, slot: int) -> None:
+        tag = f"{self.job_type}:{slot}"
+        while not self._stop.is_set():
+            token = wakeup.token()
+            job = repos.claim_due_job(job_types=(self.job_type,))
+            if not job:
+                await self._sleep(_idle_seconds((self.job_type,)), wake=token)
+                continue
+            try:
+                result = await _run_leased(job, self._handler)
+            except Exception as e:  # noqa: BLE001 - transient/unexpected
+                self._on_error(job, e, tag)
+                continue
+            repos.complete_job(job["id"])
+            print(f"[{tag}] job {job['id']} ({job['video_id']}) -> {result}")
+
+
+class BatchStageWorker(StageWorker):
+    """A single coroutine draining one job type a batch at a time: it claims up
+    to LLM_BATCH_SIZE due jobs and hands them to `handler` together (which
+    returns a JobResult per job, in order). It waits for LLM_BATCH_MIN_SIZE jobs
+    to gather, but never keeps the oldest waiting past LLM_BATCH_MAX_WAIT_SECONDS.
+    A batch may take a long time (the Gemini batch API); leases are renewed
+    throughout."""
+
+    def __init__(self, job_type: str, handler: Callable[[list[dict]], list[str]],
+                 waiting_status: str) -> None:
+        super().__init__(job_type, handler, 1, waiting_status)
+
+    def _wait_seconds(self) -> float:
+        """0 if a batch should go out now; else how long to wait for more."""
+        count, oldest = repos.due_job_backlog((self.job_type,))
+        if not count:
+            return _idle_seconds((self.job_type,))
+        if count >= max(1, min(LLM_BATCH_MIN_SIZE, LLM_BATCH_SIZE)):
+            return 0
+        return min(_IDLE_MAX_SLEEP_SECONDS, max(0, oldest + LLM_BATCH_MAX_WAIT_SECONDS - time.time()))
+
+    async def _run(self, slot: int) -> None:
+        tag = self.job_type
+        while not self._stop.is_set():
+            token = wakeup.token()
+            wait = self._wait_seconds()
+            if wait > 0:
+                await self._sleep(wait, wake=token)
+                continue
+            jobs = repos.claim_due_jobs(max(1, LLM_BATCH_SIZE), job_types=(self.job_type,))
+            if not jobs:
+                continue  # another consumer got there first
+            print(f"[{tag}] batch of {len(jobs)} jobs")
+            try:
+                results = await _run_leasing(jobs, self._handler, jobs)
+            except Exception as e:  # noqa: BLE001 - transient/unexpected
+                for job in jobs:
+                    self._on_error(job, e, tag)
+                continue
+            for job, result in zip(jobs, results):
+                repos.complete_job(job["id"])
+                print(f"[{tag}] job {job['id']} ({job['video_id']}) -> {result}")
 
 
 worker = Worker()
+stage_workers = [
+    StageWorker(JobType.SUMMARIZE, process_summarize_job, SUMMARIZE_CONCURRENCY, "summarizing"),
+    # Always running, so jobs queued while batching was on still drain if it's
+    # switched off (they then go out as concurrent single calls).
+    BatchStageWorker(JobType.SUMMARIZE_BATCH, process_summarize_batch, "summarizing"),
+    # The summary is saved by then: a failing email or embedding fails only its job.
+    StageWorker(JobType.NOTIFY, process_notify_job, NOTIFY_CONCURRENCY, None),
+    StageWorker(JobType.EMBED, process_embed_job, EMBED_CONCURRENCY, None),
+]
@@ -0,0 +1,73 @@
+"""RSS feed fetching for discovery (plain HTTP — not yt-dlp, so not gated).
+
+Feeds are fetched in parallel (bounded by FEED_FETCH_CONCURRENCY) over one shared
+keep-alive session, and each request carries the channel's stored ETag /
+Last-Modified. YouTube answers an unchanged feed with a bare 304, which we report
+as `not_modified` without ever handing it to feedparser.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterator, Optional
+
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import FEED_FETCH_CONCURRENCY, FEED_FETCH_TIMEOUT_SECONDS
+
+_FEED_URL = "https://www.youtube.com/feeds/videos.xml?channel_id={}"
+
+_session: requests.Session | None = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        workers = max(1, FEED_FETCH_CONCURRENCY)
+        s = requests.Session()
+        # One keep-alive connection per concurrent fetch, all to the same host.
+        s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+        _session = s
+    return _session
+
+
+def fetch_feed(channel_id: str, *, etag: Optional[str] = None,
+               last_modified: Optional[str] = None) -> dict[str, Any]:
+    """Conditionally GET one channel's feed. Never raises. Returns
+    {channel_id, not_modified, feed, etag, last_modified, error}; `feed` is the
+    feedparser result on a 200 and None otherwise."""
+    out: dict[str, Any] = {"channel_id": channel_id, "not_modified": False, "feed": None,
+                           "etag": None, "last_modified": None, "error": None}
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        resp = _get_session().get(_FEED_URL.format(channel_id), headers=headers,
+                                  timeout=FEED_FETCH_TIMEOUT_SECONDS)
+        out["etag"] = resp.headers.get("ETag")
+        out["last_modified"] = resp.headers.get("Last-Modified")
+        if resp.status_code == 304:
+            out["not_modified"] = True
+            return out
+        resp.raise_for_status()
+        out["feed"] = feedparser.parse(resp.content)
+    except Exception as e:  # noqa: BLE001 - one bad feed shouldn't sink the scan
+        out["error"] = f"{type(e).__name__}: {e}"
+    return out
+
+
+def fetch_feeds(states: dict[str, dict], channel_ids: list[str]) -> Iterator[dict[str, Any]]:
+    """Fetch many feeds concurrently, yielding results as they complete. `states`
+    maps channel_id -> stored feed_state row (for the conditional headers)."""
+    if not channel_ids:
+        return
+    workers = max(1, min(FEED_FETCH_CONCURRENCY, len(channel_ids)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feed") as pool:
+        futures = []
+        for channel_id in channel_ids:
+            state = states.get(channel_id) or {}
+            futures.append(pool.submit(fetch_feed, channel_id, etag=state.get("etag"),
+                                       last_modified=state.get("last_modified")))
+        for fut in as_completed(futures):
+            yield fut.result()
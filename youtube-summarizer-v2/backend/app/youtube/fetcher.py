@@ -5,17 +5,26 @@ a cookies file exported from the dedicated throwaway account. A single
 `extract_info` call yields both the metadata we filter on *and* the subtitle
 track URLs, so a full fetch is just two network hits (info + one subtitle
 download) — keeping our footprint small.
+
+Both hits go through one long-lived YoutubeDL per egress identity (see
+_session), so extractors, the cookie jar and the HTTP/impersonation connection
+are set up once and reused instead of rebuilt for every call.
 """
 import json
 import os
-from typing import Optional
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
 from urllib.parse import urlparse, parse_qs
 
 import yt_dlp
 
 from app import config
 from app.config import YTDLP_COOKIES_FILE
-from app.youtube import gate
+from app.llm.chunking import estimate_tokens
+from app.youtube import gate, normalize
 
 # Manual subtitle languages we accept, in order of preference. "en-orig" is the
 # original-language track YouTube exposes for English videos and is often the only
@@ -24,19 +33,26 @@ from app.youtube import gate
 _PREFERRED_LANGS = ("en", "en-orig", "en-US", "en-GB", "en-us", "en-gb")
 
 
-def _impersonate_target():
-    """Parse config.YTDLP_IMPERSONATE into an ImpersonateTarget, or None if unset/
-    unavailable. Lets us mimic a real browser to clear front-door bot checks."""
-    if not config.YTDLP_IMPERSONATE:
+def _impersonate_target(value: str):
+    """Parse an impersonation string (e.g. YTDLP_IMPERSONATE) into an
+    ImpersonateTarget, or None if unset/unavailable. Lets us mimic a real browser
+    to clear front-door bot checks."""
+    if not value:
         return None
     try:
         from yt_dlp.networking.impersonate import ImpersonateTarget
-        return ImpersonateTarget.from_str(config.YTDLP_IMPERSONATE)
+        return ImpersonateTarget.from_str(value)
     except Exception as e:  # noqa: BLE001 - bad value or curl_cffi missing
-        print(f"[fetcher] impersonation '{config.YTDLP_IMPERSONATE}' unavailable: {e}")
+        print(f"[fetcher] impersonation '{value}' unavailable: {e}")
         return None
 
 
+def default_egress() -> dict:
+    """The egress from the plain YTDLP_* settings (what diagnostics use)."""
+    return {"name": "default", "proxy": config.YTDLP_PROXY, "cookies": YTDLP_COOKIES_FILE,
+            "impersonate": config.YTDLP_IMPERSONATE}
+
+
 def extract_video_id(url: str) -> Optional[str]:
     """Supports watch?v=, youtu.be/, and /embed/ forms (same as v1)."""
     parsed = urlparse(url)
@@ -50,7 +66,10 @@ def extract_video_id(url: str) -> Optional[str]:
     return None
 
 
-def _base_opts() -> dict:
+def _base_opts(egress: Optional[dict] = None) -> dict:
+    """yt-dlp options for one egress identity (a worker lane's proxy/cookies/
+    impersonate); defaults to the plain YTDLP_* settings."""
+    egress = egress or default_egress()
     opts = {
         "quiet": True,
         "no_warnings": True,
@@ -69,24 +88,137 @@ def _base_opts() -> dict:
         # when cookies are supplied. (Confirmed via diagnose_transcript.py.)
         "extractor_args": {"youtube": {"player_client": ["tv", "ios"]}},
     }
-    if YTDLP_COOKIES_FILE and os.path.exists(YTDLP_COOKIES_FILE):
-        opts["cookiefile"] = YTDLP_COOKIES_FILE
-    if config.YTDLP_PROXY:
-        opts["proxy"] = config.YTDLP_PROXY
-    target = _impersonate_target()
+    cookies = egress.get("cookies")
+    if cookies and os.path.exists(cookies):
+        opts["cookiefile"] = cookies
+    if egress.get("proxy"):
+        opts["proxy"] = egress["proxy"]
+    target = _impersonate_target(egress.get("impersonate") or "")
     if target is not None:
         opts["impersonate"] = target
     return opts
 
 
+class _Session:
+    """One pooled YoutubeDL plus what decides when to recycle it."""
+
+    def __init__(self, opts: dict) -> None:
+        self.ydl = yt_dlp.YoutubeDL(opts)  # type: ignore
+        self.cookiefile: Optional[str] = opts.get("cookiefile")
+        self.cookie_mtime = _mtime(self.cookiefile)
+        self.uses = 0
+        self.broken = False
+        self.created_at = time.monotonic()
+        self.closed = False
+        # Held by the one user of the session, and while closing it: a session
+        # is never closed under someone, nor used once off the pool.
+        self.lock = threading.Lock()
+
+    def stale(self) -> bool:
+        return (self.broken
+                or self.uses >= config.YTDLP_SESSION_MAX_REQUESTS
+                or time.monotonic() - self.created_at > config.YTDLP_SESSION_MAX_AGE_SECONDS
+                or _mtime(self.cookiefile) != self.cookie_mtime)
+
+    def close(self) -> None:
+        """Close the YoutubeDL. Call with `lock` held."""
+        self.closed = True
+        # YoutubeDL.close() writes its cookie jar back to the cookie file. If the
+        # file was replaced on disk (fresh export), don't clobber it.
+        if _mtime(self.cookiefile) != self.cookie_mtime:
+            self.ydl.params["cookiefile"] = None
+        try:
+            self.ydl.close()
+        except Exception as e:  # noqa: BLE001 - best effort
+            print(f"[fetcher] closing yt-dlp session failed: {e}")
+
+
+_sessions: dict[tuple, _Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _mtime(path: Optional[str]) -> Optional[float]:
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+def _session_key(egress: dict) -> tuple:
+    return (egress.get("proxy") or "", egress.get("cookies") or "", egress.get("impersonate") or "")
+
+
+@contextmanager
+def _session(egress: Optional[dict] = None) -> Iterator[yt_dlp.YoutubeDL]:
+    """Borrow the long-lived YoutubeDL for an egress option set. Recycled after
+    YTDLP_SESSION_MAX_REQUESTS uses, YTDLP_SESSION_MAX_AGE_SECONDS, when the
+    cookie file changes on disk, or after a block / unexpected error (so a
+    challenged or wedged session isn't reused). One user at a time per session.
+
+    Lanes with the same egress share a session, so checking one out races with
+    another thread recycling it: a session is taken off the pool under
+    _sessions_lock and closed under its own lock, and whoever gets that lock
+    but finds the session no longer pooled checks out again."""
+    egress = egress or default_egress()
+    key = _session_key(egress)
+    while True:
+        old: Optional[_Session] = None
+        with _sessions_lock:
+            sess = _sessions.get(key)
+            if sess is None or sess.stale():
+                old = sess
+                sess = _sessions[key] = _Session(_base_opts(egress))
+        if old is not None:
+            with old.lock:  # wait out any in-flight use before closing
+                if not old.closed:
+                    old.close()
+        sess.lock.acquire()
+        with _sessions_lock:
+            if _sessions.get(key) is sess:
+                break
+        sess.lock.release()  # recycled while we waited for it
+
+    try:
+        sess.uses += 1
+        try:
+            yield sess.ydl
+        except Exception as e:
+            # An ordinary "unavailable / private" DownloadError says nothing about
+            # the session; anything else retires it.
+            if not isinstance(e, yt_dlp.utils.DownloadError) or gate.is_block_error(e):
+                sess.broken = True
+            raise
+        # Persist rotated cookies like a per-call YoutubeDL would on exit, and
+        # remember the new mtime so our own write doesn't look like a new export.
+        if sess.cookiefile and _mtime(sess.cookiefile) == sess.cookie_mtime:
+            try:
+                sess.ydl.save_cookies()
+                sess.cookie_mtime = _mtime(sess.cookiefile)
+            except Exception as e:  # noqa: BLE001 - cookie save is best effort
+                print(f"[fetcher] saving cookies failed: {e}")
+    finally:
+        sess.lock.release()
+
+
+def close_sessions() -> None:
+    """Close every pooled session (app shutdown), each once its user is done."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for sess in sessions:
+        with sess.lock:
+            if not sess.closed:
+                sess.close()
+
+
 def _video_url(video_id: str) -> str:
     return f"https://www.youtube.com/watch?v={video_id}"
 
 
-def extract_info(video_id: str) -> dict:
+def extract_info(video_id: str, egress: Optional[dict] = None) -> dict:
     """Single extract_info call. Raises yt_dlp.utils.DownloadError on failure
     (the worker inspects the message via gate.is_block_error)."""
-    with yt_dlp.YoutubeDL(_base_opts()) as ydl:  # type: ignore
+    with _session(egress) as ydl:
         return ydl.extract_info(_video_url(video_id), download=False)
 
 
@@ -142,39 +274,56 @@ def available_caption_langs(info: dict) -> dict:
     }
 
 
-def _parse_json3(raw: bytes) -> str:
+def _json3_segments(raw: bytes) -> list[normalize.Segment]:
+    """One segment per caption event (its pieces carry their own spacing)."""
     data = json.loads(raw.decode("utf-8", errors="replace"))
-    parts: list[str] = []
+    segments: list[normalize.Segment] = []
     for event in data.get("events", []):
-        for seg in event.get("segs", []) or []:
-            text = seg.get("utf8")
-            if text and text != "\n":
-                parts.append(text)
-    return " ".join(" ".join(parts).split())
+        text = "".join(seg.get("utf8") or "" for seg in event.get("segs", []) or [])
+        line = normalize.clean_line(text)
+        if line:
+            segments.append((int(event.get("tStartMs") or 0), int(event.get("dDurationMs") or 0), line))
+    return segments
 
 
-def _parse_vtt(raw: bytes) -> str:
-    """Minimal WebVTT fallback: keep caption text lines, drop cues/timestamps."""
-    lines: list[str] = []
+_VTT_TIME_RE = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{3})")
+
+
+def _vtt_ms(stamp: str) -> int:
+    m = _VTT_TIME_RE.match(stamp.strip())
+    if not m:
+        return 0
+    h, mnt, sec, ms = m.groups()
+    return ((int(h or 0) * 60 + int(mnt)) * 60 + int(sec)) * 1000 + int(ms)
+
+
+def _vtt_segments(raw: bytes) -> list[normalize.Segment]:
+    """Minimal WebVTT fallback: one segment per caption text line, timed by its cue."""
+    segments: list[normalize.Segment] = []
+    start_ms = duration_ms = 0
     for line in raw.decode("utf-8", errors="replace").splitlines():
         line = line.strip()
-        if not line or line == "WEBVTT" or "-->" in line or line.isdigit():
+        if "-->" in line:
+            begin, _, end = line.partition("-->")
+            start_ms = _vtt_ms(begin)
+            duration_ms = max(0, _vtt_ms(end.split()[0] if end.split() else "") - start_ms)
+            continue
+        if not line or line == "WEBVTT" or line.isdigit():
             continue
         if line.startswith(("Kind:", "Language:", "NOTE")):
             continue
-        lines.append(line)
-    # De-dupe consecutive duplicate lines (common in auto-captions).
-    deduped: list[str] = []
-    for ln in lines:
-        if not deduped or deduped[-1] != ln:
-            deduped.append(ln)
-    return " ".join(" ".join(deduped).split())
+        line = normalize.clean_line(line)
+        if line:
+            segments.append((start_ms, duration_ms, line))
+    return segments
 
 
-def fetch_transcript_from_info(info: dict) -> Optional[dict]:
+def fetch_transcript_from_info(info: dict, egress: Optional[dict] = None) -> Optional[dict]:
     """Download + parse the chosen caption track. Returns
-    {text, lang, source} or None if no usable captions exist.
-    Uses yt-dlp's urlopen so cookies/headers are applied to the subtitle request."""
+    {text, lang, source, raw, fmt} or None if no usable captions exist (`raw` /
+    `fmt` are the undecoded payload and its format, for the fetch cache).
+    Uses yt-dlp's urlopen on the same pooled session as extract_info, so cookies/
+    headers are applied and the connection is reused."""
     pick = _pick_subtitle_track(info)
     if not pick:
         return None
@@ -187,7 +336,7 @@ def fetch_transcript_from_info(info: dict) -> Optional[dict]:
     # described in our yt-dlp notes. Surface that as a BlockedError so the worker
     # backs off + requeues, instead of silently recording "no transcript".
     try:
-        with yt_dlp.YoutubeDL(_base_opts()) as ydl:  # type: ignore
+        with _session(egress) as ydl:
             raw = ydl.urlopen(url).read()
     except Exception as e:  # noqa: BLE001
         if gate.is_block_error(e):
@@ -205,12 +354,38 @@ def fetch_transcript_from_info(info: dict) -> Optional[dict]:
             f"data — Google's subtitle server is likely rate-limiting this IP (429)"
         )
 
-    if b'"events"' in raw[:2000] or url.find("fmt=json3") != -1:
-        text = _parse_json3(raw)
-    else:
-        text = _parse_vtt(raw)
-
-    text = text.strip()
-    if not text:
+    fmt = "json3" if b'"events"' in raw[:2000] or url.find("fmt=json3") != -1 else "vtt"
+    transcript = transcript_from_payload(raw, fmt, lang=lang, source=source)
+    if transcript:
+        transcript.update(raw=raw, fmt=fmt)
+    return transcript
+
+
+def transcript_from_payload(raw: bytes, fmt: str, *, lang: Optional[str],
+                            source: Optional[str]) -> Optional[dict]:
+    """Parse and normalize (app.youtube.normalize) a downloaded caption payload
+    ("json3" or "vtt"). Returns {text, segments, lang, source, raw_tokens,
+    tokens} — the timed (start_ms, duration_ms, text) segments the text is made
+    of, and the estimated token counts before and after normalization — or None
+    if it holds no text. Also used on cached payloads, so a retry can rebuild the
+    transcript without touching YouTube."""
+    lines = _json3_segments(raw) if fmt == "json3" else _vtt_segments(raw)
+    segments = normalize.normalize(lines)
+    if not segments:
         return None
-    return {"text": text, "lang": lang, "source": source}
+    text = " ".join(seg_text for _, _, seg_text in segments)
+    return {"text": text, "segments": segments, "lang": lang, "source": source,
+            "raw_tokens": estimate_tokens(" ".join(line for _, _, line in lines)),
+            "tokens": estimate_tokens(text)}
+
+
+# The slice of an info dict the fetch stage needs again on a cache hit. Caption
+# tables keep only their language keys: the signed track URLs expire anyway.
+_CACHED_INFO_KEYS = ("title", "uploader", "channel", "channel_id", "duration", "live_status")
+
+
+def cacheable_info(info: dict) -> dict:
+    out = {k: info.get(k) for k in _CACHED_INFO_KEYS}
+    out["subtitles"] = {lang: [] for lang in (info.get("subtitles") or {})}
+    out["automatic_captions"] = {lang: [] for lang in (info.get("automatic_captions") or {})}
+    return out
@@ -1,23 +1,39 @@
-"""The global YouTube gate (item 6: intelligent backoff).
+"""The YouTube gate (item 6: intelligent backoff).
 
-Every YouTube/yt-dlp interaction in the app must consult this module. It owns a
-single piece of shared state — the backoff window — persisted in
-`rate_limit_state` so it survives restarts.
+Every YouTube/yt-dlp interaction in the app must consult this module. It owns the
+backoff window for each egress identity (worker lane) — a block is tied to the IP
+/ account that got flagged, so each lane backs off on its own. State is persisted
+in `egress_state` so it survives restarts.
 
 Strategy:
-- When a request fails with a block signature, escalate the backoff level and set
-  a global `blocked_until` from BACKOFF_SCHEDULE_MINUTES. The first level is short
+- When a request fails with a block signature, escalate that lane's backoff level
+  and set its `blocked_until` from BACKOFF_SCHEDULE_MINUTES. The first level is short
   (retry as soon as YouTube is likely to un-flag the IP); each repeat block jumps
   to the next, longer step, capped at the last value.
-- Any successful request resets the level to 0.
-- Because the worker is single-threaded, "serialization" of YouTube access falls
-  out for free; this module just adds the timing/backoff policy on top.
+- Any successful request resets the lane's level to 0.
+- Each lane is a single coroutine, so YouTube access *per egress identity* is
+  still serialized for free; this module just adds the timing/backoff policy.
+
+Reads are served from an in-memory copy of `egress_state` (the worker loop and
+/api/status check it constantly). Our own writes go through to the DB and the
+copy together; writes from another process are picked up by comparing the rows'
+version counter at most every _REVALIDATE_SECONDS.
 """
+import threading
 import time
 
-from app.config import BACKOFF_SCHEDULE_MINUTES
+from app.config import BACKOFF_SCHEDULE_MINUTES, YTDLP_LANES
 from app.db import repos
 
+DEFAULT_LANE = "default"
+
+_REVALIDATE_SECONDS = 5
+
+_cache: dict[str, dict] = {}
+_cache_version: int | None = None  # None = not loaded yet
+_cache_checked_at = 0.0
+_cache_lock = threading.Lock()
+
 # Substrings (lowercased) that indicate YouTube is rate-limiting / bot-blocking us,
 # as opposed to an ordinary "video unavailable" / "no subtitles" error.
 BLOCK_SIGNATURES = (
@@ -50,14 +66,53 @@ def is_block_error(error: str | Exception) -> bool:
     return any(sig in s for sig in BLOCK_SIGNATURES)
 
 
-def block_diagnosis() -> dict:
-    """Snapshot of rate-limit context, for annotating individual failures."""
-    state = repos.get_rate_limit_state()
+def load_state() -> None:
+    """(Re)load every lane's backoff state from the DB into memory."""
+    global _cache, _cache_version, _cache_checked_at
+    with _cache_lock:
+        _cache_version = repos.rate_limit_version()
+        _cache = repos.get_rate_limit_states()
+        _cache_checked_at = time.monotonic()
+
+
+def _state(lane: str) -> dict:
+    """A lane's backoff state from memory, revalidated against the DB's version
+    counter once _REVALIDATE_SECONDS have passed."""
+    global _cache_checked_at
+    if _cache_version is None:
+        load_state()
+    elif time.monotonic() - _cache_checked_at > _REVALIDATE_SECONDS:
+        if repos.rate_limit_version() != _cache_version:
+            load_state()
+        else:
+            _cache_checked_at = time.monotonic()
+    return _cache.get(lane) or {"lane": lane, "blocked_until": 0, "backoff_level": 0,
+                                "last_block_at": None, "last_success_at": None}
+
+
+def _store(row: dict) -> None:
+    """Write-through: put a row we just wrote into the in-memory copy."""
+    global _cache_version
+    with _cache_lock:
+        _cache[row["lane"]] = row
+        if _cache_version is not None:
+            # Our write bumped the DB total by exactly one. If another process
+            # also wrote, the totals still differ and the next check reloads.
+            _cache_version += 1
+
+
+def lane_names() -> list[str]:
+    return [lane["name"] for lane in YTDLP_LANES]
+
+
+def block_diagnosis(lane: str = DEFAULT_LANE) -> dict:
+    """Snapshot of a lane's rate-limit context, for annotating individual failures."""
+    state = _state(lane)
     now = int(time.time())
     last_block = int(state["last_block_at"] or 0)
     since = (now - last_block) if last_block else None
     return {
-        "currently_blocked": is_blocked(),
+        "currently_blocked": is_blocked(lane),
         "backoff_level": int(state["backoff_level"]),
         "last_block_at": last_block or None,
         "seconds_since_block": since,
@@ -65,13 +120,13 @@ def block_diagnosis() -> dict:
     }
 
 
-def rate_limit_note() -> str | None:
+def rate_limit_note(lane: str = DEFAULT_LANE) -> str | None:
     """A human-readable explanation when rate-limiting is the likely root cause of
     a failure, or None if there's no current sign of an IP block. Used to enrich
     'no transcript' failures (the symptom an IP flag usually produces here)."""
-    d = block_diagnosis()
+    d = block_diagnosis(lane)
     if d["currently_blocked"]:
-        mins = seconds_until_unblocked() // 60
+        mins = seconds_until_unblocked(lane) // 60
         return (
             f"YouTube is actively rate-limiting this server's IP "
             f"(backoff level {d['backoff_level']}, ~{mins}m remaining). This failure is "
@@ -96,39 +151,63 @@ def _backoff_seconds(level: int) -> int:
     return BACKOFF_SCHEDULE_MINUTES[idx] * 60
 
 
-def seconds_until_unblocked() -> int:
-    state = repos.get_rate_limit_state()
+def seconds_until_unblocked(lane: str = DEFAULT_LANE) -> int:
+    state = _state(lane)
     remaining = int(state["blocked_until"]) - int(time.time())
     return max(0, remaining)
 
 
-def is_blocked() -> bool:
-    return seconds_until_unblocked() > 0
+def is_blocked(lane: str = DEFAULT_LANE) -> bool:
+    return seconds_until_unblocked(lane) > 0
 
 
-def register_block() -> int:
-    """Escalate backoff. Returns the new blocked_until epoch."""
+def earliest_unblocked_at() -> int:
+    """Epoch at which the first lane becomes usable (now if any lane is open).
+    Where a blocked job should be rescheduled so whichever lane frees up first
+    can take it."""
+    return int(time.time()) + min(seconds_until_unblocked(name) for name in lane_names())
+
+
+def register_block(lane: str = DEFAULT_LANE) -> int:
+    """Escalate a lane's backoff. Returns its new blocked_until epoch."""
     now = int(time.time())
-    state = repos.get_rate_limit_state()
+    # Read the level from the DB, not memory: blocks are rare, and escalation
+    # must build on any block another process recorded moments ago.
+    state = repos.get_rate_limit_state(lane)
     level = int(state["backoff_level"]) + 1
     blocked_until = now + _backoff_seconds(level)
-    repos.set_rate_limit_state(blocked_until=blocked_until, backoff_level=level, last_block_at=now)
+    _store(repos.set_rate_limit_state(blocked_until=blocked_until, backoff_level=level,
+                                      last_block_at=now, lane=lane))
     return blocked_until
 
 
-def register_success() -> None:
-    repos.mark_success()
+def register_success(lane: str = DEFAULT_LANE) -> None:
+    _store(repos.mark_success(lane))
 
 
-def status() -> dict:
-    state = repos.get_rate_limit_state()
-    diag = block_diagnosis()
+def lane_status(lane: str = DEFAULT_LANE) -> dict:
+    state = _state(lane)
+    diag = block_diagnosis(lane)
     return {
-        "blocked": is_blocked(),
+        "lane": lane,
+        "blocked": diag["currently_blocked"],
         "blocked_until": int(state["blocked_until"]),
-        "seconds_remaining": seconds_until_unblocked(),
+        "seconds_remaining": seconds_until_unblocked(lane),
         "backoff_level": int(state["backoff_level"]),
         "last_block_at": state["last_block_at"],
         "last_success_at": state["last_success_at"],
         "recently_blocked": diag["recently_blocked"],
     }
+
+
+def status() -> dict:
+    """Overall backoff for the UI: the least-blocked lane's view (so "blocked"
+    means no lane can fetch), plus every lane's own status under "lanes"."""
+    lanes = [lane_status(name) for name in lane_names()]
+    best = min(lanes, key=lambda s: s["seconds_remaining"])
+    return {
+        **{k: v for k, v in best.items() if k != "lane"},
+        "recently_blocked": any(s["recently_blocked"] for s in lanes),
+        "last_block_at": max((s["last_block_at"] or 0 for s in lanes), default=0) or None,
+        "lanes": lanes,
+    }
@@ -0,0 +1,95 @@
+"""Transcript normalization: strip what captions carry that isn't speech.
+
+Captions are written for on-screen display, and every word of display clutter is
+prompt tokens (and latency) on every summary. Before a transcript is stored:
+  • cue markup (<00:00:01.000>, <c>…</c>) and HTML entities are decoded away;
+  • non-speech annotations go: [Music], [Applause], [ __ ], (laughs), ♪, and
+    ">>" speaker-change marks;
+  • filler is dropped: um, uh, erm, hmm, mhm;
+  • then rolling captions are merged — auto-caption cues repeat the tail (or
+    all) of the previous cue and add a few words; each word is kept once.
+Timestamp markers like "[12:34]" are kept (app.llm.chunking splits on them).
+
+Everything works on timed segments — (start_ms, duration_ms, text), one per
+caption line — so each kept word still knows where it is in the video.
+"""
+import html
+import re
+
+# A rolling repeat must share at least this many words with the previous cue's
+# tail (or, if shorter, be entirely contained in it — but never a lone word), so
+# a speaker genuinely repeating a word isn't edited out.
+_MIN_OVERLAP_WORDS = 3
+
+# (start_ms, duration_ms, text)
+Segment = tuple[int, int, str]
+
+_MARKUP_RE = re.compile(r"<[^>]*>")
+_ANNOTATION_RE = re.compile(
+    r"\[(?!\d{1,2}:\d{2}(?::\d{2})?\])[^\[\]\n]{1,40}\]"
+    r"|\((?:music|applause|laughter|laughs|laughing|cheering|inaudible|silence|"
+    r"background noise|music playing)\)"
+    r"|[♪♫]+|>>",
+    re.IGNORECASE,
+)
+_FILLER_RE = re.compile(r"(?<![\w'-])(?:u+m+|u+h+|e+r+m+|h+m+|m+h+m+|m{2,})(?![\w'-]),?", re.IGNORECASE)
+_SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+(?=[,.!?;:])")
+_REPEATED_COMMA_RE = re.compile(r",(?:\s*,)+")
+
+
+def clean_line(line: str) -> str:
+    """Decode one caption line's markup and entities."""
+    return html.unescape(_MARKUP_RE.sub("", line)).strip()
+
+
+def _overlap(prev: list[str], words: list[str]) -> int:
+    """Length of the longest tail of `prev` that `words` starts with."""
+    for k in range(min(len(prev), len(words)), 0, -1):
+        if prev[-k:] == words[:k]:
+            return k
+    return 0
+
+
+def merge_rolling(segments: list[Segment]) -> list[Segment]:
+    """Drop the part of each segment that repeats the one before it: a repeated
+    segment is dropped, one the next segment extends is replaced by it (keeping
+    its start, spanning both), and one starting with the previous one's tail
+    keeps only its new words."""
+    out: list[tuple[int, int, list[str]]] = []
+    for start_ms, duration_ms, line in segments:
+        words = line.split()
+        if not words:
+            continue
+        if out:
+            prev_start, prev_duration, prev = out[-1]
+            if words[:len(prev)] == prev:
+                if len(words) == len(prev):
+                    continue  # the same line again, carried over into the next cue
+                # The previous segment was a partial of this one.
+                end_ms = max(prev_start + prev_duration, start_ms + duration_ms)
+                out[-1] = (prev_start, end_ms - prev_start, words)
+                continue
+            k = _overlap(prev, words)
+            if k >= min(_MIN_OVERLAP_WORDS, max(2, len(words))):
+                words = words[k:]
+                if not words:
+                    continue
+        out.append((start_ms, duration_ms, words))
+    return [(start_ms, duration_ms, " ".join(words)) for start_ms, duration_ms, words in out]
+
+
+def clean_text(text: str) -> str:
+    """Remove annotations and filler from running text; tidy the gaps they leave."""
+    text = _ANNOTATION_RE.sub(" ", text)
+    text = _FILLER_RE.sub(" ", text)
+    text = _SPACE_BEFORE_PUNCT_RE.sub("", " ".join(text.split()))
+    text = _REPEATED_COMMA_RE.sub(",", text)
+    return text.lstrip(",.;: ").strip()
+
+
+def normalize(segments: list[Segment]) -> list[Segment]:
+    """Timed caption lines (in order) -> normalized segments; segments left
+    empty are dropped. The transcript text is their texts joined by spaces.
+    Lines are cleaned before rolling repeats are merged: an annotation or filler
+    inside the repeated words would otherwise hide the repeat."""
+    return merge_rolling([(start_ms, duration_ms, clean_text(line)) for start_ms, duration_ms, line in segments])
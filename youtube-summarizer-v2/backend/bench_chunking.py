@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for the transcript chunker (app/llm/chunking.py).
+
+Builds synthetic transcripts of a few sizes — punctuated speech and the
+punctuation-free run-on text typical of auto-captions — and times
+estimate_tokens() and chunk_text() at the summarizer's real settings, next to the
+old fixed-offset character slicing for reference.
+
+It only computes; it never touches the database or the network.
+
+Usage (from the backend directory):
+    python bench_chunking.py
+    python bench_chunking.py --sizes 1,4,16 --repeat 5
+    python bench_chunking.py --file some_transcript.txt
+
+Flags:
+    --sizes N,N,...  Synthetic input sizes in MB (default 1,4,8).
+    --repeat N       Runs per measurement; the best is reported (default 3).
+    --file PATH      Benchmark one real transcript instead of synthetic text.
+"""
+import argparse
+import random
+import time
+
+from app.llm import summarizer
+from app.llm.chunking import chunk_text, estimate_tokens
+
+_WORDS = ("so the thing is we actually want to look at how this model handles "
+          "really long inputs because when you think about it most transcripts "
+          "are pretty short but some of them run for hours and hours").split()
+
+
+def _synthetic(mb: float, punctuated: bool, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    target = int(mb * 1_000_000)
+    out: list[str] = []
+    size = 0
+    while size < target:
+        sentence = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(6, 24)))
+        if punctuated:
+            sentence = sentence.capitalize() + rnd.choice(".?!")
+        out.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(out)
+
+
+def _best(fn, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _report(label: str, text: str, repeat: int) -> None:
+    mb = len(text) / 1_000_000
+    t_tok, tokens = _best(lambda: estimate_tokens(text), repeat)
+    t_chunk, chunks = _best(lambda: chunk_text(text, max_tokens=summarizer.CHUNK_TOKENS,
+                                               overlap_tokens=summarizer.LLM_CHUNK_OVERLAP_TOKENS), repeat)
+    step = 400_000
+    t_slice, _ = _best(lambda: [text[i:i + step] for i in range(0, len(text), step)], repeat)
+    sizes = [estimate_tokens(c) for c in chunks]
+    print(f"{label:<28} {mb:6.2f} MB  ~{tokens:>9,} tok  "
+          f"estimate {t_tok * 1000:7.1f} ms  chunk {t_chunk * 1000:7.1f} ms "
+          f"({mb / t_chunk if t_chunk else 0:5.1f} MB/s)  slice {t_slice * 1000:5.2f} ms  "
+          f"-> {len(chunks)} chunks, max {max(sizes):,} tok")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--sizes", default="1,4,8")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--file")
+    args = ap.parse_args()
+
+    print(f"chunk size {summarizer.CHUNK_TOKENS:,} tok, overlap {summarizer.LLM_CHUNK_OVERLAP_TOKENS:,} tok, "
+          f"best of {args.repeat}\n")
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            _report(args.file, f.read(), args.repeat)
+        return 0
+    for mb in (float(s) for s in args.sizes.split(",")):
+        _report("punctuated", _synthetic(mb, punctuated=True), args.repeat)
+        _report("run-on (auto-captions)", _synthetic(mb, punctuated=False), args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Benchmark for /api/search (repos.search) on a synthetic corpus.
+
+Builds a throwaway database of N videos, each with a transcript and a summary
+drawn from a Zipf-distributed vocabulary (so there are very common words, rare
+ones and everything between), then times, per query, the previous search SQL —
+snippets built for every hit inside the ranking query, looked up again per video
+by correlated subqueries — against the current repos.search, which ranks and
+limits first and builds snippets only for the page returned. The second page
+(keyset cursor) is timed too.
+
+The corpus goes in a temporary directory unless --data-dir is given; a data dir
+that already holds a corpus is reused as-is, so it only has to be built once:
+    python bench_search.py --data-dir /tmp/yts-bench
+
+Usage (from the backend directory):
+    python bench_search.py
+    python bench_search.py --videos 5000 --words 200 --repeat 5
+
+Flags:
+    --videos N       Videos in the synthetic corpus (default 50000).
+    --words N        Average transcript length in words (default 300).
+    --limit N        Results per page (default 30).
+    --repeat N       Runs per measurement; the best is reported (default 3).
+    --data-dir PATH  Where to build (or find) the corpus; default a temp dir.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# The app reads DATA_DIR at import; point it at the benchmark's database first.
+if __name__ == "__main__":
+    _ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    _ap.add_argument("--videos", type=int, default=50_000)
+    _ap.add_argument("--words", type=int, default=300)
+    _ap.add_argument("--limit", type=int, default=30)
+    _ap.add_argument("--repeat", type=int, default=3)
+    _ap.add_argument("--data-dir")
+    ARGS = _ap.parse_args()
+    os.environ["DATA_DIR"] = ARGS.data_dir or tempfile.mkdtemp(prefix="bench_search_")
+
+from app.db import repos  # noqa: E402
+from app.db.database import db, init_db  # noqa: E402
+from app.db.repos import _transcript_hit_ms  # noqa: E402
+
+_VOCABULARY = 20_000
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "po", "an", "el", "or", "us")
+
+# The search SQL before ranking and snippets were separated (kept here only to
+# compare against; with today's match delimiters, so both do the same work).
+_OLD_SQL = """
+    WITH hits AS (
+        SELECT s.video_id, 'summary' AS source,
+               snippet(summaries_fts, -1, char(2), char(3), ' … ', 12) AS snippet,
+               bm25(summaries_fts) AS rank
+        FROM summaries_fts JOIN summaries s ON s.id = summaries_fts.rowid
+        WHERE summaries_fts MATCH ?
+        UNION ALL
+        SELECT t.video_id, 'transcript' AS source,
+               snippet(transcripts_fts, -1, char(2), char(3), ' … ', 12) AS snippet,
+               bm25(transcripts_fts) AS rank
+        FROM transcripts_fts JOIN transcripts t ON t.rowid = transcripts_fts.rowid
+        WHERE transcripts_fts MATCH ?
+    )
+    SELECT h.video_id, MIN(h.rank) AS rank,
+           GROUP_CONCAT(DISTINCT h.source) AS sources,
+           (SELECT snippet FROM hits h2 WHERE h2.video_id = h.video_id ORDER BY rank LIMIT 1) AS snippet,
+           (SELECT snippet FROM hits h3 WHERE h3.video_id = h.video_id AND h3.source = 'transcript'
+            LIMIT 1) AS transcript_snippet,
+           v.title, v.channel_name, v.url
+    FROM hits h JOIN videos v ON v.video_id = h.video_id
+    GROUP BY h.video_id
+    ORDER BY rank ASC
+    LIMIT ?
+"""
+
+
+def _old_search(query: str, limit: int) -> list[dict]:
+    with db() as conn:
+        rows = [dict(r) for r in conn.execute(_OLD_SQL, (query, query, limit)).fetchall()]
+    for hit in rows:
+        transcript_snippet = hit.pop("transcript_snippet")
+        hit["timestamp_ms"] = _transcript_hit_ms(hit["video_id"], transcript_snippet) if transcript_snippet else None
+    return rows
+
+
+def _vocabulary(rnd: random.Random) -> list[str]:
+    words: set[str] = set()
+    while len(words) < _VOCABULARY:
+        words.add("".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(2, 4))))
+    return sorted(words, key=lambda w: rnd.random())
+
+
+def _build(videos: int, words: int, seed: int = 0) -> list[str]:
+    """Fill the database; returns the vocabulary, most frequent word first."""
+    rnd = random.Random(seed)
+    vocab = _vocabulary(rnd)
+    weights = [1 / (i + 1) for i in range(len(vocab))]  # Zipf, s = 1
+    started = time.perf_counter()
+    with db() as conn:
+        conn.execute("BEGIN")
+        for i in range(videos):
+            video_id = f"v{i:010d}"
+            n = max(20, int(rnd.gauss(words, words / 4)))
+            transcript = " ".join(rnd.choices(vocab, weights, k=n))
+            summary = " ".join(rnd.choices(vocab, weights, k=max(10, n // 10)))
+            conn.execute("INSERT INTO videos (video_id, channel_id, title, channel_name, url, status) "
+                         "VALUES (?, ?, ?, ?, ?, 'summarized')",
+                         (video_id, f"c{i % 200}", f"Video {i}", f"Channel {i % 200}",
+                          f"https://www.youtube.com/watch?v={video_id}"))
+            conn.execute("INSERT INTO transcripts (video_id, lang, source, text) VALUES (?, 'en', 'bench', ?)",
+                         (video_id, transcript))
+            conn.execute("INSERT INTO summaries (video_id, summary_md) VALUES (?, ?)", (video_id, summary))
+        conn.execute("COMMIT")
+    for name in ("transcripts_fts", "summaries_fts"):
+        with db() as conn:
+            conn.execute(f"INSERT INTO {name}({name}) VALUES ('optimize')")
+    print(f"built {videos:,} videos (~{words} words each) in {time.perf_counter() - started:.1f}s")
+    return vocab
+
+
+def _stored_vocabulary() -> list[str]:
+    """Words of an existing corpus, most frequent first (from the index itself)."""
+    with db() as conn:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.bench_vocab "
+                     "USING fts5vocab(main, transcripts_fts, 'row')")
+        return [r[0] for r in conn.execute("SELECT term FROM temp.bench_vocab ORDER BY doc DESC").fetchall()]
+
+
+def _best(fn, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _matches(query: str) -> int:
+    with db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM transcripts_fts WHERE transcripts_fts MATCH ?",
+                            (query,)).fetchone()[0]
+
+
+def main() -> int:
+    args = ARGS
+    init_db()
+    with db() as conn:
+        existing = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    if existing:
+        print(f"reusing {existing:,} videos in {os.environ['DATA_DIR']}")
+        vocab = _stored_vocabulary()
+    else:
+        vocab = _build(args.videos, args.words)
+
+    queries = {
+        "common word": vocab[0],
+        "mid word": vocab[len(vocab) // 50],
+        "rare word": vocab[len(vocab) // 2],
+        "two words (AND)": f"{vocab[1]} {vocab[40]}",
+        "phrase": f'"{vocab[0]} {vocab[1]}"',
+    }
+    print(f"limit {args.limit}, best of {args.repeat}\n")
+    print(f"{'query':<18} {'matches':>8}  {'before':>10}  {'after':>10}  {'speedup':>7}  {'page 2':>10}")
+    for label, q in queries.items():
+        t_old, old = _best(lambda: _old_search(q, args.limit), args.repeat)
+        t_new, new = _best(lambda: repos.search(q, limit=args.limit + 1), args.repeat)
+        page2 = "-"
+        if len(new) > args.limit:
+            last = new[args.limit - 1]
+            t_next, _ = _best(lambda: repos.search(q, limit=args.limit + 1,
+                                                   after=(last["rank"], last["video_id"])), args.repeat)
+            page2 = f"{t_next * 1000:8.1f}ms"
+        if [r["video_id"] for r in old] != [r["video_id"] for r in new[:args.limit]]:
+            # Only possible through rank ties, which the old query left unordered.
+            print(f"  note: '{label}' ordering differs between the two (rank ties)", file=sys.stderr)
+        print(f"{label:<18} {_matches(q):>8,}  {t_old * 1000:8.1f}ms  {t_new * 1000:8.1f}ms  "
+              f"{t_old / t_new if t_new else 0:6.1f}x  {page2:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+"""Multi-process contention test for repos.claim_due_jobs().
+
+Several processes claim from one queue at once, as the worker lanes and stage
+pools of separate app processes would. Every job must be claimed exactly once,
+none lost; a job whose lease has lapsed (its worker died) must be claimable
+again, and one whose lease hasn't must not.
+
+The app reads DATA_DIR at import, so everything that imports it runs in a
+spawned process pointed at the test's temporary directory; this process only
+inspects the database with plain sqlite3.
+
+Run from the backend directory:  python -m pytest -q tests
+"""
+import multiprocessing
+import os
+import sqlite3
+import time
+from collections import Counter
+
+JOBS = 400
+WORKERS = 6
+BATCH = 3
+
+
+def _seed(data_dir: str, n: int) -> None:
+    os.environ["DATA_DIR"] = data_dir
+    from app.db import repos
+    from app.db.database import init_db
+    init_db()
+    now = int(time.time())
+    for i in range(n):
+        repos.enqueue_job(video_id=f"vid{i:05d}", scheduled_at=now - 60, priority=i % 3)
+
+
+def _claim_until_empty(data_dir: str, k: int, barrier, out) -> None:
+    os.environ["DATA_DIR"] = data_dir
+    from app.db import repos
+    barrier.wait()  # everyone starts claiming at the same moment
+    claimed: list[int] = []
+    while True:
+        jobs = repos.claim_due_jobs(k)
+        if not jobs:
+            break
+        claimed.extend(j["id"] for j in jobs)
+        time.sleep(0.002)  # "work" on them, as a worker would: lets the others in
+    out.put(claimed)
+
+
+def _run(ctx, target, *args) -> None:
+    p = ctx.Process(target=target, args=args)
+    p.start()
+    p.join(60)
+    assert p.exitcode == 0
+
+
+def _claim_concurrently(ctx, data_dir: str) -> list[list[int]]:
+    barrier, out = ctx.Barrier(WORKERS), ctx.Queue()
+    procs = [ctx.Process(target=_claim_until_empty, args=(data_dir, BATCH, barrier, out))
+             for _ in range(WORKERS)]
+    for p in procs:
+        p.start()
+    results = [out.get(timeout=120) for _ in procs]  # drain before join
+    for p in procs:
+        p.join(30)
+        assert p.exitcode == 0
+    return results
+
+
+def _connect(data_dir: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(os.path.join(data_dir, "data.db"))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def test_concurrent_claims_take_each_job_once(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    data_dir = str(tmp_path)
+    _run(ctx, _seed, data_dir, JOBS)
+
+    results = _claim_concurrently(ctx, data_dir)
+    counts = Counter(job_id for claimed in results for job_id in claimed)
+    with _connect(data_dir) as conn:
+        all_ids = {r["id"] for r in conn.execute("SELECT id FROM fetch_jobs")}
+        rows = conn.execute("SELECT status, attempts, COUNT(*) AS n FROM fetch_jobs "
+                            "GROUP BY status, attempts").fetchall()
+    assert set(counts) == all_ids, "some jobs were never claimed"
+    assert max(counts.values()) == 1, "a job was claimed more than once"
+    assert [tuple(r) for r in rows] == [("running", 1, JOBS)]
+    assert sum(1 for claimed in results if claimed) > 1, "no contention: one process took everything"
+
+    # Some workers "crash": their jobs' leases lapse. Only those are re-claimed.
+    with _connect(data_dir) as conn:
+        expired = {r["id"] for r in conn.execute("SELECT id FROM fetch_jobs WHERE id % 7 = 0")}
+        conn.execute("UPDATE fetch_jobs SET locked_until = ? WHERE id % 7 = 0", (int(time.time()) - 1,))
+
+    results = _claim_concurrently(ctx, data_dir)
+    counts = Counter(job_id for claimed in results for job_id in claimed)
+    assert set(counts) == expired
+    assert max(counts.values()) == 1
+    with _connect(data_dir) as conn:
+        attempts = dict(conn.execute("SELECT id, attempts FROM fetch_jobs").fetchall())
+    assert all(attempts[i] == (2 if i in expired else 1) for i in all_ids)
@@ -0,0 +1,28 @@
+"""Caption normalization (app.youtube.normalize): rolling captions are merged and
+display clutter is dropped, without losing or repeating spoken words.
+
+Run from the backend directory:  python -m pytest -q tests
+"""
+from app.youtube.normalize import normalize
+
+
+def _text(lines: list[str]) -> str:
+    return " ".join(text for _, _, text in normalize([(i * 1000, 1000, line) for i, line in enumerate(lines)]))
+
+
+def test_rolling_repeats_are_kept_once():
+    assert _text(["so today we", "so today we talk about", "we talk about rust and why"]) == \
+        "so today we talk about rust and why"
+    # Two shared words may be the speaker repeating themselves: kept.
+    assert _text(["we talk about", "talk about it again"]) == "we talk about talk about it again"
+
+
+def test_clutter_inside_a_rolling_repeat_does_not_hide_it():
+    assert _text(["about [Music] um rust", "about rust and why"]) == "about rust and why"
+    assert _text(["we talk about ♪ uh rust and", "about rust and why it matters"]) == \
+        "we talk about rust and why it matters"
+
+
+def test_clutter_only_lines_are_dropped_and_timestamps_kept():
+    segments = normalize([(0, 1000, "[Music]"), (1000, 1000, "[12:34] hello, um, world"), (2000, 1000, ">> ♪")])
+    assert segments == [(1000, 1000, "[12:34] hello, world")]
@@ -3,8 +3,8 @@
  * prod is served by FastAPI), with credentials so the session cookie is sent.
  */
 import type {
-  Channel, ChannelFilter, Quiz, SearchResult, SummaryListItem,
-  SystemStatus, Transcript, Video, VideoDetail,
+  Channel, ChannelFilter, Quiz, SearchMode, SearchResult, SummaryListItem,
+  SystemStatus, Transcript, TranscriptSegment, Video, VideoDetail,
 } from "./types";
 
 export class ApiError extends Error {
@@ -53,11 +53,27 @@ export const api = {
     req<{ summaries: SummaryListItem[] }>(`/summaries?limit=${limit}&offset=${offset}`),
   listVideos: (status?: string) =>
     req<{ videos: Video[] }>(`/videos${status ? `?status=${status}` : ""}`),
-  getVideo: (id: string) => req<VideoDetail>(`/videos/${id}`),
-  getTranscript: (id: string) => req<Transcript>(`/transcripts/${id}`),
-  search: (q: string) => req<{ query: string; results: SearchResult[] }>(`/search?q=${encodeURIComponent(q)}`),
+  getVideo: (id: string) => req<VideoDetail>(`/videos/${id}?lite=true`),
+  getTranscript: (id: string, offset = 0, length?: number) =>
+    req<Transcript>(`/transcripts/${id}?offset=${offset}${length ? `&length=${length}` : ""}`),
+  getTranscriptSegments: (id: string, opts: { startMs?: number; endMs?: number; offset?: number; limit?: number } = {}) => {
+    const q = new URLSearchParams();
+    if (opts.startMs != null) q.set("start_ms", String(opts.startMs));
+    if (opts.endMs != null) q.set("end_ms", String(opts.endMs));
+    if (opts.offset) q.set("offset", String(opts.offset));
+    if (opts.limit) q.set("limit", String(opts.limit));
+    return req<{ video_id: string; total_segments: number; segments: TranscriptSegment[] }>(
+      `/transcripts/${id}/segments?${q}`);
+  },
+  /** One page of results; pass `next_cursor` back for the next (null = no more). */
+  search: (q: string, mode: SearchMode = "lexical", cursor?: string) =>
+    req<{ query: string; mode: SearchMode; results: SearchResult[]; next_cursor: string | null }>(
+      `/search?q=${encodeURIComponent(q)}&mode=${mode}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`,
+    ),
   getQuiz: (id: string) => req<Quiz>(`/videos/${id}/quiz`),
   makeQuiz: (id: string, n = 5) => req<Quiz>(`/videos/${id}/quiz?num_questions=${n}`, { method: "POST" }),
+  /** Server-sent events: status / delta / reset / done (see backend content.py). */
+  streamSummary: (id: string) => new EventSource(`/api/videos/${id}/summary/stream`, { withCredentials: true }),
 
   // ── Channels ──
   listChannels: () => req<{ channels: Channel[] }>("/channels"),
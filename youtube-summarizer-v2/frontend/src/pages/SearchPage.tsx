@@ -1,11 +1,15 @@
 import { useState } from "react";
 import { Link } from "react-router-dom";
 import { api } from "../api";
-import type { SearchResult } from "../types";
+import type { SearchMode, SearchResult } from "../types";
+import { fmtDuration } from "../util";
 
 export default function SearchPage() {
   const [q, setQ] = useState("");
+  const [mode, setMode] = useState<SearchMode>("lexical");
+  const [query, setQuery] = useState<{ q: string; mode: SearchMode }>({ q: "", mode: "lexical" });
   const [results, setResults] = useState<SearchResult[] | null>(null);
+  const [cursor, setCursor] = useState<string | null>(null);
   const [busy, setBusy] = useState(false);
 
   async function run(e: React.FormEvent) {
@@ -13,8 +17,22 @@ export default function SearchPage() {
     if (q.trim().length < 2) return;
     setBusy(true);
     try {
-      const r = await api.search(q.trim());
+      const r = await api.search(q.trim(), mode);
+      setQuery({ q: q.trim(), mode });
       setResults(r.results);
+      setCursor(r.next_cursor);
+    } finally {
+      setBusy(false);
+    }
+  }
+
+  async function more() {
+    if (!cursor) return;
+    setBusy(true);
+    try {
+      const r = await api.search(query.q, query.mode, cursor);
+      setResults((prev) => [...(prev ?? []), ...r.results]);
+      setCursor(r.next_cursor);
     } finally {
       setBusy(false);
     }
@@ -30,6 +48,11 @@ export default function SearchPage() {
           autoFocus
           onChange={(e) => setQ(e.target.value)}
         />
+        <select value={mode} onChange={(e) => setMode(e.target.value as SearchMode)}>
+          <option value="lexical">Keywords</option>
+          <option value="semantic">Meaning</option>
+          <option value="hybrid">Both</option>
+        </select>
         <button className="primary" disabled={busy}>Search</button>
       </form>
 
@@ -38,18 +61,25 @@ export default function SearchPage() {
         {results?.map((r) => (
           <Link key={r.video_id} to={`/videos/${r.video_id}`} className="card" style={{ display: "block" }}>
             <h3 style={{ marginBottom: 4 }}>{r.title ?? r.video_id}</h3>
-            <div className="muted">{r.channel_name} · matched in {r.sources}</div>
+            <div className="muted">
+              {r.channel_name} · matched in {r.sources}
+              {r.timestamp_ms != null && ` · at ${fmtDuration(Math.floor(r.timestamp_ms / 1000)) || "0:00"}`}
+            </div>
             <p style={{ marginBottom: 0 }} dangerouslySetInnerHTML={{ __html: highlight(r.snippet) }} />
           </Link>
         ))}
       </div>
+      {cursor && (
+        <button onClick={more} disabled={busy}>More results</button>
+      )}
     </>
   );
 }
 
-// The backend wraps FTS matches in [brackets]; render them emphasized safely.
+// The backend wraps FTS matches in \u0002…\u0003 (never in caption text, unlike
+// the transcript's "[mm:ss]" markers); render them emphasized safely.
 function highlight(snippet: string): string {
   const escaped = snippet
     .replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
-  return escaped.replace(/\[(.+?)\]/g, "<mark>$1</mark>");
+  return escaped.replace(/\u0002([^\u0002\u0003]*)\u0003/g, "<mark>$1</mark>").replace(/[\u0002\u0003]/g, "");
 }
@@ -6,12 +6,19 @@ import type { VideoDetail } from "../types";
 import { fmtDate, fmtDuration, statusPill, isRateLimited } from "../util";
 import QuizView from "../components/QuizView";
 
+const PENDING = ["queued", "fetching", "summarizing"];
+// Transcript text is fetched on demand, this many characters at a time.
+const TRANSCRIPT_PAGE_CHARS = 50_000;
+
 export default function VideoPage() {
   const { id = "" } = useParams();
   const [data, setData] = useState<VideoDetail | null>(null);
   const [error, setError] = useState("");
   const [showTranscript, setShowTranscript] = useState(false);
+  const [transcriptText, setTranscriptText] = useState("");
+  const [nextOffset, setNextOffset] = useState<number | null>(0);
   const [action, setAction] = useState("");
+  const [live, setLive] = useState("");
 
   async function retry() {
     try {
@@ -31,11 +38,48 @@ export default function VideoPage() {
     }
   }
 
+  async function loadTranscript() {
+    if (nextOffset == null) return;
+    try {
+      const page = await api.getTranscript(id, nextOffset, TRANSCRIPT_PAGE_CHARS);
+      setTranscriptText((prev) => prev + page.text);
+      setNextOffset(page.next_offset);
+    } catch (e) {
+      setAction(`Error: ${(e as Error).message}`);
+    }
+  }
+
+  function toggleTranscript() {
+    if (!showTranscript && !transcriptText) loadTranscript();
+    setShowTranscript((v) => !v);
+  }
+
   useEffect(() => {
     setData(null);
+    setTranscriptText("");
+    setNextOffset(0);
     api.getVideo(id).then(setData).catch((e) => setError((e as Error).message));
   }, [id]);
 
+  // While a summary may still be coming, follow it live: the stream relays the
+  // model's output as it's generated, then we reload once it's saved.
+  const pending = !!data && PENDING.includes(data.video.status);
+  useEffect(() => {
+    setLive("");
+    if (!pending) return;
+    const es = api.streamSummary(id);
+    es.addEventListener("reset", () => setLive(""));
+    es.addEventListener("delta", (e) => {
+      const { text } = JSON.parse((e as MessageEvent).data);
+      setLive((prev) => prev + text);
+    });
+    es.addEventListener("done", () => {
+      es.close();
+      api.getVideo(id).then(setData).catch(() => {});
+    });
+    return () => es.close();
+  }, [id, pending]);
+
   if (error) return <div className="empty">Error: {error}</div>;
   if (!data) return <p className="muted">Loading…</p>;
 
@@ -82,7 +126,17 @@ export default function VideoPage() {
         </div>
       )}
 
-      {summary ? (
+      {live ? (
+        <div className="card">
+          <div className="row" style={{ justifyContent: "space-between" }}>
+            <h3 style={{ margin: 0 }}>Summary</h3>
+            <span className="muted">generating…</span>
+          </div>
+          <div className="summary-md">
+            <ReactMarkdown>{live}</ReactMarkdown>
+          </div>
+        </div>
+      ) : summary ? (
         <div className="card">
           <div className="row" style={{ justifyContent: "space-between" }}>
             <h3 style={{ margin: 0 }}>Summary</h3>
@@ -99,12 +153,29 @@ export default function VideoPage() {
       {transcript && (
         <div className="card">
           <div className="row" style={{ justifyContent: "space-between" }}>
-            <h3 style={{ margin: 0 }}>Transcript <span className="muted">({transcript.source})</span></h3>
-            <button onClick={() => setShowTranscript((v) => !v)}>
+            <h3 style={{ margin: 0 }}>
+              Transcript <span className="muted">({transcript.source})</span>
+              {transcript.raw_tokens && transcript.tokens != null ? (
+                <span className="muted" style={{ fontSize: 13, fontWeight: "normal", marginLeft: 8 }}>
+                  ~{transcript.tokens.toLocaleString()} tokens, −
+                  {Math.round((1 - transcript.tokens / transcript.raw_tokens) * 100)}% after cleanup
+                </span>
+              ) : null}
+            </h3>
+            <button onClick={toggleTranscript}>
               {showTranscript ? "Hide" : "Show"}
             </button>
           </div>
-          {showTranscript && <div className="transcript" style={{ marginTop: 12 }}>{transcript.text}</div>}
+          {showTranscript && (
+            <>
+              <div className="transcript" style={{ marginTop: 12 }}>{transcriptText || "Loading…"}</div>
+              {transcriptText && nextOffset != null && (
+                <button onClick={loadTranscript} style={{ marginTop: 8 }}>
+                  Show more ({Math.round((nextOffset / transcript.length) * 100)}% shown)
+                </button>
+              )}
+            </>
+          )}
         </div>
       )}
 
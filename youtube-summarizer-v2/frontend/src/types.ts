@@ -33,12 +33,29 @@ export interface Summary {
   created_at: number;
 }
 
-export interface Transcript {
+export interface TranscriptInfo {
   video_id: string;
   lang: string | null;
   source: string | null;
-  text: string;
   fetched_at: number;
+  // Estimated tokens before / after caption normalization (null for old rows).
+  raw_tokens: number | null;
+  tokens: number | null;
+  length: number; // characters of text
+}
+
+/** A transcript's text, or a character range of it (offset .. next_offset). */
+export interface Transcript extends TranscriptInfo {
+  text: string;
+  offset: number;
+  next_offset: number | null;
+}
+
+export interface TranscriptSegment {
+  seq: number;
+  start_ms: number;
+  duration_ms: number;
+  text: string;
 }
 
 export interface QuizQuestion {
@@ -59,7 +76,7 @@ export interface Quiz {
 export interface VideoDetail {
   video: Video;
   summary: Summary | null;
-  transcript: Transcript | null;
+  transcript: TranscriptInfo | null; // text left out (getVideo lite mode)
   quiz: Quiz | null;
 }
 
@@ -80,14 +97,21 @@ export interface ChannelFilter {
   action: string;
 }
 
+// lexical: keyword (BM25); semantic: by meaning (embeddings); hybrid: keyword
+// matches re-ranked by meaning.
+export type SearchMode = "lexical" | "semantic" | "hybrid";
+
 export interface SearchResult {
   video_id: string;
   rank: number;
   sources: string;
+  // Matched terms are wrapped in \u0002…\u0003 (see SearchPage's highlight()).
   snippet: string;
   title: string | null;
   channel_name: string | null;
   url: string | null;
+  // Where in the video the transcript matched (null if only the summary did).
+  timestamp_ms: number | null;
 }
 
 export interface BackoffStatus {
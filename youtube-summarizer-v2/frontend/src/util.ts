@@ -16,7 +16,7 @@ export function fmtDuration(seconds?: number | null): string {
 export function statusPill(status: string): "good" | "warn" | "bad" | "" {
   if (status === "summarized") return "good";
   if (status === "failed") return "bad";
-  if (status === "queued" || status === "fetching") return "warn";
+  if (status === "queued" || status === "fetching" || status === "summarizing") return "warn";
   return "";
 }
 